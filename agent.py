@@ -1,75 +1,419 @@
-from langchain.tools import tool
-from langchain_openai import ChatOpenAI
 from langgraph.graph import MessagesState
 from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import StateGraph, START,END
+from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.tools import tool
+from langchain_core.messages import AIMessage, ToolMessage
 from typing import List, Dict, Optional
-from typing import TypedDict
 from langchain_core.messages import BaseMessage
 from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.language_models import BaseChatModel
 from langgraph.checkpoint.memory import MemorySaver
-from datetime import datetime, timezone
+import json
+from itertools import takewhile
+import threading
+import time
+import uuid
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 #local imports
 from api_import import keys_settings
-from tools.weather_tool import get_weather
-from tools.news_tool import search_news
+from prompt_config import prompt_manager
+from tools.weather_tool import (
+    get_weather,
+    get_weather_batch,
+    cache_dependency as weather_cache_dependency,
+    batch_cache_dependencies as weather_batch_cache_dependencies,
+    summarize_weather_result,
+    summarize_weather_batch_result,
+    COMPACT_DESCRIPTION as WEATHER_COMPACT_DESCRIPTION,
+    BATCH_COMPACT_DESCRIPTION as WEATHER_BATCH_COMPACT_DESCRIPTION,
+)
+from tools.news_tool import (
+    search_news,
+    cache_dependency as news_cache_dependency,
+    summarize_news_result,
+    COMPACT_DESCRIPTION as NEWS_COMPACT_DESCRIPTION,
+)
 from utils.uLogger import logger
+from utils.checkpointer import BoundedSqliteSaver
+from utils.token_budget import TokenCounter, trim_to_budget
+from utils.tool_results import compact_tool_messages
+from utils.router import FastPathRouter
+from utils.response_cache import ResponseCache, is_fallback_result
+from utils.metrics import metrics, tracing_handler
 
 
+# Tool-call id prefix of calls emitted by the fast-path router
+FAST_PATH_ID_PREFIX = "fastpath_"
+
+# Model tiers of the cascade: "main" selects and calls tools, "fast" handles small talk
+# and phrases tool results (see Chatbot._model_tier)
+MAIN_TIER, FAST_TIER = "main", "fast"
+
 
 class Chatbot:
-    def __init__(self):
+    def __init__(
+        self,
+        parallel_tool_calls: Optional[bool] = None,
+        llm: Optional[BaseChatModel] = None,
+        fast_llm: Optional[BaseChatModel] = None,
+    ):
         # Load values from .env
-        self.max_history = keys_settings.max_history
-        self.keep_n = keys_settings.keep_n
+        self.context_token_budget = keys_settings.context_token_budget
+        # Opt-in: let the LLM emit several tool calls per turn; ToolNode then runs them concurrently
+        self.parallel_tool_calls = (
+            keys_settings.parallel_tool_calls if parallel_tool_calls is None else parallel_tool_calls
+        )
 
-        logger.info(f"Chatbot initialized with max_history={self.max_history}, Keep messages after reset={self.keep_n}")
+        logger.info(f"Chatbot initialized with context_token_budget={self.context_token_budget}")
 
-        # LLM + tools setup
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=keys_settings.openai_api_key
-        )
-        logger.info(f"LLM initialized with: {self.llm.model_name}")
+        # LLM + tools setup. The OpenAI clients (and the langchain_openai/openai imports behind
+        # them) are built on first use or by `prewarm()`; `llm`/`fast_llm` let benchmarks inject
+        # chat models (an injected `llm` without `fast_llm` serves both tiers).
+        self.model_tiers = {MAIN_TIER: keys_settings.llm_model, FAST_TIER: keys_settings.llm_fast_model}
+        self.model_cascade_enabled = keys_settings.model_cascade_enabled
+        self._llms: Dict[str, BaseChatModel] = {}
+        if llm is not None:
+            self._llms[MAIN_TIER] = llm
+            self._llms[FAST_TIER] = fast_llm if fast_llm is not None else llm
+            self.model_tiers = {tier: model.model_name for tier, model in self._llms.items()}
+        self._llms_with_tools = {}
+        self._init_lock = threading.RLock()
+        self.token_counter = TokenCounter(model=llm.model_name if llm is not None else keys_settings.llm_model)
+        logger.info(f"Model tiers {self.model_tiers}, cascade enabled={self.model_cascade_enabled}")
+        self.tools = [get_weather, get_weather_batch, search_news]
+
+        # Intent-scoped tool binding: compact schemas, only for the tools a turn needs
+        self.intent_tool_scoping = keys_settings.intent_tool_scoping
+        prompt_manager.register_tool(get_weather, ["weather"], WEATHER_COMPACT_DESCRIPTION)
+        prompt_manager.register_tool(get_weather_batch, ["weather"], WEATHER_BATCH_COMPACT_DESCRIPTION)
+        prompt_manager.register_tool(search_news, ["news"], NEWS_COMPACT_DESCRIPTION)
+        self._scoped_llms = {}
+        self._full_schema_tokens: Optional[int] = None
+        self.schema_tokens_saved = 0
+        logger.info(f"Intent tool scoping={self.intent_tool_scoping}")
 
-        self.tools = [get_weather, search_news]
-        self.llm_with_tools = self.llm.bind_tools(self.tools, parallel_tool_calls=False)
-    
+        # Tool results of earlier turns are replaced by one-line summaries
+        self.tool_compaction_enabled = keys_settings.tool_compaction_enabled
+        self._tool_summarizers = {
+            get_weather.name: summarize_weather_result,
+            get_weather_batch.name: summarize_weather_batch_result,
+            search_news.name: summarize_news_result,
+        }
+
+        # Fast-path router for unambiguous one-shot requests
+        self.fast_path_enabled = keys_settings.fast_path_enabled
+        self.router = FastPathRouter(threshold=keys_settings.fast_path_threshold)
+        logger.info(f"Fast-path router enabled={self.fast_path_enabled}, threshold={self.router.threshold}")
+
+        # Answer cache for turns that do not depend on earlier conversation context
+        self.response_cache_enabled = keys_settings.response_cache_enabled
+        self.response_cache = ResponseCache(
+            maxsize=keys_settings.response_cache_size,
+            ttl=keys_settings.response_cache_ttl,
+        )
+        metrics.register_cache(self.response_cache.stats)
+        self._cache_dependencies = {
+            get_weather.name: weather_cache_dependency,
+            get_weather_batch.name: weather_batch_cache_dependencies,
+            search_news.name: news_cache_dependency,
+        }
 
         # Load system prompt
-        with open("prompts/chatbot_prompt.txt", "r", encoding="utf-8") as f:
-            self.conversational_sys_prompt = SystemMessage(content=f.read())
+        self.conversational_sys_prompt = SystemMessage(content=prompt_manager.get_conversational_prompt())
         logger.info("Chabot Agent prompt loaded successfully")
 
+    @property
+    def llm(self) -> BaseChatModel:
+        return self.llm_for_tier(MAIN_TIER)
+
+    @property
+    def llm_with_tools(self):
+        return self._llm_with_tools_for(MAIN_TIER)
+
+    def llm_for_tier(self, tier: str) -> BaseChatModel:
+        """Chat model of a cascade tier, built on first use."""
+        if tier not in self._llms:
+            with self._init_lock:
+                if tier not in self._llms:
+                    from langchain_openai import ChatOpenAI  # heavy import, deferred to first use
+
+                    self._llms[tier] = ChatOpenAI(model=self.model_tiers[tier], api_key=keys_settings.openai_api_key)
+                    logger.info(f"LLM initialized for tier {tier}: {self._llms[tier].model_name}")
+        return self._llms[tier]
+
+    def _llm_with_tools_for(self, tier: str):
+        if tier not in self._llms_with_tools:
+            with self._init_lock:
+                if tier not in self._llms_with_tools:
+                    self._llms_with_tools[tier] = self.llm_for_tier(tier).bind_tools(
+                        self.tools, parallel_tool_calls=self.parallel_tool_calls
+                    )
+                    logger.info(f"Tools bound for tier {tier} with parallel_tool_calls={self.parallel_tool_calls}")
+        return self._llms_with_tools[tier]
+
+    @property
+    def full_schema_tokens(self) -> int:
+        if self._full_schema_tokens is None:
+            self._full_schema_tokens = self.token_counter.count_text(
+                json.dumps(prompt_manager.get_tool_schemas(prompt_manager.tools, compact=False))
+            )
+            logger.info(f"Full tool schemas ~{self._full_schema_tokens} tokens")
+        return self._full_schema_tokens
+
+    def prewarm(self) -> Dict[str, float]:
+        """
+        Build everything that is otherwise created on the first request: the LLM client
+        and its tool bindings, the token encoding and the tool schemas. Safe to run in a
+        background thread while the first request is being typed or routed.
+        Returns seconds spent per step.
+        """
+        timings = {}
+        steps = [
+            ("llm_client", lambda: [self.llm_for_tier(tier) for tier in self._tiers()]),
+            ("tool_binding", self._prewarm_bindings),
+            ("token_encoding", lambda: self.full_schema_tokens),
+        ]
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            timings[name] = round(time.perf_counter() - started, 4)
+        logger.info(f"[STARTUP] Pre-warm done: {timings}")
+        return timings
+
+    def _prewarm_bindings(self) -> None:
+        for tier in self._tiers():
+            if not self.intent_tool_scoping:
+                self._llm_with_tools_for(tier)
+                continue
+            # One binding per intent plus the combined one, as selected by prompt_manager.select_tools
+            for name in prompt_manager.tools:
+                self._llm_for_names(frozenset([name]), tier)
+            self._llm_for_names(frozenset(prompt_manager.tools), tier)
+
+    def _tiers(self) -> List[str]:
+        return [MAIN_TIER, FAST_TIER] if self.model_cascade_enabled else [MAIN_TIER]
+
+    def route(self, state: MessagesState) -> MessagesState:
+        """
+        Entry node: answer a repeated context-free question from the response cache, or,
+        when the new user message is an unambiguous tool request, emit the tool call
+        directly so the first LLM call (tool selection) is skipped.
+        """
+        last = state["messages"][-1] if state["messages"] else None
+        if not isinstance(last, HumanMessage):
+            return {"messages": []}
+
+        text = last.content if isinstance(last.content, str) else str(last.content)
+        decision = self.router.route(text) if self.fast_path_enabled else None
+
+        cacheable_route = decision is not None and self.router.is_cacheable(decision.tool, decision.args)
+        if self.response_cache_enabled and (cacheable_route or self._is_first_turn(state["messages"])):
+            answer = self.response_cache.get(text)
+            if answer is not None:
+                logger.info(f"[AI_CHAT] Response cache hit (hit rate {self.response_cache.stats()['hit_rate']:.0%})")
+                return {"messages": [AIMessage(content=answer)]}
+
+        if decision is None:
+            return {"messages": []}
+
+        call = {"name": decision.tool, "args": decision.args, "id": f"{FAST_PATH_ID_PREFIX}{uuid.uuid4().hex[:12]}"}
+        logger.info(
+            f"[ROUTER] Fast path -> {decision.tool}({decision.args}) confidence={decision.confidence} "
+            f"(fast-path rate {self.router.fast_path_rate():.0%})"
+        )
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    @staticmethod
+    def _after_route(state: MessagesState) -> str:
+        last = state["messages"][-1]
+        if isinstance(last, AIMessage):
+            # Tool call from the fast path, or a complete answer from the response cache
+            return "tools" if last.tool_calls else END
+        return "ai_chat"
+
+    @staticmethod
+    def _is_first_turn(messages: List[BaseMessage]) -> bool:
+        return sum(isinstance(m, HumanMessage) for m in messages) == 1
+
+    def _cache_response(self, messages: List[BaseMessage], response: AIMessage) -> None:
+        """
+        Store the final answer of a context-free turn (the first turn of a conversation, or
+        one the fast-path router classified as self-contained, for a location the gazetteer
+        knows) with the tool-cache entries it was built from. Answers to failed tool calls
+        or built on stale-if-error values are not stored.
+        """
+        if not self.response_cache_enabled or response.tool_calls or not isinstance(response.content, str):
+            return
+
+        start = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        turn = messages[start + 1:]
+        calls = [call for m in turn if isinstance(m, AIMessage) for call in m.tool_calls]
+        fast_path = bool(calls) and calls[0]["id"].startswith(FAST_PATH_ID_PREFIX)
+        if fast_path and not self.router.is_cacheable(calls[0]["name"], calls[0]["args"]):
+            return
+        if not (fast_path or self._is_first_turn(messages)):
+            return
+        # Answers to failed calls, or built on a last known value served while an upstream was down
+        if any(isinstance(m, ToolMessage) and (m.status == "error" or is_fallback_result(m.content)) for m in turn):
+            return
+        if any(call["name"] not in self._cache_dependencies for call in calls):
+            return
+
+        dependencies = []
+        for call in calls:
+            # Batch tools read several cache entries and return a list of them
+            dependency = self._cache_dependencies[call["name"]](call["args"])
+            dependencies.extend(dependency if isinstance(dependency, list) else [dependency])
+        if self.response_cache.set(str(messages[start].content), response.content, dependencies):
+            logger.info(f"[AI_CHAT] Response cached for {len(dependencies)} tool result(s)")
+
     def ai_chat(self, state: MessagesState) -> MessagesState:
-        response = self.llm_with_tools.invoke([self.conversational_sys_prompt] + state["messages"])
-        messages = state["messages"]
+        kept, updates = self._prepare_history(state["messages"])
+        llm, tier = self._llm_for(kept)
+        started = time.perf_counter()
+        response = llm.invoke([self.conversational_sys_prompt] + kept)
+        self._record_tier(tier, time.perf_counter() - started, response)
+        self._cache_response(state["messages"], response)
+        return {"messages": updates + [response]}
+
+    async def aai_chat(self, state: MessagesState) -> MessagesState:
+        """Async variant of `ai_chat`, used when the graph is driven with `ainvoke`/`astream`."""
+        kept, updates = self._prepare_history(state["messages"])
+        llm, tier = self._llm_for(kept)
+        started = time.perf_counter()
+        response = await llm.ainvoke([self.conversational_sys_prompt] + kept)
+        self._record_tier(tier, time.perf_counter() - started, response)
+        self._cache_response(state["messages"], response)
+        return {"messages": updates + [response]}
+
+    @staticmethod
+    def _record_tier(tier: str, seconds: float, response: AIMessage) -> None:
+        """Per-tier latency and token usage of one LLM call (chatbot_llm_tier_* on /metrics)."""
+        metrics.observe("chatbot_llm_tier_seconds", seconds, tier=tier)
+        usage = response.usage_metadata or {}
+        for kind, field in (("prompt", "input_tokens"), ("completion", "output_tokens")):
+            if usage.get(field):
+                metrics.inc("chatbot_llm_tier_tokens_total", usage[field], tier=tier, type=kind)
+
+    def _prepare_history(self, messages: List[BaseMessage]):
+        """
+        Compact tool results of earlier turns, then fit the history into the token budget.
+        Returns the messages to send and the state updates (compacted replacements, removals).
+        """
+        compacted = compact_tool_messages(messages, self._tool_summarizers) if self.tool_compaction_enabled else []
+        if compacted:
+            by_id = {m.id: m for m in compacted}
+            messages = [by_id.get(m.id, m) for m in messages]
+            saved = sum(m.additional_kwargs["original_chars"] - len(m.content) for m in compacted)
+            logger.info(f"[AI_CHAT] Compacted {len(compacted)} earlier tool results (~{saved // 4} tokens saved)")
+
+        kept, removals = self._trim_history(messages)
+        removed = {r.id for r in removals}
+        return kept, [m for m in compacted if m.id not in removed] + removals
+
+    def _llm_for(self, messages: List[BaseMessage]):
+        """
+        Pick the model tier and the LLM binding for this call: all full tool schemas, or only
+        the intent-relevant compact ones. Returns `(llm, tier)`.
+        """
+        names = prompt_manager.select_tools(messages)
+        tier = self._model_tier(messages)
+        if not self.intent_tool_scoping:
+            return self._llm_with_tools_for(tier), tier
+
+        llm, schema_tokens = self._llm_for_names(names, tier)
+        saved = self.full_schema_tokens - schema_tokens
+        self.schema_tokens_saved += saved
+        logger.info(
+            f"[AI_CHAT] Tools bound: {sorted(names) or 'none'}, tool schema ~{schema_tokens} tokens "
+            f"(saved ~{saved} input tokens this call, {self.schema_tokens_saved} total)"
+        )
+        return llm, tier
+
+    def _model_tier(self, messages: List[BaseMessage]) -> str:
+        """
+        Cheap per-call routing of the model cascade. The fast tier only gets:
+        - the call that phrases successful tool results (the tools already did the work),
+        - small talk ("thanks!", "ok, bye").
+        Everything else, including turns with no detected intent and failed tool calls
+        (an error status, or an error/stale-if-error result as in _cache_response) that may
+        need a retry with other arguments, goes to the main tier.
+        """
+        if not self.model_cascade_enabled:
+            return MAIN_TIER
+        last = messages[-1] if messages else None
+        if isinstance(last, ToolMessage):
+            results = takewhile(lambda m: isinstance(m, ToolMessage), reversed(messages))
+            failed = any(m.status == "error" or is_fallback_result(m.content) for m in results)
+            tier, reason = (MAIN_TIER, "failed tool call") if failed else (FAST_TIER, "tool result phrasing")
+        elif prompt_manager.is_small_talk(messages):
+            tier, reason = FAST_TIER, "small talk"
+        else:
+            tier, reason = MAIN_TIER, "tool selection"
+        logger.info(f"[AI_CHAT] Model tier {tier} ({self.model_tiers[tier]}): {reason}")
+        return tier
+
+    def _llm_for_names(self, names, tier: str = MAIN_TIER):
+        """Scoped binding for a set of tool names, built once per distinct set and tier."""
+        key = (tier, names)
+        if key not in self._scoped_llms:
+            with self._init_lock:
+                if key not in self._scoped_llms:
+                    schemas = prompt_manager.get_tool_schemas(names)
+                    base = self.llm_for_tier(tier)
+                    llm = base.bind_tools(schemas, parallel_tool_calls=self.parallel_tool_calls) if schemas else base
+                    self._scoped_llms[key] = (llm, self.token_counter.count_text(json.dumps(schemas)) if schemas else 0)
+        return self._scoped_llms[key]
 
-        if len(messages) >= self.max_history:
-            logger.info(f"[AI_CHAT] Memory reset due to length of message =({len(messages)})")
-            delete_messages = [RemoveMessage(id=m.id) for m in messages[:-self.keep_n]]
-            trimmed_messages = delete_messages + [response]
-            logger.info(f"[AI_CHAT] Resetting memory, keeping last {self.keep_n} messages")
-            return {"messages": trimmed_messages}
+    def _trim_history(self, messages: List[BaseMessage]):
+        """
+        Fit the history into `context_token_budget` before calling the LLM.
+        Returns the messages to send and RemoveMessage updates for the ones dropped from state.
+        """
+        kept, dropped, tokens = trim_to_budget(messages, self.token_counter, self.context_token_budget)
+        if dropped:
+            logger.info(
+                f"[AI_CHAT] History over budget: dropped {len(dropped)} oldest messages, "
+                f"keeping {len(kept)} messages (~{tokens} tokens)"
+            )
+        else:
+            logger.info(f"[AI_CHAT] History within budget: {len(kept)} messages (~{tokens} tokens)")
+        return kept, [RemoveMessage(id=m.id) for m in dropped]
 
-        logger.info(f"[AI_CHAT] Appending response, total messages now: {len(messages) + 1}")
-        return {"messages": messages + [response]}
+    def create_checkpointer(self):
+        """Build the checkpointer selected by `keys_settings.checkpointer`."""
+        if keys_settings.checkpointer == "sqlite":
+            return BoundedSqliteSaver(
+                keys_settings.checkpoint_db_path,
+                max_checkpoints=keys_settings.checkpoint_max_per_thread,
+                idle_ttl=keys_settings.checkpoint_idle_ttl,
+                retention=keys_settings.checkpoint_retention,
+                flush_interval=keys_settings.checkpoint_flush_interval,
+            )
+        if keys_settings.checkpointer != "memory":
+            logger.warning(f"[GRAPH] Unknown checkpointer {keys_settings.checkpointer!r}, using memory saver")
+        return MemorySaver()
 
-    def create_graph(self):
+    def create_graph(self, checkpointer=None):
         logger.info("[GRAPH] Creating conversation graph...")
-        memory = MemorySaver()
+        memory = checkpointer if checkpointer is not None else self.create_checkpointer()
         graph = StateGraph(MessagesState)
 
-        graph.set_entry_point("ai_chat")
-        graph.add_node("ai_chat", self.ai_chat)
+        graph.set_entry_point("router")
+        graph.add_node("router", self.route)
+        graph.add_conditional_edges("router", self._after_route, ["tools", "ai_chat", END])
+        # Sync and async implementations of the same node: graph.invoke/stream use ai_chat,
+        # graph.ainvoke/astream use aai_chat and the tools' async HTTP path.
+        graph.add_node("ai_chat", RunnableLambda(self.ai_chat, afunc=self.aai_chat, name="ai_chat"))
         graph.add_node("tools", ToolNode(self.tools))
         graph.add_conditional_edges("ai_chat", tools_condition)
         graph.add_edge("tools", "ai_chat")
 
-        logger.info("[GRAPH] Graph compiled with memory saver")
-        return graph.compile(checkpointer=memory)
+        logger.info(f"[GRAPH] Graph compiled with {type(memory).__name__}")
+        compiled = graph.compile(checkpointer=memory)
+        if tracing_handler is not None:
+            # Every run of this graph reports node/LLM/tool spans and token usage
+            compiled = compiled.with_config({"callbacks": [tracing_handler]})
+        return compiled
@@ -1,5 +1,4 @@
-
-from typing import Optional
+import threading
 from pydantic_settings import BaseSettings  
 from pydantic import Field, ValidationError
 from utils.uLogger import logger
@@ -8,8 +7,118 @@ class keys(BaseSettings):
     openai_api_key: str = Field(..., env="OPENAI_API_KEY")
     weather_api_key: str = Field(..., env="WEATHER_API_KEY")
     news_api_key: str = Field(..., env="NEWS_API_KEY")
+    # Legacy message-count trimming settings, superseded by context_token_budget
     max_history: int = Field(10, env="MAX_HISTORY")
     keep_n: int = Field(2, env="KEEP_N")
+    # Max tokens of conversation history sent to the LLM (system prompt and tool schemas excluded)
+    context_token_budget: int = Field(4000, env="CONTEXT_TOKEN_BUDGET")
+    parallel_tool_calls: bool = Field(False, env="PARALLEL_TOOL_CALLS")
+    # Bind only the compact schemas of tools relevant to the detected intent
+    intent_tool_scoping: bool = Field(True, env="INTENT_TOOL_SCOPING")
+    # Model cascade: small talk and tool-result phrasing go to the fast model, tool-selecting turns to the main one
+    llm_model: str = Field("gpt-4o", env="LLM_MODEL")
+    llm_fast_model: str = Field("gpt-4o-mini", env="LLM_FAST_MODEL")
+    model_cascade_enabled: bool = Field(True, env="MODEL_CASCADE_ENABLED")
+    # Replace tool results of earlier turns with one-line summaries (state and prompt stay small)
+    tool_compaction_enabled: bool = Field(True, env="TOOL_COMPACTION_ENABLED")
+    # Deterministic router: unambiguous requests ("weather in X") call the tool without an LLM round trip
+    fast_path_enabled: bool = Field(True, env="FAST_PATH_ENABLED")
+    fast_path_threshold: float = Field(0.85, env="FAST_PATH_THRESHOLD")
+    # Full-answer cache for context-free turns, invalidated with the weather/news entries it used
+    response_cache_enabled: bool = Field(True, env="RESPONSE_CACHE_ENABLED")
+    response_cache_size: int = Field(512, env="RESPONSE_CACHE_SIZE")
+    response_cache_ttl: float = Field(600.0, env="RESPONSE_CACHE_TTL")
+
+    # Conversation checkpointer: "memory" (MemorySaver) or "sqlite" (BoundedSqliteSaver)
+    checkpointer: str = Field("memory", env="CHECKPOINTER")
+    checkpoint_db_path: str = Field("checkpoints/checkpoints.sqlite", env="CHECKPOINT_DB_PATH")
+    checkpoint_max_per_thread: int = Field(5, env="CHECKPOINT_MAX_PER_THREAD")
+    checkpoint_idle_ttl: float = Field(1800.0, env="CHECKPOINT_IDLE_TTL")  # evict from memory
+    checkpoint_retention: float = Field(7 * 24 * 3600, env="CHECKPOINT_RETENTION")  # delete from disk, 0 = never
+    checkpoint_flush_interval: float = Field(1.0, env="CHECKPOINT_FLUSH_INTERVAL")
+
+    # Build the LLM client and tool bindings in the background at startup instead of on the first request
+    prewarm: bool = Field(False, env="PREWARM")
+
+    # Instrumentation: Prometheus-style metrics (GET /metrics on server.py) and optional JSONL span traces
+    metrics_enabled: bool = Field(True, env="METRICS_ENABLED")
+    trace_file: str = Field("", env="TRACE_FILE")  # empty = no trace file
+
+    # Upstream API endpoints (overridable, e.g. to point at local stand-ins for benchmarks)
+    weather_api_url: str = Field("http://api.weatherapi.com/v1/current.json", env="WEATHER_API_URL")
+    news_api_base_url: str = Field("https://newsapi.org/v2", env="NEWS_API_BASE_URL")
+
+    # Weather cache
+    weather_cache_size: int = Field(256, env="WEATHER_CACHE_SIZE")
+    weather_update_interval: int = Field(900, env="WEATHER_UPDATE_INTERVAL")  # seconds between upstream refreshes
+    weather_cache_min_ttl: int = Field(60, env="WEATHER_CACHE_MIN_TTL")
+    weather_cache_stale_ttl: int = Field(600, env="WEATHER_CACHE_STALE_TTL")
+    weather_cache_stale_if_error: int = Field(3 * 3600, env="WEATHER_CACHE_STALE_IF_ERROR")  # last known value while WeatherAPI fails
+    # Local location index (tools/gazetteer.py) that canonicalizes locations before the upstream call
+    gazetteer_enabled: bool = Field(True, env="GAZETTEER_ENABLED")
+    gazetteer_path: str = Field("", env="GAZETTEER_PATH")  # optional GeoNames cities file (e.g. cities15000.txt)
+    gazetteer_fuzzy_threshold: int = Field(88, env="GAZETTEER_FUZZY_THRESHOLD")  # 0-100, thefuzz ratio
+    # get_weather_batch: locations per call and concurrent upstream fetches
+    weather_batch_max_locations: int = Field(10, env="WEATHER_BATCH_MAX_LOCATIONS")
+    weather_batch_concurrency: int = Field(4, env="WEATHER_BATCH_CONCURRENCY")
+
+    # News cache
+    news_cache_ttl: int = Field(600, env="NEWS_CACHE_TTL")
+    news_cache_size: int = Field(128, env="NEWS_CACHE_SIZE")
+    news_cache_max_bytes: int = Field(8 * 1024 * 1024, env="NEWS_CACHE_MAX_BYTES")
+    news_cache_stale_if_error: int = Field(6 * 3600, env="NEWS_CACHE_STALE_IF_ERROR")  # last known result while NewsAPI fails
+    # Background prefetch of the most requested weather locations / news searches (server.py)
+    prefetch_enabled: bool = Field(False, env="PREFETCH_ENABLED")
+    prefetch_interval: float = Field(30.0, env="PREFETCH_INTERVAL")  # seconds between refresh cycles
+    prefetch_top_n: int = Field(10, env="PREFETCH_TOP_N")  # hottest entries kept warm per upstream
+    prefetch_min_requests: float = Field(2.0, env="PREFETCH_MIN_REQUESTS")  # decayed request count to qualify
+    prefetch_weather_budget: int = Field(300, env="PREFETCH_WEATHER_BUDGET")  # refreshes per hour
+    prefetch_news_budget: int = Field(10, env="PREFETCH_NEWS_BUDGET")  # refreshes per hour (each fetches NEWS_FETCH_PAGES pages per query variant)
+
+    # Multi-page news search (opt-in, each extra page/variant costs a NewsAPI request):
+    # pages x query variants fetched concurrently, ranked and de-duplicated
+    news_fetch_pages: int = Field(1, env="NEWS_FETCH_PAGES")
+    news_query_variants: bool = Field(False, env="NEWS_QUERY_VARIANTS")
+    news_dedup_threshold: int = Field(85, env="NEWS_DEDUP_THRESHOLD")  # 0-100, thefuzz token_sort_ratio of titles
+    news_top_k: int = Field(10, env="NEWS_TOP_K")
+    # Projection of news results sent to the LLM
+    news_result_token_budget: int = Field(1200, env="NEWS_RESULT_TOKEN_BUDGET")
+    news_description_chars: int = Field(240, env="NEWS_DESCRIPTION_CHARS")
+
+    # Shared HTTP client (timeouts in seconds)
+    http_connect_timeout: float = Field(3.0, env="HTTP_CONNECT_TIMEOUT")
+    http_read_timeout: float = Field(10.0, env="HTTP_READ_TIMEOUT")
+    weather_connect_timeout: float = Field(3.0, env="WEATHER_CONNECT_TIMEOUT")
+    weather_read_timeout: float = Field(5.0, env="WEATHER_READ_TIMEOUT")
+    news_connect_timeout: float = Field(3.0, env="NEWS_CONNECT_TIMEOUT")
+    news_read_timeout: float = Field(10.0, env="NEWS_READ_TIMEOUT")
+    http_max_retries: int = Field(2, env="HTTP_MAX_RETRIES")
+    http_backoff_base: float = Field(0.3, env="HTTP_BACKOFF_BASE")
+    http_backoff_max: float = Field(3.0, env="HTTP_BACKOFF_MAX")
+    http_pool_size: int = Field(20, env="HTTP_POOL_SIZE")
+    http_keepalive_expiry: float = Field(30.0, env="HTTP_KEEPALIVE_EXPIRY")
+    # Client-side rate limits per upstream (requests/second, burst; rate 0 = unlimited) and circuit breaker
+    weather_rate_limit: float = Field(5.0, env="WEATHER_RATE_LIMIT")
+    weather_rate_burst: int = Field(10, env="WEATHER_RATE_BURST")
+    news_rate_limit: float = Field(0.5, env="NEWS_RATE_LIMIT")
+    news_rate_burst: int = Field(8, env="NEWS_RATE_BURST")
+    rate_limit_max_wait: float = Field(2.0, env="RATE_LIMIT_MAX_WAIT")  # longer waits fail fast instead
+    breaker_failure_threshold: int = Field(5, env="BREAKER_FAILURE_THRESHOLD")  # consecutive failures; 0 = off
+    breaker_reset_timeout: float = Field(30.0, env="BREAKER_RESET_TIMEOUT")  # seconds open before a probe
+
+    # Network server (server.py)
+    server_host: str = Field("127.0.0.1", env="SERVER_HOST")
+    server_port: int = Field(8000, env="SERVER_PORT")
+    server_max_workers: int = Field(64, env="SERVER_MAX_WORKERS")  # concurrent graph runs
+    server_session_queue_size: int = Field(4, env="SERVER_SESSION_QUEUE_SIZE")
+    server_max_sessions: int = Field(1000, env="SERVER_MAX_SESSIONS")
+    server_session_idle_ttl: float = Field(900.0, env="SERVER_SESSION_IDLE_TTL")
+    server_request_timeout: float = Field(120.0, env="SERVER_REQUEST_TIMEOUT")
+    server_shutdown_timeout: float = Field(30.0, env="SERVER_SHUTDOWN_TIMEOUT")
+
+    # Batch runner (batch.py)
+    batch_concurrency: int = Field(8, env="BATCH_CONCURRENCY")  # conversations in flight
+    batch_turn_timeout: float = Field(120.0, env="BATCH_TURN_TIMEOUT")
 
     class Config:
         env_file = ".env"
@@ -25,8 +134,32 @@ def load_keys() -> keys:
         return settings
     except ValidationError as e:
         logger.error(f"Failed to load Keys. Missing or invalid environment variables.{e}")
-    
+        raise
+
+
+class LazySettings:
+    """
+    Process-wide settings, loaded and validated by `load_keys` on the first attribute
+    access instead of on import. Attribute reads and writes go to the loaded `keys`.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_settings", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self) -> keys:
+        if self._settings is None:
+            with self._lock:
+                if self._settings is None:
+                    object.__setattr__(self, "_settings", load_keys())
+        return self._settings
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
 
 
-# Initialize once and reuse
-keys_settings = load_keys()
+# Initialize once (on first use) and reuse
+keys_settings = LazySettings()
@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+#local imports
+from api_import import keys_settings
+from utils.uLogger import logger
+from utils.http_client import get_http_client
+from utils.log_helper import log_messages
+from utils.metrics import percentiles
+
+# Fields an input record may carry its conversation id in, in order of preference
+ID_FIELDS = ("id", "request_id", "thread_id")
+PROGRESS_EVERY = 50
+
+
+class Conversation(NamedTuple):
+    id: str
+    turns: List[str]
+
+
+def conversation_from_record(record: Dict[str, Any], line_no: int) -> Conversation:
+    """
+    Build a conversation from one input record. The user turns come from one of:
+    - "messages": a list of strings or {"role", "content"} dicts (non-user entries are skipped),
+    - "prompt": a single message,
+    - "title"/"body": one message made of both (the format of requests.jsonl).
+    The id is the first of ID_FIELDS present, else "line-<n>".
+    """
+    conversation_id = next((str(record[f]) for f in ID_FIELDS if record.get(f) not in (None, "")), f"line-{line_no}")
+    if isinstance(record.get("messages"), list):
+        turns = [
+            m if isinstance(m, str) else str(m.get("content", ""))
+            for m in record["messages"]
+            if isinstance(m, str) or (isinstance(m, dict) and m.get("role", "user") in ("user", "human"))
+        ]
+    elif record.get("prompt"):
+        turns = [str(record["prompt"])]
+    else:
+        turns = ["\n\n".join(str(record[f]) for f in ("title", "body") if record.get(f))]
+    turns = [t.strip() for t in turns if t and t.strip()]
+    if not turns:
+        raise ValueError("no user message (expected messages, prompt or title/body)")
+    return Conversation(conversation_id, turns)
+
+
+def read_conversations(path: str, stats: Dict[str, int]) -> Iterator[Conversation]:
+    """Stream conversations from a JSONL file; malformed lines are logged and counted as invalid."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("not a JSON object")
+                yield conversation_from_record(record, line_no)
+            except ValueError as e:
+                stats["invalid"] += 1
+                logger.warning(f"[BATCH] Skipping line {line_no} of {path}: {e}")
+
+
+def load_completed(path: str) -> Set[str]:
+    """
+    Ids with an "ok" record in an earlier run's output. A partial last line left by a
+    crash is cut off so new records start on a fresh line; failed conversations are
+    run again (their newer record supersedes the error).
+    """
+    if not os.path.exists(path):
+        return set()
+    completed = set()
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(offset)
+                logger.warning(f"[BATCH] Removed a partial record at the end of {path}")
+                break
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(str(record["id"]))
+    return completed
+
+
+def _tools_called(messages: Sequence[BaseMessage]) -> List[str]:
+    """Tool names called since the last user message."""
+    start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    return [call["name"] for m in messages[start + 1:] if isinstance(m, AIMessage) for call in m.tool_calls]
+
+
+class BatchRunner:
+    """
+    Runs conversations through one compiled graph, `concurrency` conversations at a time.
+
+    Turns of a conversation run in order on its own thread_id; every finished conversation
+    is appended to the output file as one JSON line and flushed, so a crashed or interrupted
+    job loses at most the conversations in flight and resumes from the output file. Threads
+    are dropped from the checkpointer once written, keeping memory flat over long jobs.
+    """
+
+    def __init__(self, graph, checkpointer, output, concurrency: int, turn_timeout: float):
+        self.graph = graph
+        self.checkpointer = checkpointer
+        self.output = output
+        self.concurrency = max(1, concurrency)
+        self.turn_timeout = turn_timeout
+        self.run_id = uuid.uuid4().hex[:8]  # a retried conversation never sees a crashed run's history
+        self.turn_latencies: List[float] = []
+        self.conversation_latencies: List[float] = []
+        self.stats = {"ok": 0, "errors": 0, "turns": 0}
+
+    async def run_conversation(self, conversation: Conversation) -> Dict[str, Any]:
+        thread_id = f"batch-{self.run_id}-{conversation.id}"
+        config = {"configurable": {"thread_id": thread_id}}
+        turns, error = [], None
+        started = time.perf_counter()
+        try:
+            for prompt in conversation.turns:
+                turn_started = time.perf_counter()
+                result = await asyncio.wait_for(
+                    self.graph.ainvoke({"messages": [HumanMessage(content=prompt)]}, config), self.turn_timeout
+                )
+                elapsed = time.perf_counter() - turn_started
+                self.turn_latencies.append(elapsed)
+                log_messages(result["messages"], thread_id, {"turn_ms": round(elapsed * 1000, 1)})
+                turns.append({
+                    "prompt": prompt,
+                    "response": result["messages"][-1].content,
+                    "tools": _tools_called(result["messages"]),
+                    "elapsed": round(elapsed, 3),
+                })
+        except asyncio.TimeoutError:
+            error = f"Turn {len(turns) + 1} timed out after {self.turn_timeout:g}s"
+        except Exception as e:
+            error = f"Error during chatbot invoke: {e}"
+        finally:
+            if hasattr(self.checkpointer, "delete_thread"):
+                self.checkpointer.delete_thread(thread_id)
+
+        elapsed = time.perf_counter() - started
+        self.stats["turns"] += len(turns)
+        if error is None:
+            self.stats["ok"] += 1
+            self.conversation_latencies.append(elapsed)
+        else:
+            self.stats["errors"] += 1
+            logger.error(f"[BATCH] Conversation {conversation.id} failed: {error}")
+        record = {
+            "id": conversation.id,
+            "thread_id": thread_id,
+            "status": "ok" if error is None else "error",
+            "turns": turns,
+            "elapsed": round(elapsed, 3),
+        }
+        if error is not None:
+            record["error"] = error
+        return record
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.output.flush()
+
+    async def run(self, conversations: Iterator[Conversation]) -> float:
+        """Run every conversation; returns the wall time in seconds."""
+        queue: "asyncio.Queue[Optional[Conversation]]" = asyncio.Queue(maxsize=2 * self.concurrency)
+        started = time.perf_counter()
+
+        async def worker():
+            while True:
+                conversation = await queue.get()
+                if conversation is None:
+                    return
+                self._write(await self.run_conversation(conversation))
+                done = self.stats["ok"] + self.stats["errors"]
+                if done % PROGRESS_EVERY == 0:
+                    rate = done / (time.perf_counter() - started)
+                    logger.info(f"[BATCH] {done} conversations done ({self.stats['errors']} failed), {rate:.2f}/s")
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            # The input is read lazily: at most 2x concurrency conversations wait in memory
+            for conversation in conversations:
+                await queue.put(conversation)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return time.perf_counter() - started
+
+
+def pending(conversations: Iterator[Conversation], completed: Set[str], stats: Dict[str, int]) -> Iterator[Conversation]:
+    """Drop conversations answered by an earlier run and repeated ids."""
+    seen = set()
+    for conversation in conversations:
+        if conversation.id in completed:
+            stats["skipped"] += 1
+        elif conversation.id in seen:
+            stats["invalid"] += 1
+            logger.warning(f"[BATCH] Duplicate conversation id {conversation.id!r}, skipped")
+        else:
+            seen.add(conversation.id)
+            yield conversation
+
+
+def summarize(runner: BatchRunner, wall: float, stats: Dict[str, int], chatbot) -> Dict[str, Any]:
+    finished = runner.stats["ok"] + runner.stats["errors"]
+    return {
+        "conversations": finished,
+        "ok": runner.stats["ok"],
+        "errors": runner.stats["errors"],
+        "skipped_completed": stats["skipped"],
+        "invalid": stats["invalid"],
+        "turns": runner.stats["turns"],
+        "concurrency": runner.concurrency,
+        "wall_seconds": round(wall, 3),
+        "conversations_per_second": round(finished / wall, 3) if wall else 0.0,
+        "turns_per_second": round(runner.stats["turns"] / wall, 3) if wall else 0.0,
+        "turn_latency_ms": percentiles(runner.turn_latencies),
+        "conversation_latency_ms": percentiles(runner.conversation_latencies),
+        "fast_path_rate": round(chatbot.router.fast_path_rate(), 3),
+        "response_cache_hit_rate": round(chatbot.response_cache.stats()["hit_rate"], 3),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of conversations through the chatbot concurrently (resumable)"
+    )
+    parser.add_argument("input", help="JSONL file, one conversation per line (messages, prompt or title/body)")
+    parser.add_argument("output", help="JSONL results file; conversations already answered in it are skipped")
+    parser.add_argument("--concurrency", type=int, default=keys_settings.batch_concurrency,
+                        help="conversations run at the same time")
+    parser.add_argument("--turn-timeout", type=float, default=keys_settings.batch_turn_timeout,
+                        help="seconds before a turn (and its conversation) counts as failed")
+    parser.add_argument("--restart", action="store_true", help="discard the output file instead of resuming from it")
+    parser.add_argument("--summary", help="also write the throughput/latency summary to this JSON file")
+    return parser.parse_args(argv)
+
+
+async def run_batch(args, chatbot, graph, checkpointer) -> Dict[str, Any]:
+    stats = {"skipped": 0, "invalid": 0}
+    completed = set() if args.restart else load_completed(args.output)
+    if completed:
+        logger.info(f"[BATCH] Resuming: {len(completed)} conversations already answered in {args.output}")
+
+    with open(args.output, "w" if args.restart else "a", encoding="utf-8") as output:
+        runner = BatchRunner(graph, checkpointer, output, args.concurrency, args.turn_timeout)
+        logger.info(f"[BATCH] Running {args.input} -> {args.output} with concurrency={runner.concurrency}")
+        try:
+            wall = await runner.run(pending(read_conversations(args.input, stats), completed, stats))
+        finally:
+            await get_http_client().aclose()
+    return summarize(runner, wall, stats, chatbot)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from agent import Chatbot
+
+    chatbot = Chatbot()
+    checkpointer = chatbot.create_checkpointer()
+    graph = chatbot.create_graph(checkpointer)
+    chatbot.prewarm()  # before the clock starts, so the first conversations don't pay for it
+
+    try:
+        summary = asyncio.run(run_batch(args, chatbot, graph, checkpointer))
+    finally:
+        if hasattr(checkpointer, "close"):
+            checkpointer.close()
+
+    logger.info(f"[BATCH] Summary: {summary}")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
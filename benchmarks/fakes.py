@@ -0,0 +1,197 @@
+# Offline stand-ins for the chat model and the upstream HTTP APIs used by the benchmarks.
+
+# Standard library imports
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Third-party imports
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CITIES = ["London", "Paris", "Dubai", "Tokyo", "New York", "Berlin", "Karachi", "Sydney", "Toronto", "Madrid"]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model that behaves like the real one at the graph level: on a user
+    message it requests `get_weather` for a known city mentioned (`get_weather_batch` for
+    several), `search_news` for news questions, or answers directly; after tool results it
+    writes a short answer.
+    Every call sleeps `latency` seconds, and streamed answers emit one chunk per word.
+    """
+
+    model_name: str = "scripted-fake"
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        last = messages[-1]
+        usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        if isinstance(last, HumanMessage):
+            text = str(last.content).lower()
+            calls = []
+            if "weather" in text or "temperature" in text:
+                cities = [city for city in CITIES if city.lower() in text]
+                if len(cities) > 1:
+                    calls.append({"name": "get_weather_batch", "args": {"locations": cities}, "id": f"call_{self.calls}_batch"})
+                elif cities:
+                    calls.append({"name": "get_weather", "args": {"location": cities[0]}, "id": f"call_{self.calls}_{cities[0]}"})
+            if "headlines" in text:
+                calls.append({"name": "search_news", "args": {"top_headlines": True}, "id": f"call_{self.calls}_news"})
+            elif "news" in text:
+                query = text.replace("news", "").replace("about", "").strip() or "technology"
+                calls.append({"name": "search_news", "args": {"query": query}, "id": f"call_{self.calls}_news"})
+            if calls:
+                return AIMessage(content="", tool_calls=calls, usage_metadata=usage)
+            return AIMessage(content="Happy to help with weather or news questions.", usage_metadata=usage)
+
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        summary = "; ".join(str(m.content)[:60] for m in results[-3:])
+        return AIMessage(content=f"Here is what I found: {summary}", usage_metadata=usage)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        message = self._reply(messages)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(message.tool_calls)
+                ],
+            ))
+            return
+        for word in message.content.split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def _weather_payload(query: str) -> Dict[str, Any]:
+    return {
+        "location": {"name": query.title(), "region": "", "country": "Benchland"},
+        "current": {
+            "temp_c": 20.0 + len(query) % 10,
+            "condition": {"text": "Sunny"},
+            "last_updated": time.strftime("%Y-%m-%d %H:%M"),
+            "last_updated_epoch": int(time.time()) - 60,
+            "humidity": 40,
+            "wind_kph": 12.0,
+        },
+    }
+
+
+HEADLINE_TOPICS = [
+    "markets rally after earnings beat", "regulators open inquiry", "new product launch draws crowds",
+    "supply chain delays ease", "analysts cut forecasts", "talks resume between rivals",
+    "record heat hits the region", "court rules on appeal", "startup raises fresh funding",
+    "officials unveil infrastructure plan", "shares slide on weak guidance", "union reaches tentative deal",
+]
+
+
+def _news_payload(query: str, page: int = 1) -> Dict[str, Any]:
+    # Later pages overlap earlier ones (one copy under a wire-service suffix), like syndicated stories in NewsAPI
+    articles = [
+        {
+            "source": {"id": None, "name": f"Source {i}"},
+            "author": "Bench Reporter",
+            "title": f"{query or 'Top story'}: {HEADLINE_TOPICS[(i + (page - 1) * 5) % len(HEADLINE_TOPICS)]}"
+            + (" - Wire" if page > 1 and i == 0 else ""),
+            "description": "Synthetic article used by the offline benchmarks. " * 4,
+            "url": f"https://news.example/{page}/{i}",
+            "publishedAt": "2025-01-01T00:00:00Z",
+            "content": "Lorem ipsum dolor sit amet. " * 20,
+        }
+        for i in range(10)
+    ]
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+
+class StubApiServer:
+    """
+    Local HTTP stand-in for api.weatherapi.com (`/v1/current.json`) and newsapi.org
+    (`/v2/top-headlines`, `/v2/everything`) that answers after `latency` seconds.
+    `queries` records the `q` parameter of every request; setting `status` to an error
+    code makes every request fail with it (for outage tests).
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self.queries: List[str] = []
+        self.status = 200
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                parts = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                stub.queries.append(params.get("q", ""))
+                if stub.status != 200:
+                    self.send_response(stub.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if parts.path.endswith("/current.json"):
+                    body = _weather_payload(params.get("q", ""))
+                elif parts.path.endswith(("/top-headlines", "/everything")):
+                    body = _news_payload(params.get("q", ""), int(params.get("page", 1)))
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubApiServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,369 @@
+"""
+Offline benchmark suite for the chatbot graph.
+
+Drives `Chatbot.create_graph()` with a scripted fake chat model and a local HTTP
+stand-in for WeatherAPI/NewsAPI (benchmarks/fakes.py), so no API quota is used.
+Reports turn latency percentiles, per-node and per-tool timings, graph overhead,
+memory growth over a long conversation, throughput at several concurrency levels
+and the location gazetteer's load cost and lookup latency, and writes everything
+to a JSON file for comparison across commits.
+
+Run from the project root:
+    python -m benchmarks.run_benchmarks --llm-latency 0.05 --api-latency 0.02
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+# Third-party imports
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+# Local imports
+from benchmarks.fakes import CITIES, ScriptedChatModel, StubApiServer
+from utils.metrics import percentiles
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def conversation_script(index: int) -> List[str]:
+    """A short, varied conversation; `index` rotates cities so caches see both hits and misses."""
+    city = CITIES[index % len(CITIES)]
+    other = CITIES[(index + 3) % len(CITIES)]
+    return [
+        f"weather in {city}",
+        f"What's the weather in {other} with humidity?",
+        "top headlines",
+        "news about electric cars",
+        "thanks, that's all",
+    ]
+
+
+# Location strings by lookup path through tools/gazetteer.py
+GAZETTEER_QUERIES = {
+    "exact": ["London", "Tokyo", "Karachi", "Berlin", "Toronto"],
+    "alias": ["NYC", "Bombay", "Peking", "Saigon", "Kiev"],
+    "city_country": ["Paris, France", "Dubai, UAE", "Sydney, Australia", "Lahore, Pakistan"],
+    "misspelled": ["Karachii", "Sao Paolo", "Munchen", "Barcelonna", "Amsterdm"],
+    "unknown": ["Springfield", "Nowhereville", "Japan", "London, Ontario"],
+}
+
+
+class TimingCallback(BaseCallbackHandler):
+    """Collects wall time of every graph node run and every tool run from LangChain callbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[Any, Any] = {}
+        self._graph_runs: set = set()
+        self.nodes: Dict[str, List[float]] = defaultdict(list)
+        self.tools: Dict[str, List[float]] = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_runs.add(run_id)
+            # Only the node tasks of the graph run, not the runnables nested inside them
+            elif node and parent_run_id in self._graph_runs:
+                self._starts[run_id] = ("node", node, time.perf_counter())
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        with self._lock:
+            self._starts[run_id] = ("tool", name, time.perf_counter())
+
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started is None:
+                return
+            kind, name, t0 = started
+            (self.nodes if kind == "node" else self.tools)[name].append(time.perf_counter() - t0)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+        with self._lock:
+            self._graph_runs.discard(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+        with self._lock:
+            self._graph_runs.discard(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def total(self) -> float:
+        return sum(sum(v) for v in self.nodes.values())
+
+
+def bench_latency(graph, conversations: int) -> Dict[str, Any]:
+    """Sequential turns over `conversations` scripted threads: latency, node/tool timings, overhead."""
+    timer = TimingCallback()
+    latencies, overheads = [], []
+    for i in range(conversations):
+        config = {"configurable": {"thread_id": f"latency-{i}"}, "callbacks": [timer]}
+        for prompt in conversation_script(i):
+            before = timer.total()
+            t0 = time.perf_counter()
+            graph.invoke({"messages": [HumanMessage(content=prompt)]}, config)
+            elapsed = time.perf_counter() - t0
+            latencies.append(elapsed)
+            # Time spent outside node bodies: scheduling, channel updates, checkpoint writes
+            overheads.append(max(0.0, elapsed - (timer.total() - before)))
+
+    return {
+        "turn_latency": percentiles(latencies),
+        "graph_overhead_per_turn": percentiles(overheads),
+        "nodes": {name: percentiles(v) for name, v in sorted(timer.nodes.items())},
+        "tools": {name: percentiles(v) for name, v in sorted(timer.tools.items())},
+    }
+
+
+def bench_memory(graph, turns: int, sample_every: int) -> Dict[str, Any]:
+    """Python heap (tracemalloc) while one conversation grows to `turns` turns."""
+    config = {"configurable": {"thread_id": f"memory-{uuid.uuid4().hex[:8]}"}}
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    samples = []
+    for turn in range(1, turns + 1):
+        prompt = conversation_script(turn)[turn % 5]
+        graph.invoke({"messages": [HumanMessage(content=prompt)]}, config)
+        if turn % sample_every == 0 or turn == turns:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append({"turn": turn, "heap_kb": round((current - base) / 1024, 1)})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    state = graph.get_state(config).values
+    growth = samples[-1]["heap_kb"] - samples[0]["heap_kb"] if len(samples) > 1 else 0.0
+    span = samples[-1]["turn"] - samples[0]["turn"] if len(samples) > 1 else 1
+    return {
+        "turns": turns,
+        "samples": samples,
+        "peak_heap_kb": round((peak - base) / 1024, 1),
+        "growth_kb_per_turn": round(growth / span, 2),
+        "messages_in_state": len(state.get("messages", [])),
+    }
+
+
+def bench_gazetteer(repeat: int = 200) -> Dict[str, Any]:
+    """Load time and heap of the location index, and per-lookup latency by lookup path (memo bypassed)."""
+    from api_import import keys_settings
+    from tools.gazetteer import load_gazetteer
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    gazetteer = load_gazetteer(keys_settings.gazetteer_path, keys_settings.gazetteer_fuzzy_threshold)
+    load_s = time.perf_counter() - t0
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lookups = {}
+    for kind, queries in GAZETTEER_QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            for query in queries:
+                t0 = time.perf_counter()
+                gazetteer._resolve(query)
+                timings.append(time.perf_counter() - t0)
+        lookups[kind] = percentiles(timings)
+
+    memoized = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        gazetteer.resolve("London")
+        memoized.append(time.perf_counter() - t0)
+
+    return {
+        "places": len(gazetteer),
+        "names": gazetteer.index_size,
+        "load_ms": round(load_s * 1000, 3),
+        "heap_kb": round(heap / 1024, 1),
+        "index_kb": round(gazetteer.memory_bytes() / 1024, 1),
+        "lookup": lookups,
+        "memoized_lookup": percentiles(memoized),
+    }
+
+
+async def _bench_concurrency(graph, threads: int, turns_per_thread: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    async def conversation(index: int):
+        config = {"configurable": {"thread_id": f"throughput-{threads}-{index}"}}
+        script = conversation_script(index)
+        for turn in range(turns_per_thread):
+            t0 = time.perf_counter()
+            await graph.ainvoke({"messages": [HumanMessage(content=script[turn % len(script)])]}, config)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(threads)))
+    wall = time.perf_counter() - t0
+    return {
+        "threads": threads,
+        "turns": len(latencies),
+        "wall_s": round(wall, 3),
+        "turns_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "turn_latency": percentiles(latencies),
+    }
+
+
+def bench_throughput(graph, levels: Sequence[int], turns_per_thread: int) -> List[Dict[str, Any]]:
+    return [asyncio.run(_bench_concurrency(graph, n, turns_per_thread)) for n in levels]
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable percentage changes of the headline numbers against a baseline run."""
+
+    def change(new, old) -> str:
+        if not old or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    lines = [f"vs baseline {baseline.get('meta', {}).get('git_commit')}:"]
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        new, old = results["turn_latency"].get(key), baseline.get("turn_latency", {}).get(key)
+        lines.append(f"  turn latency {key}: {old} -> {new} ({change(new, old)})")
+    old_rows = {row["threads"]: row for row in baseline.get("throughput", [])}
+    for row in results["throughput"]:
+        old = old_rows.get(row["threads"], {}).get("turns_per_s")
+        lines.append(f"  {row['threads']} threads turns/s: {old} -> {row['turns_per_s']} ({change(row['turns_per_s'], old)})")
+    return lines
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline chatbot benchmarks (fake LLM + local stand-in APIs)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--fast-llm-latency", type=float, default=0.02, help="seconds per fake fast-tier LLM call")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="seconds per stand-in API request")
+    parser.add_argument("--conversations", type=int, default=20, help="scripted conversations for latency")
+    parser.add_argument("--long-turns", type=int, default=200, help="turns in the memory-growth conversation")
+    parser.add_argument("--sample-every", type=int, default=25, help="memory sample interval in turns")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated thread counts for throughput")
+    parser.add_argument("--turns-per-thread", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="disable the weather/news/response caches")
+    parser.add_argument("--log", action="store_true", help="keep application logging on (off by default)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare latency and throughput against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stub = StubApiServer(latency=args.api_latency).start()
+
+    # Settings are read at import time, so point the tools at the stand-ins before importing them.
+    os.environ["WEATHER_API_URL"] = f"{stub.base_url}/v1/current.json"
+    os.environ["NEWS_API_BASE_URL"] = f"{stub.base_url}/v2"
+    for key in ("OPENAI_API_KEY", "WEATHER_API_KEY", "NEWS_API_KEY"):
+        os.environ[key] = os.environ.get(key) or "benchmark"
+    # The stand-ins have no quota to protect, so client-side rate limits would only skew throughput
+    os.environ.setdefault("WEATHER_RATE_LIMIT", "0")
+    os.environ.setdefault("NEWS_RATE_LIMIT", "0")
+    if args.cold:
+        os.environ.update({"WEATHER_CACHE_SIZE": "0", "NEWS_CACHE_SIZE": "0", "RESPONSE_CACHE_ENABLED": "false"})
+
+    from agent import Chatbot
+    from utils.uLogger import logger
+    from tools.news_tool import news_cache
+    from tools.weather_tool import weather_cache
+    from utils.metrics import metrics
+
+    if not args.log:
+        logger.setLevel(logging.WARNING)
+
+    llm = ScriptedChatModel(latency=args.llm_latency)
+    fast_llm = ScriptedChatModel(latency=args.fast_llm_latency, model_name="scripted-fake-fast")
+    bot = Chatbot(llm=llm, fast_llm=fast_llm)
+    graph = bot.create_graph()
+    levels = [int(n) for n in args.concurrency.split(",") if n.strip()]
+
+    print(f"Latency: {args.conversations} conversations ...", file=sys.stderr)
+    latency = bench_latency(graph, args.conversations)
+    print(f"Memory: {args.long_turns}-turn conversation ...", file=sys.stderr)
+    memory = bench_memory(graph, args.long_turns, args.sample_every)
+    print(f"Throughput: {levels} concurrent threads ...", file=sys.stderr)
+    throughput = bench_throughput(graph, levels, args.turns_per_thread)
+    stub.stop()
+    print("Gazetteer: load and lookups ...", file=sys.stderr)
+    gazetteer = bench_gazetteer()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        **latency,
+        "memory": memory,
+        "throughput": throughput,
+        "gazetteer": gazetteer,
+        "counters": {
+            "llm_calls": llm.calls + fast_llm.calls,
+            "llm_calls_fast": fast_llm.calls,
+            "upstream_requests": stub.requests,
+            "fast_path": bot.router.stats.fast_path,
+            "router_total": bot.router.stats.total,
+        },
+        "caches": {
+            "weather": weather_cache.stats(),
+            "news": news_cache.stats(),
+            "responses": bot.response_cache.stats(),
+        },
+        "metrics": metrics.snapshot(),
+    }
+
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{results['meta']['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    turn = latency["turn_latency"]
+    print(f"turn latency p50={turn['p50_ms']}ms p95={turn['p95_ms']}ms p99={turn['p99_ms']}ms")
+    for row in throughput:
+        print(f"{row['threads']:>4} threads: {row['turns_per_s']} turns/s, p95={row['turn_latency']['p95_ms']}ms")
+    print(f"memory growth {memory['growth_kb_per_turn']} KB/turn over {memory['turns']} turns")
+    print(
+        f"gazetteer {gazetteer['places']} places, load {gazetteer['load_ms']}ms, heap {gazetteer['heap_kb']} KB, "
+        f"fuzzy lookup p95={gazetteer['lookup']['misspelled']['p95_ms']}ms"
+    )
+    print(f"results written to {output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            print("\n".join(compare(results, json.load(f))))
+    return results
+
+
+if __name__ == "__main__":
+    main()
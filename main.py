@@ -1,47 +1,229 @@
+import time
+PROCESS_START = time.perf_counter()
+
 from api_import import keys_settings
 from utils.uLogger import logger
-from agent import Chatbot
 from langchain_core.messages import HumanMessage
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from utils.log_helper import log_messages
+from utils.stream_helper import stream_turn, astream_turn
+import argparse
+import asyncio
 import datetime
+import threading
 
-if __name__ == "__main__":
-    
-    chatbot = Chatbot()
-    graph = chatbot.create_graph()
-    logger.info("Chatbot initialized and ready!")
-    
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TechGenies chatbot")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Drive the graph with ainvoke (async LLM and tool calls)")
+    parser.add_argument("--parallel-tools", action="store_true",
+                        help="Allow several tool calls per LLM turn, executed concurrently")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print response tokens and tool progress as they are produced")
+    parser.add_argument("--prewarm", action="store_true", default=None,
+                        help="Build the LLM client and tool bindings in the background before the first message")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import and initialization cost per module, then exit")
+    return parser.parse_args()
+
+
+def profile_startup(parallel_tools: bool) -> None:
+    from utils.startup_profile import profile_imports, format_report, timed
+
+    rows = profile_imports("agent")
+    from agent import Chatbot  # in this process, for the init timings below
+
+    holder = {}
+    init = timed([
+        ("Chatbot()", lambda: holder.setdefault("bot", Chatbot(parallel_tool_calls=True if parallel_tools else None))),
+        ("create_graph()", lambda: holder["bot"].create_graph()),
+    ])
+    prewarm = holder["bot"].prewarm()
+    report = format_report(rows, init, prewarm)
+    logger.info(f"[STARTUP] Startup profile:\n{report}")
+    print(report)
+
+
+class StreamPrinter:
+    """Prints streamed events to the terminal and records time-to-first-token."""
+
+    def __init__(self, start_time: datetime.datetime):
+        self.start_time = start_time
+        self.first_token_time = None
+        self.printed_header = False
+
+    def handle(self, event) -> None:
+        if event["type"] == "tool_call":
+            print(f"[calling {event['name']}({event['args']})]", flush=True)
+        elif event["type"] == "tool_result":
+            print(f"[{event['name']} finished: {event['status']}]", flush=True)
+        elif event["type"] == "token":
+            if self.first_token_time is None:
+                self.first_token_time = datetime.datetime.now()
+                logger.info(f"Time to first token: {self.first_token_time - self.start_time}")
+            if not self.printed_header:
+                print("================================== Chatbot Response==============================")
+                print("Chatbot Response: ", end="", flush=True)
+                self.printed_header = True
+            print(event["text"], end="", flush=True)
+
+    def finish(self, result) -> None:
+        if self.printed_header:
+            print()
+        else:
+            # Nothing was streamed (e.g. a non-streaming model); print the final answer.
+            print("================================== Chatbot Response==============================")
+            print(f"Chatbot Response: {result['messages'][-1].content}")
+
+
+def run_turn(graph, state, config, stream: bool, start_time: datetime.datetime):
+    if not stream:
+        result = graph.invoke(state, config)
+        print("================================== Chatbot Response==============================")
+        print(f"Chatbot Response: {result['messages'][-1].content}")
+        return result
+
+    printer = StreamPrinter(start_time)
+    for event in stream_turn(graph, state, config):
+        if event["type"] == "done":
+            result = event["state"]
+        else:
+            printer.handle(event)
+    printer.finish(result)
+    return result
+
+
+async def arun_turn(graph, state, config, stream: bool, start_time: datetime.datetime):
+    if not stream:
+        result = await graph.ainvoke(state, config)
+        print("================================== Chatbot Response==============================")
+        print(f"Chatbot Response: {result['messages'][-1].content}")
+        return result
+
+    printer = StreamPrinter(start_time)
+    async for event in astream_turn(graph, state, config):
+        if event["type"] == "done":
+            result = event["state"]
+        else:
+            printer.handle(event)
+    printer.finish(result)
+    return result
+
+
+def read_message() -> str:
+    print("================== Please enter you Message for the Chatbot ========================= ")
+    return input("You: ")
+
+
+def is_exit(user_input: str) -> bool:
+    if user_input.lower() in ["exit", "quit"]:
+        logger.info("User ended the session.")
+        print("Goodbye! See you again")
+        return True
+    return False
+
+
+def begin_turn(state, user_input: str) -> datetime.datetime:
+    start_time = datetime.datetime.now()
+    logger.info(f"User request started at: {start_time}")
+    state["messages"].append(HumanMessage(content=user_input))
+    return start_time
+
+
+def finish_turn(result, config, start_time: datetime.datetime) -> None:
+    end_time = datetime.datetime.now()
+    logger.info(f"Agent response completed at: {end_time}")
+    logger.info(f"Total response time: {end_time - start_time}")
+    log_messages(
+        result["messages"],
+        config["configurable"]["thread_id"],
+        {"turn_ms": round((end_time - start_time).total_seconds() * 1000, 1)},
+    )
+    logger.info(f"State updated, total messages now: {len(result['messages'])}")
+
+
+def chat_loop(graph, config, stream: bool):
+    """Sync path: graph.invoke/stream run on this thread, no event loop involved."""
     state = {"messages": []}
-    config = {"configurable": {"thread_id": "1"}}
-    logger.info(f"Using config: {config}")
 
     while True:
-        print("================== Please enter you Message for the Chatbot ========================= ")
-        user_input = input("You: ")
-        if user_input.lower() in ["exit", "quit"]:
-            logger.info("User ended the session.")
-            print("Goodbye! See you again")
+        user_input = read_message()
+        if is_exit(user_input):
             break
 
-        start_time = datetime.datetime.now()
-        logger.info(f"User request started at: {start_time}")
-        state["messages"].append(HumanMessage(content=user_input))
-        
+        start_time = begin_turn(state, user_input)
         try:
-            result = graph.invoke(state, config)
-            response = result["messages"][-1].content
-            end_time = datetime.datetime.now()
-            logger.info(f"Agent response completed at: {end_time}")
-            logger.info(f"Total response time: {end_time - start_time}")
-            log_messages(result["messages"])
-            print(f"================================== Chatbot Response==============================")
-            print(f"Chatbot Response: {response}")
-
+            result = run_turn(graph, state, config, stream, start_time)
+            finish_turn(result, config, start_time)
             # Update state with new messages
             state = result
-            logger.info(f"State updated, total messages now: {len(state['messages'])}")
+        except Exception as e:
+            logger.error(f"Error during chatbot invoke: {e}")
+            print(f"Error during chatbot invoke: {e}")
+
+
+async def achat_loop(graph, config, stream: bool):
+    """Async path (--async): the graph runs with ainvoke/astream; input is read off the event loop."""
+    from utils.http_client import get_http_client
+
+    try:
+        await _achat_loop(graph, config, stream)
+    finally:
+        # The tools' AsyncClient is bound to this loop: close its connections before the loop ends
+        await get_http_client().aclose()
 
+
+async def _achat_loop(graph, config, stream: bool):
+    state = {"messages": []}
+
+    while True:
+        user_input = await asyncio.to_thread(read_message)
+        if is_exit(user_input):
+            break
+
+        start_time = begin_turn(state, user_input)
+        try:
+            result = await arun_turn(graph, state, config, stream, start_time)
+            finish_turn(result, config, start_time)
+            # Update state with new messages
+            state = result
         except Exception as e:
             logger.error(f"Error during chatbot invoke: {e}")
-            print(f"Error during chatbot invoke: {e}")
\ No newline at end of file
+            print(f"Error during chatbot invoke: {e}")
+
+
+def main():
+    args = parse_args()
+    if args.profile_startup:
+        profile_startup(args.parallel_tools)
+        return
+
+    # Imported here so --profile-startup can measure it and --help stays instant
+    from agent import Chatbot
+
+    chatbot = Chatbot(parallel_tool_calls=True if args.parallel_tools else None)
+    checkpointer = chatbot.create_checkpointer()
+    graph = chatbot.create_graph(checkpointer)
+    logger.info(f"Chatbot initialized and ready in {time.perf_counter() - PROCESS_START:.3f}s")
+
+    prewarm = keys_settings.prewarm if args.prewarm is None else args.prewarm
+    if prewarm:
+        # Overlaps the LLM client setup with the user typing the first message
+        threading.Thread(target=chatbot.prewarm, name="prewarm", daemon=True).start()
+
+    config = {"configurable": {"thread_id": "1"}}
+    logger.info(f"Using config: {config}")
+
+    try:
+        if args.use_async:
+            asyncio.run(achat_loop(graph, config, args.stream))
+        else:
+            chat_loop(graph, config, args.stream)
+    finally:
+        # Flushes checkpoint writes still queued by the SQLite checkpointer
+        if hasattr(checkpointer, "close"):
+            checkpointer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,171 @@
 # Prompt Configuration Management
-# Handles prompt versioning, A/B testing, and environment-specific prompts
-
-from typing import Dict, Any, Optional
-from prompts import (
-    get_conversational_system_prompt,
-    get_weather_system_prompt,
-    get_news_system_prompt,
-    get_error_handling_prompt
+# Handles prompt versioning, environment-specific prompts and the tool-schema registry
+# used to bind only the tools relevant to the current user intent.
+
+import copy
+import os
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+PROMPTS_DIR = "prompts"
+
+# prompt_type -> file name in PROMPTS_DIR ("latest" version). A specific version
+# "v2" is read from "<stem>_v2.txt" next to it.
+PROMPT_FILES = {
+    "conversational": "chatbot_prompt.txt",
+}
+
+# Cheap keyword rules for intent detection on the latest user message.
+INTENT_PATTERNS = {
+    "weather": re.compile(
+        r"\b(weather|temperature|temp|forecast|rain\w*|snow\w*|sunny|cloudy|humid\w*|wind\w*|"
+        r"hot|cold|warm|degrees?|celsius|fahrenheit|climate)\b",
+        re.IGNORECASE,
+    ),
+    "news": re.compile(
+        r"\b(news|headlines?|articles?|stories|story|reports?|breaking|latest|updates?|"
+        r"happening|announce\w*|press)\b",
+        re.IGNORECASE,
+    ),
+}
+
+# Messages made only of greetings, thanks and acknowledgements ("thanks!", "thanks, bye").
+# Answers like "yes", "sure", "ok", "great" or "perfect" are left out: they often accept a
+# lookup the assistant offered ("Want me to check the weather in Paris?"), which needs the tools.
+SMALL_TALK_PHRASE = (
+    r"(hi|hello|hey|thanks|thank you|thx|nice|got it|"
+    r"bye|goodbye|see you|good (morning|afternoon|evening|night)|how are you|you too|have a nice day)"
 )
+SMALL_TALK = re.compile(rf"^\W*{SMALL_TALK_PHRASE}(\W+{SMALL_TALK_PHRASE})*\W*$", re.IGNORECASE)
+
 
 class PromptManager:
-    """Manages system prompts with versioning and environment support"""
-    
-    def __init__(self, environment: str = "production"):
+    """Manages system prompts with versioning and environment support, plus compact tool schemas"""
+
+    def __init__(self, environment: str = "production", prompts_dir: str = PROMPTS_DIR):
         self.environment = environment
+        self.prompts_dir = prompts_dir
         self.prompt_cache = {}
-    
+
+        # Tool registry: name -> tool, intents that need it, and its precompiled compact schema
+        self.tools: Dict[str, BaseTool] = {}
+        self.tool_intents: Dict[str, Set[str]] = {}
+        self.compact_schemas: Dict[str, Dict[str, Any]] = {}
+        self.full_schemas: Dict[str, Dict[str, Any]] = {}
+
     def get_prompt(self, prompt_type: str, version: str = "latest") -> str:
         """
         Get a system prompt with versioning support.
-        
+
         Args:
-            prompt_type: Type of prompt (conversational, weather, news, error)
+            prompt_type: Type of prompt (conversational)
             version: Prompt version (latest, v1, v2, etc.)
-        
+
         Returns:
             System prompt content
         """
         cache_key = f"{prompt_type}_{version}_{self.environment}"
-        
+
         if cache_key in self.prompt_cache:
             return self.prompt_cache[cache_key]
-        
-        # Get the appropriate prompt function
-        prompt_functions = {
-            "conversational": get_conversational_system_prompt,
-            "weather": get_weather_system_prompt,
-            "news": get_news_system_prompt,
-            "error": get_error_handling_prompt
-        }
-        
-        if prompt_type not in prompt_functions:
+
+        if prompt_type not in PROMPT_FILES:
             raise ValueError(f"Unknown prompt type: {prompt_type}")
-        
+
+        file_name = PROMPT_FILES[prompt_type]
+        if version != "latest":
+            stem, ext = os.path.splitext(file_name)
+            file_name = f"{stem}_{version}{ext}"
+
+        path = os.path.join(self.prompts_dir, file_name)
+        if not os.path.exists(path):
+            raise ValueError(f"Unknown prompt version: {prompt_type} {version} ({path} not found)")
+
         # Get the prompt
-        prompt_message = prompt_functions[prompt_type]()
-        prompt_content = prompt_message.content
-        
+        with open(path, "r", encoding="utf-8") as f:
+            prompt_content = f.read()
+
         # Apply environment-specific modifications
         if self.environment == "development":
             prompt_content += "\n\n[DEVELOPMENT MODE: Enhanced logging enabled]"
         elif self.environment == "staging":
             prompt_content += "\n\n[STAGING MODE: Testing environment]"
-        
+
         # Cache the prompt
         self.prompt_cache[cache_key] = prompt_content
-        
+
         return prompt_content
-    
+
     def get_conversational_prompt(self, version: str = "latest") -> str:
         """Get conversational system prompt"""
         return self.get_prompt("conversational", version)
-    
-    def get_weather_prompt(self, version: str = "latest") -> str:
-        """Get weather system prompt"""
-        return self.get_prompt("weather", version)
-    
-    def get_news_prompt(self, version: str = "latest") -> str:
-        """Get news system prompt"""
-        return self.get_prompt("news", version)
-    
-    def get_error_prompt(self, version: str = "latest") -> str:
-        """Get error handling prompt"""
-        return self.get_prompt("error", version)
-    
+
     def clear_cache(self):
         """Clear the prompt cache"""
         self.prompt_cache.clear()
 
+    def register_tool(self, tool: BaseTool, intents: Iterable[str], compact_description: Optional[str] = None):
+        """
+        Register a tool for the intents that need it and precompile its schemas.
+        The compact schema replaces the (long) docstring description with `compact_description`.
+        """
+        full = convert_to_openai_tool(tool)
+        compact = copy.deepcopy(full)
+        if compact_description:
+            compact["function"]["description"] = compact_description
+
+        self.tools[tool.name] = tool
+        self.tool_intents[tool.name] = set(intents)
+        self.full_schemas[tool.name] = full
+        self.compact_schemas[tool.name] = compact
+
+    def detect_intents(self, messages: Sequence[BaseMessage]) -> Set[str]:
+        """Keyword-based intents of the latest user message."""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                text = message.content if isinstance(message.content, str) else str(message.content)
+                return {intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(text)}
+        return set()
+
+    def is_small_talk(self, messages: Sequence[BaseMessage]) -> bool:
+        """True if the latest user message is only greetings, thanks or acknowledgements."""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                text = message.content if isinstance(message.content, str) else str(message.content)
+                return bool(SMALL_TALK.match(text))
+        return False
+
+    def select_tools(self, messages: Sequence[BaseMessage]) -> FrozenSet[str]:
+        """
+        Names of the tools to bind for this LLM call. Keyword rules only narrow the set when
+        they are confident:
+        - small talk binds no tools,
+        - a detected intent binds its tools plus any tool already called in the history being
+          sent (the tool-result turn keeps its tools),
+        - anything else ("Nvidia", "What is going on in Ukraine?") binds every tool, with
+          compact schemas, and leaves the choice to the model.
+        """
+        if self.is_small_talk(messages):
+            return frozenset()
+        intents = self.detect_intents(messages)
+        if not intents:
+            return frozenset(self.tools)
+        selected = {name for name, tool_intents in self.tool_intents.items() if tool_intents & intents}
+        for message in messages:
+            if isinstance(message, AIMessage):
+                selected.update(call["name"] for call in message.tool_calls if call["name"] in self.tools)
+        return frozenset(selected)
+
+    def get_tool_schemas(self, names: Iterable[str], compact: bool = True) -> List[Dict[str, Any]]:
+        schemas = self.compact_schemas if compact else self.full_schemas
+        return [schemas[name] for name in sorted(names)]
+
 # Initialize prompt manager
 prompt_manager = PromptManager(environment="production")
 
 # Export for easy access
 __all__ = ['PromptManager', 'prompt_manager']
-
-
@@ -0,0 +1,272 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+from langchain_core.messages import HumanMessage
+
+#local imports
+from api_import import keys_settings
+from agent import Chatbot
+from utils.uLogger import logger
+from utils.http_client import get_http_client
+from utils.prefetch import prefetcher
+from utils.metrics import metrics
+from utils.log_helper import log_messages
+
+
+class SessionBusy(Exception):
+    """The session's queue is full; the client should retry later."""
+
+
+class ServerBusy(Exception):
+    """The server is at its session limit or shutting down."""
+
+
+class Session:
+    """One conversation (thread_id) with its own bounded queue and a worker that runs turns in order."""
+
+    def __init__(self, thread_id: str, queue_size: int):
+        self.thread_id = thread_id
+        self.queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue(maxsize=queue_size)
+        self.last_active = time.monotonic()
+        self.pending = 0  # queued + running turns
+        self.worker: Optional[asyncio.Task] = None
+
+
+class SessionManager:
+    """
+    Serves many concurrent conversations on top of one compiled graph.
+
+    - Each thread_id gets a `Session`; turns of one session run sequentially so the
+      checkpointed history stays consistent, while different sessions run concurrently.
+    - `max_workers` bounds how many graph runs are in flight at once (the worker pool).
+    - A full session queue or too many sessions is reported back as backpressure
+      instead of queueing unbounded work.
+    """
+
+    def __init__(self, graph, max_workers: int, queue_size: int, max_sessions: int, idle_ttl: float):
+        self.graph = graph
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.slots = asyncio.Semaphore(max_workers)
+        self.sessions: Dict[str, Session] = {}
+        self.accepting = True
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._reaper = asyncio.create_task(self._reap_idle_sessions())
+
+    async def submit(self, thread_id: str, message: str) -> Dict[str, Any]:
+        if not self.accepting:
+            raise ServerBusy("Server is shutting down")
+
+        session = self.sessions.get(thread_id)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                raise ServerBusy(f"Session limit reached ({self.max_sessions})")
+            session = Session(thread_id, self.queue_size)
+            session.worker = asyncio.create_task(self._run_session(session))
+            self.sessions[thread_id] = session
+            logger.info(f"[SERVER] Session opened thread_id={thread_id}, active sessions={len(self.sessions)}")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            session.queue.put_nowait((message, future))
+        except asyncio.QueueFull:
+            raise SessionBusy(f"Too many pending messages for thread_id={thread_id}")
+        session.pending += 1
+        session.last_active = time.monotonic()
+        return await future
+
+    async def _run_session(self, session: Session) -> None:
+        config = {"configurable": {"thread_id": session.thread_id}}
+        while True:
+            message, future = await session.queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                start_time = time.perf_counter()
+                async with self.slots:
+                    result = await self.graph.ainvoke({"messages": [HumanMessage(content=message)]}, config)
+                elapsed = time.perf_counter() - start_time
+                logger.info(f"[SERVER] thread_id={session.thread_id} turn completed in {elapsed:.3f}s")
+                log_messages(result["messages"], session.thread_id, {"turn_ms": round(elapsed * 1000, 1)})
+                if not future.done():
+                    future.set_result({
+                        "thread_id": session.thread_id,
+                        "response": result["messages"][-1].content,
+                        "elapsed": round(elapsed, 3),
+                    })
+            except Exception as e:
+                logger.error(f"[SERVER] Error during chatbot invoke for thread_id={session.thread_id}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                session.pending -= 1
+                session.last_active = time.monotonic()
+                session.queue.task_done()
+
+    async def _reap_idle_sessions(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_ttl, 60))
+            now = time.monotonic()
+            for thread_id, session in list(self.sessions.items()):
+                if session.pending == 0 and now - session.last_active > self.idle_ttl:
+                    session.worker.cancel()
+                    del self.sessions[thread_id]
+                    logger.info(f"[SERVER] Session closed (idle) thread_id={thread_id}")
+
+    async def shutdown(self, timeout: float) -> None:
+        """Stop accepting turns, let queued turns finish for up to `timeout` seconds, then cancel the rest."""
+        self.accepting = False
+        if self._reaper:
+            self._reaper.cancel()
+
+        pending = [asyncio.create_task(s.queue.join()) for s in self.sessions.values()]
+        if pending:
+            logger.info(f"[SERVER] Draining {len(pending)} sessions (timeout={timeout}s)")
+            done, not_done = await asyncio.wait(pending, timeout=timeout)
+            for task in not_done:
+                task.cancel()
+
+        for session in self.sessions.values():
+            session.worker.cancel()
+        self.sessions.clear()
+        logger.info("[SERVER] Session manager stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "pending_turns": sum(s.pending for s in self.sessions.values()),
+            "accepting": self.accepting,
+        }
+
+
+async def _handle_turn(manager: SessionManager, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """Run one chat turn for a JSON payload and map failures to an HTTP status."""
+    message = (payload.get("message") or "").strip()
+    thread_id = str(payload.get("thread_id") or uuid.uuid4())
+    if not message:
+        return 400, {"error": "message is required", "thread_id": thread_id}
+
+    try:
+        result = await asyncio.wait_for(manager.submit(thread_id, message), keys_settings.server_request_timeout)
+        return 200, result
+    except SessionBusy as e:
+        return 429, {"error": str(e), "thread_id": thread_id}
+    except ServerBusy as e:
+        return 503, {"error": str(e), "thread_id": thread_id}
+    except asyncio.TimeoutError:
+        return 504, {"error": "Timed out waiting for the chatbot", "thread_id": thread_id}
+    except Exception as e:
+        return 500, {"error": f"Error during chatbot invoke: {e}", "thread_id": thread_id}
+
+
+async def chat(request: web.Request) -> web.Response:
+    """POST /chat  {"thread_id": "...", "message": "..."} -> {"thread_id", "response", "elapsed"}"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+
+    status, body = await _handle_turn(request.app["sessions"], payload)
+    headers = {"Retry-After": "1"} if status in (429, 503) else None
+    return web.json_response(body, status=status, headers=headers)
+
+
+async def chat_ws(request: web.Request) -> web.WebSocketResponse:
+    """GET /ws?thread_id=...  Each text frame is a message (or JSON payload); each reply is a JSON frame."""
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    thread_id = request.query.get("thread_id") or str(uuid.uuid4())
+
+    async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+            if msg.type == WSMsgType.ERROR:
+                logger.warning(f"[SERVER] WebSocket error for thread_id={thread_id}: {ws.exception()}")
+            continue
+        try:
+            payload = msg.json()
+        except ValueError:
+            payload = {"message": msg.data}
+        if not isinstance(payload, dict):
+            payload = {"message": str(payload)}
+        payload.setdefault("thread_id", thread_id)
+
+        status, body = await _handle_turn(request.app["sessions"], payload)
+        await ws.send_json({"status": status, **body})
+
+    return ws
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", **request.app["sessions"].stats()})
+
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    """Prometheus text exposition of the chatbot metrics plus session gauges."""
+    stats = request.app["sessions"].stats()
+    body = metrics.render() + (
+        "# HELP chatbot_sessions Active conversation sessions\n# TYPE chatbot_sessions gauge\n"
+        f"chatbot_sessions {stats['sessions']}\n"
+        "# HELP chatbot_pending_turns Queued or running turns\n# TYPE chatbot_pending_turns gauge\n"
+        f"chatbot_pending_turns {stats['pending_turns']}\n"
+    )
+    return web.Response(text=body, content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def _on_startup(app: web.Application) -> None:
+    chatbot = Chatbot()
+    # Kept to be closed on shutdown: the SQLite checkpointer flushes queued writes on close
+    app["checkpointer"] = chatbot.create_checkpointer()
+    manager = SessionManager(
+        chatbot.create_graph(app["checkpointer"]),
+        max_workers=keys_settings.server_max_workers,
+        queue_size=keys_settings.server_session_queue_size,
+        max_sessions=keys_settings.server_max_sessions,
+        idle_ttl=keys_settings.server_session_idle_ttl,
+    )
+    manager.start()
+    app["sessions"] = manager
+    if keys_settings.prewarm:
+        # In the background: the server accepts requests while the LLM client is being built
+        app["prewarm"] = asyncio.get_running_loop().run_in_executor(None, chatbot.prewarm)
+    if keys_settings.prefetch_enabled:
+        prefetcher.start()
+    logger.info("[SERVER] Chatbot initialized and ready!")
+
+
+async def _on_shutdown(app: web.Application) -> None:
+    await app["sessions"].shutdown(keys_settings.server_shutdown_timeout)
+    # Waits for a refresh cycle in progress, so off the loop
+    await asyncio.get_running_loop().run_in_executor(None, prefetcher.stop)
+    await get_http_client().aclose()
+    checkpointer = app.get("checkpointer")
+    if hasattr(checkpointer, "close"):
+        # After the sessions drained, so their last checkpoints are written too
+        await asyncio.get_running_loop().run_in_executor(None, checkpointer.close)
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_post("/chat", chat)
+    app.router.add_get("/ws", chat_ws)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.on_startup.append(_on_startup)
+    app.on_shutdown.append(_on_shutdown)
+    return app
+
+
+if __name__ == "__main__":
+    logger.info(f"[SERVER] Starting on {keys_settings.server_host}:{keys_settings.server_port}")
+    # run_app handles SIGINT/SIGTERM and runs the shutdown hooks for a graceful stop
+    web.run_app(
+        create_app(),
+        host=keys_settings.server_host,
+        port=keys_settings.server_port,
+        shutdown_timeout=keys_settings.server_shutdown_timeout,
+    )
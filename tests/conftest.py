@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are validated on first use: give the tests dummy keys, no client-side rate
+# limits, and keep their log files out of the repository's log_dir/.
+for key in ("OPENAI_API_KEY", "WEATHER_API_KEY", "NEWS_API_KEY"):
+    os.environ.setdefault(key, "test")
+os.environ.setdefault("WEATHER_RATE_LIMIT", "0")
+os.environ.setdefault("NEWS_RATE_LIMIT", "0")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="chatbot-test-logs-"))
+
+
+@pytest.fixture(scope="session")
+def stub_api():
+    """Local WeatherAPI/NewsAPI stand-in the tools are pointed at for the whole session."""
+    from benchmarks.fakes import StubApiServer
+    from api_import import keys_settings
+    import tools.weather_tool as weather_tool
+
+    stub = StubApiServer().start()
+    keys_settings.weather_api_url = f"{stub.base_url}/v1/current.json"
+    keys_settings.news_api_base_url = f"{stub.base_url}/v2"
+    weather_tool.WEATHER_URL = keys_settings.weather_api_url
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def upstream(stub_api):
+    """The stand-in with a clean slate: empty tool caches, request log reset, answering 200."""
+    from tools.news_tool import news_cache
+    from tools.weather_tool import weather_cache, _location_aliases
+
+    for cache in (weather_cache, _location_aliases, news_cache):
+        cache.clear()
+    stub_api.queries.clear()
+    stub_api.requests = 0
+    stub_api.status = 200
+    yield stub_api
+    stub_api.status = 200
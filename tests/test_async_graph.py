@@ -0,0 +1,42 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import Chatbot
+from benchmarks.fakes import ScriptedChatModel
+
+
+def make_graph():
+    chatbot = Chatbot(parallel_tool_calls=True, llm=ScriptedChatModel())
+    chatbot.fast_path_enabled = False  # every turn goes through the LLM and ToolNode
+    return chatbot.create_graph(MemorySaver())
+
+
+def test_ainvoke_runs_tool_calls_of_one_turn_concurrently(upstream):
+    graph = make_graph()
+    config = {"configurable": {"thread_id": "async-parallel"}}
+    result = asyncio.run(graph.ainvoke(
+        {"messages": [HumanMessage(content="weather in London and news about London")]}, config
+    ))
+    calls = next(m for m in result["messages"] if isinstance(m, AIMessage) and m.tool_calls).tool_calls
+    assert {c["name"] for c in calls} == {"get_weather", "search_news"}
+    tool_results = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert {m.tool_call_id for m in tool_results} == {c["id"] for c in calls}
+    assert result["messages"][-1].content.startswith("Here is what I found")
+
+
+def test_concurrent_conversations_on_one_graph(upstream):
+    graph = make_graph()
+
+    async def turn(i):
+        config = {"configurable": {"thread_id": f"async-{i}"}}
+        return await graph.ainvoke({"messages": [HumanMessage(content="weather in Paris")]}, config)
+
+    async def run():
+        return await asyncio.gather(*(turn(i) for i in range(5)))
+
+    results = asyncio.run(run())
+    assert all(r["messages"][-1].content.startswith("Here is what I found") for r in results)
+    # Every conversation keeps only its own history
+    assert all(sum(isinstance(m, HumanMessage) for m in r["messages"]) == 1 for r in results)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import batch
+from agent import Chatbot
+from benchmarks.fakes import ScriptedChatModel
+from utils.metrics import percentiles
+
+
+def test_percentiles_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    result = percentiles(values)
+    assert result["count"] == 100
+    assert (result["p50_ms"], result["p95_ms"], result["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert (result["min_ms"], result["max_ms"], result["mean_ms"]) == (1.0, 100.0, 50.5)
+
+
+@pytest.mark.parametrize("values, p50, p99", [
+    ([0.2], 200.0, 200.0),
+    ([0.1, 0.2], 100.0, 200.0),
+    ([0.3, 0.1, 0.2], 200.0, 300.0),
+])
+def test_percentiles_small_samples(values, p50, p99):
+    result = percentiles(values)
+    assert (result["p50_ms"], result["p99_ms"]) == (p50, p99)
+
+
+def test_percentiles_empty():
+    assert percentiles([]) == {"count": 0}
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def run(tmp_path, records, *extra):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    if records is not None:
+        write_jsonl(source, records)
+    args = batch.parse_args([str(source), str(output), "--concurrency", "4", *extra])
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    checkpointer = MemorySaver()
+    summary = asyncio.run(batch.run_batch(args, chatbot, chatbot.create_graph(checkpointer), checkpointer))
+    lines = output.read_text(encoding="utf-8").splitlines()
+    return summary, [json.loads(line) for line in lines]
+
+
+def test_batch_summary_uses_shared_percentiles(tmp_path, upstream):
+    summary, rows = run(tmp_path, [
+        {"id": "a", "prompt": "weather in Paris"},
+        {"id": "b", "messages": ["hello", {"role": "user", "content": "news about Tokyo"}]},
+    ])
+    assert summary["ok"] == 2 and summary["turns"] == 3
+    assert summary["turn_latency_ms"]["count"] == 3
+    assert set(summary["conversation_latency_ms"]) == {"count", "mean_ms", "min_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+    assert {row["id"]: row["status"] for row in rows} == {"a": "ok", "b": "ok"}
+
+
+@pytest.mark.parametrize("record, expected", [
+    ({"id": 7, "prompt": " hi "}, ("7", ["hi"])),
+    ({"request_id": "r1", "title": "Weather", "body": "in Paris?"}, ("r1", ["Weather\n\nin Paris?"])),
+    ({"messages": ["hi", {"role": "assistant", "content": "hello"}, {"content": "bye"}]}, ("line-3", ["hi", "bye"])),
+    ({"id": "", "thread_id": "t", "prompt": "hi"}, ("t", ["hi"])),
+])
+def test_conversation_from_record(record, expected):
+    assert tuple(batch.conversation_from_record(record, 3)) == expected
+
+
+def test_conversation_without_user_message_is_invalid():
+    with pytest.raises(ValueError):
+        batch.conversation_from_record({"id": "a", "messages": [{"role": "assistant", "content": "x"}]}, 1)
+
+
+def test_load_completed_cuts_a_partial_last_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_bytes(
+        b'{"id": "a", "status": "ok"}\n'
+        b'{"id": "b", "status": "error"}\n'
+        b'not json\n'
+        b'{"id": "c", "sta'
+    )
+    assert batch.load_completed(str(output)) == {"a"}
+    assert output.read_bytes().endswith(b"not json\n")
+    assert batch.load_completed(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_resume_skips_answered_and_retries_failed_conversations(tmp_path, upstream):
+    write_jsonl(tmp_path / "out.jsonl", [
+        {"id": "a", "status": "ok", "turns": []},
+        {"id": "b", "status": "error", "turns": [], "error": "boom"},
+    ])
+    with open(tmp_path / "out.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "d", "status": "o')  # crashed mid-write
+    summary, rows = run(tmp_path, [
+        {"id": "a", "prompt": "hello"},
+        {"id": "b", "prompt": "hello"},
+        {"id": "c", "prompt": "hello"},
+        {"id": "c", "prompt": "hello again"},
+        ["not", "an", "object"],
+        {"id": "e"},
+    ])
+    assert (summary["ok"], summary["skipped_completed"], summary["invalid"]) == (2, 1, 3)
+    assert [(row["id"], row["status"]) for row in rows[:2]] == [("a", "ok"), ("b", "error")]
+    assert sorted((row["id"], row["status"]) for row in rows[2:]) == [("b", "ok"), ("c", "ok")]
+
+
+def test_restart_discards_the_output(tmp_path, upstream):
+    write_jsonl(tmp_path / "out.jsonl", [{"id": "a", "status": "ok", "turns": []}])
+    summary, rows = run(tmp_path, [{"id": "a", "prompt": "hello"}], "--restart")
+    assert summary["ok"] == 1 and summary["skipped_completed"] == 0
+    assert len(rows) == 1 and rows[0]["thread_id"].startswith("batch-")
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent import Chatbot
+from api_import import keys_settings
+from benchmarks.fakes import ScriptedChatModel
+from utils.checkpointer import BoundedSqliteSaver
+
+
+def sqlite_graph(monkeypatch, tmp_path, **settings):
+    monkeypatch.setattr(keys_settings, "checkpointer", "sqlite")
+    monkeypatch.setattr(keys_settings, "checkpoint_db_path", str(tmp_path / "checkpoints.sqlite"))
+    for name, value in settings.items():
+        monkeypatch.setattr(keys_settings, name, value)
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    chatbot.fast_path_enabled = False
+    checkpointer = chatbot.create_checkpointer()
+    assert isinstance(checkpointer, BoundedSqliteSaver)
+    return chatbot.create_graph(checkpointer), checkpointer
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_concurrent_ainvoke_with_sqlite_checkpointer(monkeypatch, tmp_path, upstream):
+    graph, checkpointer = sqlite_graph(monkeypatch, tmp_path)
+
+    async def conversation(i):
+        for prompt in ("weather in Paris", "and in Tokyo?"):
+            result = await graph.ainvoke({"messages": [HumanMessage(content=prompt)]}, config(f"c{i}"))
+        return result
+
+    async def run():
+        return await asyncio.gather(*(conversation(i) for i in range(8)))
+
+    try:
+        results = asyncio.run(run())
+        assert all(sum(isinstance(m, HumanMessage) for m in r["messages"]) == 2 for r in results)
+        checkpointer.flush()
+        # Dropped from memory, every thread comes back from disk
+        for i in range(8):
+            checkpointer._forget(f"c{i}")
+        state = graph.get_state(config("c3"))
+        assert [m.content for m in state.values["messages"] if isinstance(m, HumanMessage)] == [
+            "weather in Paris", "and in Tokyo?"
+        ]
+    finally:
+        checkpointer.close()
+
+
+def test_async_reads_do_not_block_the_event_loop(tmp_path):
+    checkpointer = BoundedSqliteSaver(str(tmp_path / "checkpoints.sqlite"))
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with checkpointer._lock:
+            held.set()
+            release.wait(timeout=1)  # the inherited inline read would otherwise deadlock the loop
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while not release.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        read = asyncio.create_task(checkpointer.aget_tuple(config("t")))
+        tick_task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.2)
+        release.set()
+        await asyncio.gather(read, tick_task)
+        return ticks
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait()
+    try:
+        assert asyncio.run(run()) >= 5
+    finally:
+        holder.join()
+        checkpointer.close()
+
+
+def test_keeps_only_the_latest_checkpoints(monkeypatch, tmp_path, upstream):
+    graph, checkpointer = sqlite_graph(monkeypatch, tmp_path, checkpoint_max_per_thread=3)
+    try:
+        for prompt in ("hi", "weather in Paris", "news about Tokyo"):
+            graph.invoke({"messages": [HumanMessage(content=prompt)]}, config("bounded"))
+        assert len(list(checkpointer.list(config("bounded")))) == 3
+        checkpointer.flush()
+        rows = checkpointer._read_conn.execute(
+            "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", ("bounded",)
+        ).fetchone()[0]
+        assert rows == 3
+    finally:
+        checkpointer.close()
+
+
+def test_delete_thread_removes_memory_and_disk(tmp_path, upstream):
+    checkpointer = BoundedSqliteSaver(str(tmp_path / "checkpoints.sqlite"))
+    graph = Chatbot(llm=ScriptedChatModel()).create_graph(checkpointer)
+    try:
+        graph.invoke({"messages": [HumanMessage(content="hi")]}, config("gone"))
+        asyncio.run(checkpointer.adelete_thread("gone"))
+        checkpointer.flush()
+        assert checkpointer.stats()["threads_in_memory"] == 0
+        assert checkpointer.get_tuple(config("gone")) is None
+    finally:
+        checkpointer.close()
+
+
+@pytest.mark.parametrize("argv", [[], ["--async"]])
+def test_cli_exit_closes_the_checkpointer(monkeypatch, tmp_path, upstream, argv):
+    import agent
+    import main
+
+    monkeypatch.setattr(keys_settings, "checkpointer", "sqlite")
+    monkeypatch.setattr(keys_settings, "checkpoint_db_path", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(keys_settings, "prewarm", False)
+    created = []
+    create_checkpointer = Chatbot.create_checkpointer
+    monkeypatch.setattr(Chatbot, "create_checkpointer", lambda self: created.append(create_checkpointer(self)) or created[-1])
+    monkeypatch.setattr(agent, "Chatbot", lambda **kwargs: Chatbot(llm=ScriptedChatModel(), **kwargs))
+    monkeypatch.setattr("sys.argv", ["main.py", *argv])
+    replies = iter(["weather in Paris", "exit"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+    main.main()
+
+    # Closing stops the writer thread once every queued write is applied
+    assert [c._writer.is_alive() for c in created] == [False]
+    reopened = BoundedSqliteSaver(keys_settings.checkpoint_db_path)
+    try:
+        assert reopened.get_tuple(config("1")) is not None
+    finally:
+        reopened.close()
@@ -0,0 +1,68 @@
+import pytest
+
+from tools.gazetteer import Gazetteer, normalize_name
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer().load_csv()
+
+
+def test_normalize_name():
+    assert normalize_name("  São Paulo! ") == "sao paulo"
+    assert normalize_name("U.S.A.") == "u s a"
+
+
+@pytest.mark.parametrize("location, expected", [
+    ("paris", ("Paris", "FR")),
+    ("PARIS", ("Paris", "FR")),
+    ("NYC", ("New York", "US")),
+    ("São Paulo", ("Sao Paulo", "BR")),
+    ("Sao Paolo", ("Sao Paulo", "BR")),  # fuzzy
+    ("London, UK", ("London", "GB")),
+    ("london, england", ("London", "GB")),
+    ("Paris, France", ("Paris", "FR")),
+    ("Portland, USA", ("Portland", "US")),
+])
+def test_resolves_spellings_to_one_place(gazetteer, location, expected):
+    place = gazetteer.resolve(location)
+    assert (place.name, place.country_code) == expected
+
+
+@pytest.mark.parametrize("location", [
+    "London, Ontario",  # qualifier names another region
+    "Paris, Texas",
+    "France",  # bare country: left to WeatherAPI
+    "Atlantis",
+    "xyz",  # too short to fuzzy match
+    "",
+    " , ",
+])
+def test_unknown_or_mismatched_locations_are_none(gazetteer, location):
+    assert gazetteer.resolve(location) is None
+
+
+def test_place_ids_and_queries(gazetteer):
+    london = gazetteer.resolve("london")
+    assert london.id == "london|gb"
+    assert london.query == "London, United Kingdom"
+    assert gazetteer.resolve("singapore").query == "Singapore"
+
+
+def test_geonames_adds_coordinates_most_populous_first(tmp_path):
+    def row(name, alternates, lat, lon, code, population):
+        cols = [""] * 19
+        cols[1], cols[2], cols[3] = name, name, alternates
+        cols[4], cols[5], cols[8], cols[14] = str(lat), str(lon), code, str(population)
+        return "\t".join(cols)
+
+    path = tmp_path / "cities.txt"
+    path.write_text("\n".join([
+        row("London", "", 42.98, -81.23, "CA", 400000),
+        row("London", "Londres", 51.5085, -0.1257, "GB", 8900000),
+    ]) + "\n", encoding="utf-8")
+    gazetteer = Gazetteer().load_csv().load_geonames(str(path))
+
+    assert gazetteer.resolve("Londres").query == "51.5085,-0.1257"
+    assert gazetteer.resolve("london").country_code == "GB"
+    assert gazetteer.resolve("London, Canada").query == "42.9800,-81.2300"
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from utils.http_client import HttpClient, get_http_client
+
+
+def client_with(handler, **kwargs) -> HttpClient:
+    kwargs.setdefault("backoff_base", 0.0)
+    kwargs.setdefault("breaker_failure_threshold", 0)
+    client = HttpClient(**kwargs)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_retries_transient_status_codes():
+    statuses = iter([503, 429, 200])
+    client = client_with(lambda request: httpx.Response(next(statuses)), max_retries=2)
+    assert client.get("http://api.test/x").status_code == 200
+
+
+def test_returns_last_response_when_retries_run_out():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    client = client_with(handler, max_retries=1)
+    assert client.get("http://api.test/x").status_code == 502
+    assert len(calls) == 2
+
+
+def test_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(401)
+
+    assert client_with(handler).get("http://api.test/x").status_code == 401
+    assert len(calls) == 1
+
+
+def test_raises_transport_errors_after_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        client_with(handler, max_retries=2).get("http://api.test/x")
+    assert len(calls) == 3
+
+
+def test_timeouts_per_host():
+    client = HttpClient(connect_timeout=1, read_timeout=2, host_timeouts={"slow.test": (5, 20)})
+    assert client._timeout_for("http://slow.test/x").read == 20
+    assert client._timeout_for("http://other.test/x").read == 2
+    assert client._timeout_for("http://other.test/x").connect == 1
+
+
+def test_retry_after_header_is_capped():
+    client = HttpClient(backoff_max=3.0)
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "1"})) == 1.0
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "120"})) == 3.0
+
+
+def test_async_get_retries():
+    statuses = iter([500, 200])
+
+    async def run():
+        client = HttpClient(backoff_base=0.0, breaker_failure_threshold=0)
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(next(statuses))))
+        client._async_loop = asyncio.get_running_loop()
+        return await client.aget("http://api.test/x")
+
+    assert asyncio.run(run()).status_code == 200
+
+
+def test_shared_client_is_a_singleton():
+    assert get_http_client() is get_http_client()
+
+
+def test_aclose_closes_the_client_of_the_running_loop():
+    client = HttpClient()
+
+    async def run():
+        async_client = client._get_async_client()
+        await client.aclose()
+        return async_client
+
+    assert asyncio.run(run()).is_closed
+    assert client._async_client is None
+
+
+def test_client_of_a_finished_loop_is_dropped(stub_api):
+    client = HttpClient()
+
+    async def use():
+        await client.aget(f"{stub_api.base_url}/v1/current.json", params={"q": "Paris"})
+        return client._async_client
+
+    first = asyncio.run(use())  # leaves a pooled connection bound to the finished loop
+    # aclose() on a new loop can't await the old loop's client; it must not raise
+    asyncio.run(client.aclose())
+    assert client._async_client is None
+    assert asyncio.run(use()) is not first
+
+
+def test_client_of_another_running_loop_is_closed_on_that_loop():
+    client = HttpClient()
+
+    async def use():
+        return client._get_async_client()
+
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(use(), other).result(1)
+        assert asyncio.run(use()) is not first
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other).result(1)
+        assert first.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(1)
+        other.close()
@@ -0,0 +1,36 @@
+import logging
+import queue
+from logging.handlers import QueueHandler
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.log_helper import ConversationLog
+from utils.uLogger import DeferredQueueHandler, logger
+
+
+def test_logger_leaves_formatting_to_listener():
+    queue_handlers = [h for h in logger.handlers if isinstance(h, QueueHandler)]  # pytest adds its own capture handlers
+    assert queue_handlers and all(isinstance(h, DeferredQueueHandler) for h in queue_handlers)
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    record = logging.LogRecord("t", logging.INFO, __file__, 1, "value %s", ("x",), None)
+    handler.handle(record)
+    queued = records.get_nowait()
+    # Not formatted on the calling thread: message arguments are still unapplied
+    assert queued is record and queued.args == ("x",) and not hasattr(queued, "message")
+
+
+def test_conversation_log_writes_each_message_once():
+    log = ConversationLog()
+    history = [HumanMessage(content="hi", id="1"), AIMessage(content="hello", id="2")]
+    assert log.log(history, "t") == 2
+    assert log.log(history, "t") == 0
+    assert log.log(history + [HumanMessage(content="bye", id="3")], "t") == 1
+    assert log.log(history, "other") == 2
+
+
+def test_conversation_log_bounds_tracked_threads():
+    log = ConversationLog(max_threads=2)
+    for thread in ("a", "b", "c"):
+        log.log([HumanMessage(content="hi", id="1")], thread)
+    assert list(log._logged) == ["b", "c"]
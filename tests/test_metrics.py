@@ -0,0 +1,81 @@
+import json
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import Chatbot
+from benchmarks.fakes import ScriptedChatModel
+from utils.cache import TTLCache
+from utils.metrics import JsonlTraceWriter, MetricsRegistry, TracingCallbackHandler, metrics
+
+
+def samples(text, name):
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def test_counters_and_histograms_render():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("jobs_total", status="ok")
+    registry.inc("jobs_total", 2, status="ok")
+    registry.observe("job_seconds", 0.05)
+    registry.observe("job_seconds", 0.5)
+    text = registry.render()
+    assert 'jobs_total{status="ok"} 3' in text
+    assert 'job_seconds_bucket{le="0.1"} 1' in text
+    assert 'job_seconds_bucket{le="1"} 2' in text
+    assert 'job_seconds_bucket{le="+Inf"} 2' in text
+    assert "job_seconds_count 2" in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    registry.inc("jobs_total")
+    registry.observe("job_seconds", 1.0)
+    assert registry.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_register_cache_is_idempotent_by_name():
+    registry = MetricsRegistry()
+    old, new = TTLCache("answers"), TTLCache("answers")
+    new.set("k", "v")
+    registry.register_cache(old.stats)
+    registry.register_cache(new.stats)
+    registry.register_cache(TTLCache("other").stats)
+    assert len(registry._collectors) == 2
+    # The latest registration is the one reported
+    assert samples(registry.render(), "chatbot_cache_entries") == [
+        'chatbot_cache_entries{cache="answers"} 1',
+        'chatbot_cache_entries{cache="other"} 0',
+    ]
+
+
+def test_chatbot_instances_share_one_response_cache_collector():
+    Chatbot()
+    before = len(metrics._collectors)
+    Chatbot()
+    Chatbot()
+    assert len(metrics._collectors) == before
+    assert len(samples(metrics.render(), 'chatbot_cache_entries{cache="responses"}')) == 1
+
+
+def test_tracing_handler_records_turn_nodes_and_tools(tmp_path, upstream):
+    registry = MetricsRegistry()
+    writer = JsonlTraceWriter(str(tmp_path / "trace.jsonl"))
+    handler = TracingCallbackHandler(registry, writer)
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    chatbot.fast_path_enabled = False
+    graph = chatbot.create_graph(MemorySaver()).with_config({"callbacks": [handler]})
+
+    graph.invoke({"messages": [HumanMessage(content="weather in Paris")]}, {"configurable": {"thread_id": "m"}})
+    writer.close()
+
+    snapshot = registry.snapshot()
+    assert snapshot["counters"]["chatbot_turns_total"] == {'{status="ok"}': 1.0}
+    assert snapshot["counters"]["chatbot_tool_calls_total"] == {'{status="ok",tool="get_weather"}': 1.0}
+    assert set(snapshot["histograms"]["chatbot_node_seconds"]) >= {'{node="ai_chat"}', '{node="tools"}'}
+    assert snapshot["histograms"]["chatbot_llm_seconds"][""]["count"] == 2
+
+    spans = [json.loads(line) for line in (tmp_path / "trace.jsonl").read_text().splitlines()]
+    turn = next(s for s in spans if s["kind"] == "turn")
+    assert {s["trace_id"] for s in spans} == {turn["trace_id"]}
+    assert {s["kind"] for s in spans} >= {"turn", "node", "llm", "tool"}
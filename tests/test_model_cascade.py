@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import FAST_TIER, MAIN_TIER, Chatbot
+from benchmarks.fakes import ScriptedChatModel
+
+
+@pytest.fixture
+def chatbot():
+    bot = Chatbot(llm=ScriptedChatModel(model_name="main"), fast_llm=ScriptedChatModel(model_name="fast"))
+    bot.model_cascade_enabled = True
+    bot.fast_path_enabled = False
+    return bot
+
+
+def tool_turn(status="success", content="{}"):
+    call = AIMessage(content="", tool_calls=[{"name": "get_weather", "args": {"location": "Paris"}, "id": "c1"}])
+    return [HumanMessage(content="weather in Paris"), call, ToolMessage(content=content, tool_call_id="c1", status=status)]
+
+
+@pytest.mark.parametrize("text", [
+    "Nvidia",
+    "What is going on in Ukraine?",
+    "weather in Paris",
+    "Tell me a joke",
+])
+def test_questions_go_to_the_main_tier(chatbot, text):
+    assert chatbot._model_tier([HumanMessage(content=text)]) == MAIN_TIER
+
+
+@pytest.mark.parametrize("text", ["thanks!", "thanks, bye", "hello"])
+def test_small_talk_goes_to_the_fast_tier(chatbot, text):
+    assert chatbot._model_tier([HumanMessage(content=text)]) == FAST_TIER
+
+
+@pytest.mark.parametrize("text", ["ok", "great", "perfect"])
+def test_accepting_an_offer_goes_to_the_main_tier(chatbot, text):
+    offer = AIMessage(content="Want me to check the weather in Paris?")
+    assert chatbot._model_tier([HumanMessage(content="hi"), offer, HumanMessage(content=text)]) == MAIN_TIER
+
+
+def test_tool_result_phrasing_goes_to_the_fast_tier(chatbot):
+    assert chatbot._model_tier(tool_turn()) == FAST_TIER
+
+
+def test_failed_tool_call_goes_back_to_the_main_tier(chatbot):
+    assert chatbot._model_tier(tool_turn(status="error")) == MAIN_TIER
+
+
+@pytest.mark.parametrize("message", ["Error: 503 Service Unavailable", "Request failed: timed out"])
+def test_error_payload_goes_back_to_the_main_tier(chatbot, message):
+    # The tools report upstream failures in the result, with a "success" status
+    content = json.dumps({"location": "Paris", "message": message, "data": {}})
+    assert chatbot._model_tier(tool_turn(content=content)) == MAIN_TIER
+
+
+def test_cascade_disabled_uses_the_main_tier(chatbot):
+    chatbot.model_cascade_enabled = False
+    assert chatbot._model_tier([HumanMessage(content="thanks!")]) == MAIN_TIER
+    assert chatbot._model_tier(tool_turn()) == MAIN_TIER
+
+
+def test_graph_splits_a_tool_turn_across_tiers(chatbot, upstream):
+    graph = chatbot.create_graph(MemorySaver())
+    config = {"configurable": {"thread_id": "cascade"}}
+    graph.invoke({"messages": [HumanMessage(content="weather in Paris")]}, config)
+    main, fast = chatbot.llm_for_tier(MAIN_TIER), chatbot.llm_for_tier(FAST_TIER)
+    assert (main.calls, fast.calls) == (1, 1)
+    graph.invoke({"messages": [HumanMessage(content="thanks!")]}, config)
+    assert (main.calls, fast.calls) == (1, 2)
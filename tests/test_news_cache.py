@@ -0,0 +1,49 @@
+import pytest
+
+from tools.news_tool import _cache_key, _search_news, normalize_query
+
+
+def key(query, **kwargs):
+    return _cache_key(query, kwargs.get("sources"), kwargs.get("from_date"), kwargs.get("to_date"), kwargs.get("top_headlines", False))
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Nvidia news", "news about nvidia"),
+    ("latest Nvidia news", "NVIDIA"),
+    ("What is news about Russia?", "russia"),
+])
+def test_rephrasings_share_a_key(first, second):
+    assert key(first) == key(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Tesla Q2 earnings", "Tesla Q3 earnings"),
+    ("Windows 10", "Windows 11"),
+    ("World War 1", "World War 2"),
+    ("Pixel 8", "Pixel 9 review"),
+    ("Austria floods", "Australia floods"),
+    ("New York floods", "York floods"),
+])
+def test_different_queries_never_share_a_key(first, second):
+    assert key(first) != key(second)
+
+
+def test_new_is_not_a_filler_word():
+    assert normalize_query("New York floods") == "floods new york"
+
+
+def test_filters_are_part_of_the_key():
+    assert key("nvidia", sources="cnn,bbc-news") == key("nvidia", sources="BBC-News, cnn")
+    assert key("nvidia", sources="cnn") != key("nvidia")
+    assert key("nvidia", from_date="2026-01-01") != key("nvidia")
+    assert key("anything", top_headlines=True) == key(None, top_headlines=True)
+
+
+def test_rephrased_query_is_served_from_cache(upstream):
+    first = _search_news(query="Nvidia news")
+    requests = upstream.requests
+    assert requests > 0
+    assert _search_news(query="news about NVIDIA") == first
+    assert upstream.requests == requests
+    _search_news(query="Windows 11")
+    assert upstream.requests > requests
@@ -0,0 +1,77 @@
+import pytest
+
+from api_import import keys_settings
+from tools.news_tool import _page_requests, _search_news, dedup_articles, query_variants, rank_articles
+
+
+def article(title, url, description="", published="2025-01-01T00:00:00Z"):
+    return {"title": title, "url_for_details": url, "description": description, "publishedAt": published}
+
+
+def test_single_request_by_default():
+    assert keys_settings.news_fetch_pages == 1 and keys_settings.news_query_variants is False
+    assert _page_requests({"q": "What is news about Russia?", "page": 1}) == [{"q": "What is news about Russia?", "page": 1}]
+
+
+def test_pages_and_variants_are_opt_in(monkeypatch):
+    monkeypatch.setattr(keys_settings, "news_fetch_pages", 2)
+    monkeypatch.setattr(keys_settings, "news_query_variants", True)
+    requests = _page_requests({"q": "What is news about Russia?", "page": 1})
+    assert [(r["q"], r["page"]) for r in requests] == [
+        ("What is news about Russia?", 1), ("What is news about Russia?", 2), ("russia", 1), ("russia", 2),
+    ]
+
+
+def test_top_headlines_have_no_variants(monkeypatch):
+    monkeypatch.setattr(keys_settings, "news_query_variants", True)
+    assert _page_requests({"country": "us", "page": 1}) == [{"country": "us", "page": 1}]
+
+
+def test_query_variants():
+    assert query_variants("What is news about Russia?") == ["What is news about Russia?", "russia"]
+    assert query_variants("electric cars") == ["electric cars"]
+    assert query_variants(None) == []
+
+
+def test_dedup_drops_syndicated_copies_and_repeated_urls():
+    articles = [
+        article("Storm hits the coast - Reuters", "a"),
+        article("Storm hits the coast - AP", "b"),
+        article("Markets rally after rate cut", "c"),
+        article("Something else entirely", "c"),
+        article("[Removed]", "d"),
+    ]
+    kept = dedup_articles(articles, threshold=85)
+    assert [a["url_for_details"] for a in kept] == ["a", "c"]
+    assert len(dedup_articles(articles, threshold=85, limit=1)) == 1
+
+
+def test_rank_orders_by_relevance_then_recency():
+    articles = [
+        article("Football scores", "a"),
+        article("Electric cars sales surge", "b", published="2025-01-01T00:00:00Z"),
+        article("Electric cars sales surge again", "c", published="2025-01-02T00:00:00Z"),
+    ]
+    assert [a["url_for_details"] for a in rank_articles(articles, "electric cars")][-1] == "a"
+    assert rank_articles(articles, None) == articles
+
+
+def test_default_search_makes_one_request(upstream):
+    result = _search_news(query="electric cars")
+    assert upstream.requests == 1
+    assert result["count"] == 10
+
+
+def test_multi_page_search_merges_and_dedups(upstream, monkeypatch):
+    monkeypatch.setattr(keys_settings, "news_fetch_pages", 2)
+    result = _search_news(query="electric cars")
+    assert upstream.requests == 2
+    titles = [a["title"] for a in result["articles"]]
+    assert len(titles) == len(set(titles)) == keys_settings.news_top_k
+    assert not any(t.endswith(" - Wire") for t in titles)
+
+
+@pytest.mark.parametrize("query", [None, ""])
+def test_query_required_without_top_headlines(query, upstream):
+    assert _search_news(query=query)["message"].startswith("Error")
+    assert upstream.requests == 0
@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.prefetch import Prefetcher
+
+
+class Loader:
+    def __init__(self, ttl=300.0, fail=False):
+        self.calls = 0
+        self.ttl = ttl
+        self.fail = fail
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return f"value {self.calls}", self.ttl
+
+
+@pytest.fixture
+def prefetcher():
+    # record() only tracks requests while the background thread runs; run_once is driven by hand
+    p = Prefetcher(interval=10, top_n=2, min_score=2, decay=0.5, budgets_per_hour={"weather": 3600})
+    p._thread = object()
+    return p
+
+
+def hit(prefetcher, cache, key, loader, times, upstream="weather"):
+    for _ in range(times):
+        prefetcher.record(upstream, cache, key, loader)
+
+
+def test_record_is_a_noop_while_stopped():
+    p = Prefetcher()
+    p.record("weather", TTLCache("t"), "paris", Loader())
+    assert p.hot() == {}
+
+
+def test_only_hot_entries_are_refreshed(prefetcher):
+    cache = TTLCache("t")
+    hot, cold = Loader(), Loader()
+    hit(prefetcher, cache, "paris", hot, 3)
+    hit(prefetcher, cache, "lyon", cold, 1)
+
+    assert prefetcher.run_once() == 1
+    assert hot.calls == 1 and cold.calls == 0
+    assert cache.get("paris") == "value 1"
+
+
+def test_top_n_per_upstream(prefetcher):
+    cache = TTLCache("t")
+    loaders = {city: Loader() for city in ("a", "b", "c")}
+    for times, city in enumerate(loaders, 3):
+        hit(prefetcher, cache, city, loaders[city], times)
+    hit(prefetcher, cache, "news", Loader(), 3, upstream="news")
+
+    hot = prefetcher.hot()
+    assert [e.key for e in hot["weather"]] == ["c", "b"]
+    assert [e.key for e in hot["news"]] == ["news"]
+
+
+def test_entries_far_from_expiry_are_left_alone(prefetcher):
+    cache = TTLCache("t")
+    loader = Loader()
+    cache.set("paris", "cached", ttl=300)
+    hit(prefetcher, cache, "paris", loader, 3)
+    assert prefetcher.run_once() == 0
+
+    cache.set("paris", "cached", ttl=0.2)
+    hit(prefetcher, cache, "paris", loader, 3)
+    assert prefetcher.run_once() == 0
+    time.sleep(0.12)  # past half its TTL
+    hit(prefetcher, cache, "paris", loader, 3)
+    assert prefetcher.run_once() == 1 and cache.get("paris") == "value 1"
+
+
+def test_scores_decay_until_entries_are_dropped(prefetcher):
+    cache = TTLCache("t")
+    hit(prefetcher, cache, "paris", Loader(ttl=0), 2)
+    prefetcher.run_once()
+    assert prefetcher.hot()["weather"] == []  # 2 * 0.5 is below min_score
+    for _ in range(4):
+        prefetcher.run_once()
+    assert prefetcher._entries == {}
+
+
+def test_budget_caps_refreshes():
+    prefetcher = Prefetcher(min_score=2, budgets_per_hour={"weather": 1})
+    prefetcher._thread = object()
+    cache = TTLCache("t")
+    a, b = Loader(), Loader()
+    hit(prefetcher, cache, "a", a, 3)
+    hit(prefetcher, cache, "b", b, 3)
+    assert prefetcher.run_once() == 1
+    assert a.calls + b.calls == 1
+
+
+def test_zero_budget_disables_an_upstream():
+    p = Prefetcher(min_score=1, budgets_per_hour={"news": 0})
+    p._thread = object()
+    loader = Loader()
+    p.record("news", TTLCache("t"), "q", loader)
+    assert p.run_once() == 0 and loader.calls == 0
+
+
+def test_failed_refresh_keeps_the_old_entry(prefetcher):
+    cache = TTLCache("t")
+    cache.set("paris", "cached", ttl=1)
+    hit(prefetcher, cache, "paris", Loader(fail=True), 3)
+    assert prefetcher.run_once() == 0
+    assert cache.get("paris") == "cached"
+
+    hit(prefetcher, cache, "paris", Loader(ttl=0), 3)  # error result: not stored
+    assert prefetcher.run_once() == 0
+    assert cache.get("paris") == "cached"
+
+
+def test_tracking_is_bounded():
+    p = Prefetcher(max_tracked=2)
+    p._thread = object()
+    cache = TTLCache("t")
+    hit(p, cache, "a", Loader(), 3)
+    hit(p, cache, "b", Loader(), 1)
+    hit(p, cache, "c", Loader(), 1)
+    assert {key for _, key in p._entries} == {"a", "c"}
+
+
+def test_short_ttl_entries_are_not_refetched_every_cycle(prefetcher):
+    # A TTL of 16s is inside the 20s two-interval lead as soon as it is stored
+    cache = TTLCache("t")
+    loader = Loader(ttl=16)
+    hit(prefetcher, cache, "paris", loader, 3)
+    assert prefetcher.run_once() == 1
+    hit(prefetcher, cache, "paris", loader, 3)
+    assert prefetcher.run_once() == 0 and loader.calls == 1
+    assert cache.entry_ttl("paris") == 16
@@ -0,0 +1,133 @@
+import time
+
+import httpx
+import pytest
+
+from tools.news_tool import _search_news
+from tools.weather_tool import _get_weather, weather_cache
+from utils.http_client import HttpClient, get_http_client
+from utils.resilience import CircuitBreaker, TokenBucket, UpstreamUnavailable
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve(max_wait=1) == 0.0
+    assert bucket.reserve(max_wait=1) == 0.0
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.1, abs=0.02)
+    # The queue is now 0.2s long: a caller that can't wait that long takes nothing
+    assert bucket.reserve(max_wait=0.05) is None
+    assert TokenBucket(rate=0, burst=1).reserve(max_wait=0) == 0.0
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes():
+    breaker = CircuitBreaker("api", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow() is None and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.allow() > 0
+
+    time.sleep(0.06)
+    assert breaker.allow() is None and breaker.state == "half_open"
+    assert breaker.allow() is not None  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow() is None
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("api", failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.allow() is None
+
+
+def client_with(handler, **kwargs) -> HttpClient:
+    kwargs.setdefault("backoff_base", 0.0)
+    kwargs.setdefault("max_retries", 0)
+    client = HttpClient(**kwargs)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_open_circuit_fails_fast_without_sending():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = client_with(handler, breaker_failure_threshold=2, breaker_reset_timeout=30)
+    for _ in range(2):
+        assert client.get("http://api.test/x").status_code == 503
+    with pytest.raises(UpstreamUnavailable) as exc:
+        client.get("http://api.test/x")
+    assert exc.value.retry_after > 0
+    assert len(calls) == 2
+    # Other hosts have their own breaker
+    assert client.get("http://other.test/x").status_code == 503
+
+
+def test_client_errors_do_not_open_the_circuit():
+    client = client_with(lambda request: httpx.Response(404), breaker_failure_threshold=1)
+    for _ in range(3):
+        assert client.get("http://api.test/x").status_code == 404
+
+
+def test_rate_limit_rejects_when_the_wait_is_too_long():
+    client = client_with(
+        lambda request: httpx.Response(200),
+        host_rate_limits={"api.test": (1.0, 1)},
+        rate_limit_max_wait=0.1,
+    )
+    assert client.get("http://api.test/x").status_code == 200
+    with pytest.raises(UpstreamUnavailable):
+        client.get("http://api.test/x")
+    assert client.get("http://unlimited.test/x").status_code == 200
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    client = get_http_client()
+    monkeypatch.setattr(client, "max_retries", 0)
+    monkeypatch.setattr(client, "breaker_failure_threshold", 0)
+
+
+def expire(cache):
+    for key in cache.keys():
+        cache.set(key, cache.lookup(key)[0], ttl=0.01)
+    time.sleep(0.02)
+
+
+def test_weather_serves_last_known_value_while_upstream_is_down(upstream, no_retries, monkeypatch):
+    fresh = _get_weather("Paris")
+    monkeypatch.setattr(weather_cache, "stale_ttl", 0)
+    expire(weather_cache)
+    upstream.status = 503
+    result = _get_weather("Paris")
+    assert result["stale"] is True
+    assert result["data"] == fresh["data"]
+    assert weather_cache.stats()["error_fallbacks"] >= 1
+
+
+def test_news_serves_last_known_result_while_upstream_is_down(upstream, no_retries, monkeypatch):
+    from tools.news_tool import news_cache
+
+    fresh = _search_news(query="electric cars")
+    monkeypatch.setattr(news_cache, "stale_ttl", 0)
+    expire(news_cache)
+    upstream.status = 503
+    result = _search_news(query="electric cars")
+    assert result["stale"] is True and result["articles"] == fresh["articles"]
+
+
+def test_without_a_last_known_value_the_error_is_returned(upstream, no_retries):
+    upstream.status = 503
+    result = _get_weather("Paris")
+    assert result["data"] == {} and result["message"].startswith("Error")
+    assert "stale" not in result
@@ -0,0 +1,114 @@
+import json
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import Chatbot
+from api_import import keys_settings
+from benchmarks.fakes import ScriptedChatModel
+from tools.weather_tool import weather_cache
+from utils.cache import TTLCache
+from utils.http_client import get_http_client
+from utils.response_cache import ResponseCache, is_fallback_result
+
+
+@pytest.fixture
+def chat(upstream):
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    graph = chatbot.create_graph(MemorySaver())
+    turns = iter(range(1000))
+
+    def ask(text):
+        config = {"configurable": {"thread_id": f"rc-{next(turns)}"}}
+        return graph.invoke({"messages": [HumanMessage(content=text)]}, config)["messages"][-1].content
+
+    ask.chatbot = chatbot
+    return ask
+
+
+@pytest.fixture
+def upstream_down(upstream, monkeypatch):
+    client = get_http_client()
+    monkeypatch.setattr(client, "max_retries", 0)
+    monkeypatch.setattr(client, "breaker_failure_threshold", 0)
+    return upstream
+
+
+def test_router_turn_for_known_place_is_cached(chat, upstream):
+    first = chat("weather in London")
+    assert chat("Weather in London?") == first
+    assert upstream.requests == 1
+    assert chat.chatbot.response_cache.stats()["hits"] == 1
+
+
+def test_router_turn_for_unknown_place_is_not_cached(chat, upstream, monkeypatch):
+    # Without the gazetteer "weather in X" is routed for any X, but the answer isn't cached
+    monkeypatch.setattr(keys_settings, "gazetteer_enabled", False)
+    chat("weather in Atlantis")
+    chat("weather in Atlantis")
+    assert chat.chatbot.response_cache.stats()["size"] == 0
+
+
+def test_answer_to_an_error_is_not_cached(chat, upstream_down):
+    upstream_down.status = 503
+    chat("weather in London")
+    assert chat.chatbot.response_cache.stats()["size"] == 0
+
+
+def test_answer_built_on_stale_if_error_value_is_not_cached(chat, upstream_down, monkeypatch):
+    chat("weather in Paris")
+    chat.chatbot.response_cache.clear()
+    # Expire the entry past its stale window, then take the upstream down
+    key = weather_cache.keys()[0]
+    weather_cache.set(key, weather_cache.lookup(key)[0], ttl=0.01)
+    monkeypatch.setattr(weather_cache, "stale_ttl", 0)
+    time.sleep(0.02)
+    upstream_down.status = 503
+
+    config = {"configurable": {"thread_id": "rc-stale"}}
+    messages = chat.chatbot.create_graph(MemorySaver()).invoke(
+        {"messages": [HumanMessage(content="weather in Paris")]}, config
+    )["messages"]
+    tool_result = json.loads(messages[-2].content)
+    assert tool_result["stale"] is True and tool_result["data"]["city"]
+    assert chat.chatbot.response_cache.stats()["size"] == 0
+
+    # Even if a refresh makes the cache entry fresh before the answer is stored
+    upstream_down.status = 200
+    weather_cache.set(key, weather_cache._last_known(key))
+    chat.chatbot._cache_response(messages[:-1], messages[-1])
+    assert chat.chatbot.response_cache.stats()["size"] == 0
+
+
+@pytest.mark.parametrize("content, fallback", [
+    (json.dumps({"message": "ok", "data": {"city": "Paris"}}), False),
+    (json.dumps({"message": "Error: upstream service unavailable (503)", "data": {}}), True),
+    (json.dumps({"message": "Request failed: timeout", "count": 0, "articles": []}), True),
+    (json.dumps({"message": "Weather service unavailable", "data": {"city": "Paris"}, "stale": True}), True),
+    (json.dumps({"message": "Weather fetched for 1 of 2 locations", "results": {
+        "Paris": {"message": "ok", "data": {"city": "Paris"}},
+        "Oslo": {"message": "Error: 400 - no matching location", "data": {}},
+    }}), True),
+    ("not json", True),
+])
+def test_is_fallback_result(content, fallback):
+    assert is_fallback_result(content) is fallback
+
+
+def test_cached_answer_is_dropped_when_its_data_changes():
+    tool_cache = TTLCache("t", ttl=60)
+    tool_cache.set("paris", {"temperature": 20})
+    responses = ResponseCache()
+    assert responses.set("Weather in Paris", "It's 20°C", [(tool_cache, "paris")])
+    assert responses.get("weather in paris!") == "It's 20°C"
+    tool_cache.set("paris", {"temperature": 25})
+    assert responses.get("weather in paris") is None
+    assert responses.stats()["invalidations"] == 1
+
+
+def test_answer_is_not_stored_without_fresh_data():
+    tool_cache = TTLCache("t", ttl=60)
+    responses = ResponseCache()
+    assert not responses.set("weather in paris", "It's 20°C", [(tool_cache, "paris")])
@@ -0,0 +1,70 @@
+import pytest
+
+from api_import import keys_settings
+from utils.router import FastPathRouter
+
+
+@pytest.fixture
+def router():
+    return FastPathRouter(threshold=0.85)
+
+
+@pytest.mark.parametrize("text", [
+    "weather update",
+    "weather report",
+    "nice weather",
+    "weather sucks",
+    "temperature check",
+    "room temperature",
+    "body temperature",
+    "Nice weather today, isn't it?",
+    "weather tomorrow in London",
+    "weather in London and Paris",
+    "what's the weather there",
+    "temperature for baking bread",
+    "temperature in celsius",
+    "what is the weather like in spring",
+    "Temperature for a fever?",
+    "what is the temperature at which water boils",
+])
+def test_not_routed(router, text):
+    assert router.route(text) is None
+
+
+@pytest.mark.parametrize("text, location", [
+    ("weather in London", "London"),
+    ("What's the weather like in New York?", "New York"),
+    ("temperature for Dubai", "Dubai"),
+    ("London weather", "London"),
+    ("weather Paris", "Paris"),
+    ("Tokyo temperature", "Tokyo"),
+])
+def test_weather_routed(router, text, location):
+    decision = router.route(text)
+    assert decision is not None and decision.tool == "get_weather"
+    assert decision.args["location"] == location
+
+
+def test_weather_details(router):
+    decision = router.route("weather in Berlin with humidity and wind speed")
+    assert decision.args == {"location": "Berlin", "include_humidity": True, "include_wind_speed": True}
+
+
+def test_bare_patterns_need_the_gazetteer(router, monkeypatch):
+    monkeypatch.setattr(keys_settings, "gazetteer_enabled", False)
+    assert router.route("London weather") is None
+    assert router.route("weather in London") is not None
+
+
+@pytest.mark.parametrize("text", ["top headlines", "show me today's top headlines", "latest headlines please"])
+def test_headlines_routed(router, text):
+    assert router.route(text).args == {"top_headlines": True}
+
+
+def test_stats(router):
+    router.route("weather in London")
+    router.route("weather update")
+    router.route("tell me a joke")
+    assert router.stats.total == 3 and router.stats.fast_path == 1
+    assert router.stats.by_intent == {"weather": 1}
+    assert router.fast_path_rate() == pytest.approx(1 / 3)
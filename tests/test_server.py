@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_core.messages import AIMessage
+
+import server
+from server import ServerBusy, SessionBusy, SessionManager
+
+
+class EchoGraph:
+    """Stands in for the compiled graph: echoes the message and tracks concurrency."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.order = []
+
+    async def ainvoke(self, state, config):
+        message = state["messages"][0].content
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            self.order.append((config["configurable"]["thread_id"], message))
+            return {"messages": [AIMessage(content=f"echo {message}")]}
+        finally:
+            self.running -= 1
+
+
+def manager_for(graph, **kwargs):
+    options = {"max_workers": 4, "queue_size": 8, "max_sessions": 10, "idle_ttl": 60}
+    options.update(kwargs)
+    return SessionManager(graph, **options)
+
+
+def test_turns_of_one_session_run_in_order():
+    async def run():
+        graph = EchoGraph()
+        manager = manager_for(graph)
+        results = await asyncio.gather(*(manager.submit("t", f"m{i}") for i in range(5)))
+        await manager.shutdown(1)
+        return graph, results
+
+    graph, results = asyncio.run(run())
+    assert [r["response"] for r in results] == [f"echo m{i}" for i in range(5)]
+    assert [m for _, m in graph.order] == [f"m{i}" for i in range(5)]
+    assert graph.max_running == 1
+
+
+def test_sessions_run_concurrently_up_to_max_workers():
+    async def run():
+        graph = EchoGraph()
+        manager = manager_for(graph, max_workers=3)
+        await asyncio.gather(*(manager.submit(f"t{i}", "hi") for i in range(6)))
+        await manager.shutdown(1)
+        return graph
+
+    assert asyncio.run(run()).max_running == 3
+
+
+def test_full_session_queue_is_backpressure():
+    async def run():
+        manager = manager_for(EchoGraph(delay=0.1), queue_size=1)
+        first = asyncio.ensure_future(manager.submit("t", "one"))
+        await asyncio.sleep(0.01)  # "one" is running, the queue is empty again
+        second = asyncio.ensure_future(manager.submit("t", "two"))
+        await asyncio.sleep(0)
+        with pytest.raises(SessionBusy):
+            await manager.submit("t", "three")
+        await asyncio.gather(first, second)
+        await manager.shutdown(1)
+
+    asyncio.run(run())
+
+
+def test_session_limit_and_shutdown_reject_new_turns():
+    async def run():
+        manager = manager_for(EchoGraph(), max_sessions=1)
+        await manager.submit("a", "hi")
+        with pytest.raises(ServerBusy):
+            await manager.submit("b", "hi")
+        await manager.shutdown(1)
+        with pytest.raises(ServerBusy):
+            await manager.submit("a", "hi")
+        assert manager.stats() == {"sessions": 0, "pending_turns": 0, "accepting": False}
+
+    asyncio.run(run())
+
+
+def test_shutdown_drains_queued_turns():
+    async def run():
+        manager = manager_for(EchoGraph(delay=0.05))
+        turns = [asyncio.ensure_future(manager.submit("t", f"m{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        await manager.shutdown(5)
+        return [t.result()["response"] for t in turns]
+
+    assert asyncio.run(run()) == ["echo m0", "echo m1", "echo m2"]
+
+
+@pytest.mark.filterwarnings("ignore::aiohttp.web.NotAppKeyWarning")  # server.py uses plain string app keys
+def test_http_endpoints():
+    async def run():
+        app = web.Application()
+        app.router.add_post("/chat", server.chat)
+        app.router.add_get("/ws", server.chat_ws)
+        app.router.add_get("/health", server.health)
+        app["sessions"] = manager_for(EchoGraph())
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/chat", json={"thread_id": "h", "message": "hello"})
+            assert response.status == 200
+            assert (await response.json())["response"] == "echo hello"
+
+            response = await client.post("/chat", json={"message": "  "})
+            assert response.status == 400
+            response = await client.post("/chat", data="not json")
+            assert response.status == 400
+
+            async with client.ws_connect("/ws?thread_id=w") as ws:
+                await ws.send_str("hi there")
+                reply = await ws.receive_json()
+                assert reply == {"status": 200, "thread_id": "w", "response": "echo hi there", "elapsed": reply["elapsed"]}
+
+            health = await (await client.get("/health")).json()
+            assert health["status"] == "ok" and health["sessions"] == 2
+            await app["sessions"].shutdown(1)
+
+    asyncio.run(run())
+
+
+@pytest.mark.filterwarnings("ignore::aiohttp.web.NotAppKeyWarning")
+def test_shutdown_closes_the_checkpointer(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.keys_settings, "checkpointer", "sqlite")
+    monkeypatch.setattr(server.keys_settings, "checkpoint_db_path", str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(server.keys_settings, "prewarm", False)
+    monkeypatch.setattr(server.keys_settings, "prefetch_enabled", False)
+
+    async def run():
+        app = web.Application()
+        await server._on_startup(app)
+        writer = app["checkpointer"]._writer
+        assert writer.is_alive()
+        await server._on_shutdown(app)
+        return writer
+
+    assert not asyncio.run(run()).is_alive()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools.weather_tool import _aget_weather, _get_weather
+from utils.singleflight import SingleFlight
+
+
+def slow(value, delay=0.1, calls=None):
+    def fn():
+        if calls is not None:
+            calls.append(value)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def test_concurrent_threads_share_one_load():
+    flight, calls = SingleFlight("t"), []
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: flight.do("k", slow("v", calls=calls)), range(8)))
+    assert results == ["v"] * 8
+    assert calls == ["v"]
+    assert flight.stats() == {"name": "t", "issued": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight("t")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("upstream down")
+
+    def wait_then_join():
+        started.wait()
+        return flight.do("k", lambda: "not called")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "k", failing)
+        follower = pool.submit(wait_then_join)
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+    # The next call runs a fresh load
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_async_callers_share_one_load():
+    flight, calls = SingleFlight("t"), []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def run():
+        return await asyncio.gather(*(flight.ado("k", load) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["v"] * 5
+    assert calls == [1]
+
+
+def test_thread_waits_for_async_leader():
+    flight = SingleFlight("t")
+    started = threading.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.1)
+        return "from loop"
+
+    def thread_caller():
+        started.wait()
+        return flight.do("k", lambda: "own load")
+
+    with ThreadPoolExecutor(1) as pool:
+        follower = pool.submit(thread_caller)
+        assert asyncio.run(flight.ado("k", load)) == "from loop"
+        assert follower.result() == "from loop"
+
+
+def test_concurrent_weather_misses_hit_upstream_once(upstream):
+    upstream.latency = 0.1
+    try:
+        with ThreadPoolExecutor(6) as pool:
+            results = list(pool.map(lambda _: _get_weather("Paris"), range(6)))
+
+        async def run():
+            return await asyncio.gather(*(_aget_weather("Tokyo") for _ in range(6)))
+
+        async_results = asyncio.run(run())
+    finally:
+        upstream.latency = 0.0
+    assert upstream.requests == 2
+    assert all(r == results[0] for r in results) and all(r == async_results[0] for r in async_results)
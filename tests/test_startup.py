@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str, tmp_path, **env) -> subprocess.CompletedProcess:
+    environment = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "WEATHER_API_KEY", "NEWS_API_KEY")}
+    environment.update(LOG_DIR=str(tmp_path / "logs"), **env)
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environment, capture_output=True, text=True)
+
+
+def test_importing_settings_does_not_load_them(tmp_path):
+    # No API keys in the environment: validation would fail if it ran on import
+    result = run_python("import api_import; print(api_import.keys_settings._settings is None)", tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "True"
+
+
+def test_settings_load_on_first_access(tmp_path):
+    code = "from api_import import keys_settings; print(keys_settings.server_port)"
+    result = run_python(code, tmp_path, OPENAI_API_KEY="k", WEATHER_API_KEY="k", NEWS_API_KEY="k", SERVER_PORT="8123")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "8123"
+
+
+def test_logger_starts_on_first_record(tmp_path):
+    code = (
+        "import os, threading, utils.uLogger as u\n"
+        "print(os.path.exists(u.log_dir()), threading.active_count())\n"
+        "u.logger.info('hello')\n"
+        "u.stop_logging()\n"
+        "print(open(os.path.join(u.log_dir(), 'log_file.log')).read().strip().endswith('hello'))\n"
+    )
+    result = run_python(code, tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["False", "1", "True"]
+
+
+def test_chatbot_defers_llm_client():
+    from agent import Chatbot
+
+    bot = Chatbot()
+    assert bot._llms == {}
+    assert bot._full_schema_tokens is None
@@ -0,0 +1,51 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import Chatbot
+from benchmarks.fakes import ScriptedChatModel
+from utils.stream_helper import astream_turn, stream_turn
+
+
+def make_graph(fast_path=False):
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    chatbot.fast_path_enabled = fast_path
+    return chatbot.create_graph(MemorySaver())
+
+
+def turn(text):
+    return {"messages": [HumanMessage(content=text)]}
+
+
+def test_stream_turn_emits_tool_events_then_tokens(upstream):
+    events = list(stream_turn(make_graph(), turn("weather in Paris"), {"configurable": {"thread_id": "s1"}}))
+    kinds = [e["type"] for e in events]
+    assert kinds[:2] == ["tool_call", "tool_result"]
+    assert events[0]["name"] == "get_weather" and events[0]["args"]["location"] == "Paris"
+    assert events[1] == {"type": "tool_result", "name": "get_weather", "status": "success"}
+    tokens = [e["text"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1  # one chunk per word
+    assert kinds[-1] == "done"
+    final = events[-1]["state"]["messages"][-1].content
+    assert "".join(tokens).strip() == final.strip()
+
+
+def test_astream_turn_matches_the_sync_events(upstream):
+    async def collect():
+        graph = make_graph()
+        return [e async for e in astream_turn(graph, turn("weather in Paris"), {"configurable": {"thread_id": "s2"}})]
+
+    events = asyncio.run(collect())
+    assert [e["type"] for e in events][:2] == ["tool_call", "tool_result"]
+    assert events[-1]["type"] == "done"
+    assert any(e["type"] == "token" for e in events)
+
+
+def test_fast_path_and_cached_answers_are_streamed(upstream):
+    graph = make_graph(fast_path=True)
+    first = list(stream_turn(graph, turn("weather in London"), {"configurable": {"thread_id": "s3"}}))
+    assert first[0]["type"] == "tool_call"  # emitted by the router, no LLM call
+    cached = list(stream_turn(graph, turn("weather in London"), {"configurable": {"thread_id": "s4"}}))
+    assert [e["type"] for e in cached] == ["token", "done"]
+    assert cached[0]["text"] == cached[-1]["state"]["messages"][-1].content
@@ -0,0 +1,73 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from agent import Chatbot
+from utils.token_budget import MESSAGE_OVERHEAD_TOKENS, TokenCounter, trim_to_budget
+
+
+def estimating_counter():
+    """Counter on the 4 chars/token estimate, independent of tiktoken being downloadable."""
+    counter = TokenCounter()
+    counter._encoding_loaded = True
+    return counter
+
+
+def text(tokens):
+    return "x" * (4 * tokens)
+
+
+def history(turns):
+    messages = []
+    for i in range(turns):
+        call = AIMessage(content="", id=f"c{i}", tool_calls=[{"name": "get_weather", "args": {}, "id": f"call{i}"}])
+        messages += [
+            HumanMessage(content=text(10), id=f"h{i}"),
+            call,
+            ToolMessage(content=text(20), id=f"t{i}", tool_call_id=f"call{i}"),
+            AIMessage(content=text(10), id=f"a{i}"),
+        ]
+    return messages
+
+
+def test_counts_are_memoized_by_id_and_length():
+    counter = estimating_counter()
+    message = HumanMessage(content=text(10), id="m")
+    assert counter.count(message) == 10 + MESSAGE_OVERHEAD_TOKENS
+    counter.count(message)
+    assert len(counter._memo) == 1
+    compacted = HumanMessage(content=text(2), id="m")
+    assert counter.count(compacted) == 2 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_history_within_budget_is_untouched():
+    messages = history(3)
+    kept, dropped, _ = trim_to_budget(messages, estimating_counter(), budget=10_000)
+    assert kept == messages and dropped == []
+
+
+def test_oldest_history_is_dropped_first_and_tool_calls_stay_with_results():
+    messages = history(4) + [HumanMessage(content=text(10), id="now")]
+    counter = estimating_counter()
+    kept, dropped, tokens = trim_to_budget(messages, counter, budget=120)
+    assert kept[-1].id == "now" and tokens <= 120
+    assert [m.id for m in dropped] == [m.id for m in messages[:len(dropped)]]
+    kept_ids = {m.id for m in kept}
+    for i in range(4):
+        # An AIMessage with tool calls is never kept without its ToolMessage, or the reverse
+        assert (f"c{i}" in kept_ids) == (f"t{i}" in kept_ids)
+
+
+def test_current_turn_is_kept_even_over_budget():
+    messages = history(1) + [HumanMessage(content=text(500), id="now")]
+    kept, dropped, _ = trim_to_budget(messages, estimating_counter(), budget=50)
+    assert [m.id for m in kept] == ["now"]
+    assert len(dropped) == 4
+
+
+def test_chatbot_removes_dropped_messages_from_state():
+    chatbot = Chatbot()
+    chatbot.token_counter = estimating_counter()
+    chatbot.context_token_budget = 120
+    messages = history(4) + [HumanMessage(content=text(10), id="now")]
+    kept, removals = chatbot._trim_history(messages)
+    assert all(isinstance(r, RemoveMessage) for r in removals)
+    assert {r.id for r in removals} == {m.id for m in messages} - {m.id for m in kept}
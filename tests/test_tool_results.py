@@ -0,0 +1,79 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import Chatbot
+from benchmarks.fakes import ScriptedChatModel
+from tools.news_tool import project_news_result, summarize_news_result
+from tools.weather_tool import summarize_weather_result
+from utils.tool_results import compact_tool_messages
+
+WEATHER = json.dumps({
+    "message": "Weather fetched successfully for Paris",
+    "data": {"city": "Paris", "country": "France", "temperature": 21.0, "condition": "Sunny",
+             "last_updated": "2025-01-01 12:00", "humidity": 40},
+    "padding": "x" * 300,
+})
+
+
+def tool_message(content, i, name="get_weather"):
+    return ToolMessage(content=content, id=f"t{i}", name=name, tool_call_id=f"call{i}")
+
+
+def test_only_earlier_turns_are_compacted():
+    messages = [
+        HumanMessage(content="weather in Paris"), tool_message(WEATHER, 1), tool_message("short", 2),
+        HumanMessage(content="and now?"), tool_message(WEATHER, 3),
+    ]
+    replacements = compact_tool_messages(messages, {"get_weather": summarize_weather_result})
+    assert [r.id for r in replacements] == ["t1"]
+    compacted = replacements[0]
+    assert compacted.content.startswith("[earlier get_weather result, compacted] Paris, France: 21.0°C, Sunny")
+    assert "humidity 40" in compacted.content
+    assert compacted.additional_kwargs == {"compacted": True, "original_chars": len(WEATHER)}
+    # Already compacted results are not compacted again
+    assert compact_tool_messages([compacted, HumanMessage(content="next")], {}) == []
+
+
+def test_unknown_tools_use_the_default_summary():
+    messages = [tool_message("y" * 400, 1, name="other"), HumanMessage(content="next")]
+    (replacement,) = compact_tool_messages(messages, {})
+    assert replacement.content == "[earlier tool result, compacted] " + "y" * 200
+
+
+def news_result(n, description_chars=1000):
+    articles = [
+        {"title": f"Story {i}", "source": "Wire", "publishedAt": "2025-01-01", "url_for_details": f"https://n/{i}",
+         "description": "d" * description_chars, "author": "Someone"}
+        for i in range(n)
+    ]
+    return {"message": "News fetched successfully", "count": n, "articles": articles}
+
+
+def test_news_projection_fits_the_token_budget():
+    projected = project_news_result(news_result(10), token_budget=400)
+    assert len(json.dumps(projected["articles"])) // 4 <= 400
+    assert projected["count"] == len(projected["articles"]) >= 1
+    assert all("author" not in a for a in projected["articles"])
+    assert project_news_result({"message": "No results", "articles": []}) == {"message": "No results", "articles": []}
+
+
+def test_news_summary_lists_the_first_titles():
+    summary = summarize_news_result(json.dumps(news_result(7, description_chars=10)))
+    assert summary.startswith("[earlier search_news result, compacted] 7 articles: Story 0 (Wire)")
+    assert summary.endswith("and 2 more")
+
+
+def test_graph_compacts_the_previous_turns_results(upstream):
+    chatbot = Chatbot(llm=ScriptedChatModel())
+    chatbot.fast_path_enabled = False
+    chatbot.tool_compaction_enabled = True
+    graph = chatbot.create_graph(MemorySaver())
+    config = {"configurable": {"thread_id": "compact"}}
+    graph.invoke({"messages": [HumanMessage(content="news about Tokyo")]}, config)
+    state = graph.invoke({"messages": [HumanMessage(content="weather in Paris")]}, config)
+    news, weather = [m for m in state["messages"] if isinstance(m, ToolMessage)]
+    assert news.additional_kwargs.get("compacted") and news.content.startswith("[earlier search_news result")
+    assert not weather.additional_kwargs.get("compacted")
+    assert isinstance(state["messages"][-1], AIMessage)
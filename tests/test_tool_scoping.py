@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent import Chatbot
+from prompt_config import prompt_manager
+
+WEATHER_TOOLS = {"get_weather", "get_weather_batch"}
+ALL_TOOLS = WEATHER_TOOLS | {"search_news"}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def registered_tools():
+    Chatbot()  # registers the tools with their intents
+
+
+def select(*messages):
+    return prompt_manager.select_tools([HumanMessage(content=m) if isinstance(m, str) else m for m in messages])
+
+
+@pytest.mark.parametrize("query", [
+    "Nvidia",
+    "stocks",
+    "Apple vs Samsung",
+    "Floods",
+    "What is going on in Ukraine?",
+    "Tell me about the election results",
+])
+def test_no_detected_intent_binds_every_tool(query):
+    assert select(query) == ALL_TOOLS
+
+
+@pytest.mark.parametrize("query", ["thanks!", "thanks, bye", "Hello", "good morning, how are you?"])
+def test_small_talk_binds_no_tools(query):
+    assert select(query) == frozenset()
+
+
+@pytest.mark.parametrize("reply", ["ok", "Okay!", "great", "perfect", "sure", "ok, thanks"])
+def test_accepting_an_offer_keeps_the_tools(reply):
+    offer = AIMessage(content="Want me to check the weather in Paris?")
+    assert select("hello", offer, reply) == ALL_TOOLS
+
+
+def test_detected_intent_narrows_the_tools():
+    assert select("What's the weather in Paris?") == WEATHER_TOOLS
+    assert select("latest headlines") == {"search_news"}
+    assert select("weather and news for London") == ALL_TOOLS
+
+
+def test_tools_already_called_stay_bound():
+    call = AIMessage(content="", tool_calls=[{"name": "search_news", "args": {"query": "x"}, "id": "c1"}])
+    messages = ["What's the weather in Paris?", call, ToolMessage(content="{}", tool_call_id="c1")]
+    assert select(*messages) == ALL_TOOLS
+
+
+def test_compact_schemas_are_bound_for_every_tool():
+    schemas = prompt_manager.get_tool_schemas(select("Nvidia"))
+    full = prompt_manager.get_tool_schemas(select("Nvidia"), compact=False)
+    assert [s["function"]["name"] for s in schemas] == sorted(ALL_TOOLS)
+    assert sum(len(s["function"]["description"]) for s in schemas) < sum(
+        len(s["function"]["description"]) for s in full
+    )
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from api_import import keys_settings
+from tools.weather_tool import _aget_weather_batch, _get_weather_batch, batch_cache_dependencies, weather_cache
+
+
+@pytest.fixture
+def slow_upstream(upstream):
+    upstream.latency = 0.1
+    yield upstream
+    upstream.latency = 0.0
+
+
+def test_locations_are_fetched_concurrently(slow_upstream):
+    started = time.perf_counter()
+    result = _get_weather_batch(["London", "Paris", "Tokyo", "Berlin"])
+    elapsed = time.perf_counter() - started
+    assert slow_upstream.requests == 4
+    assert elapsed < 0.3  # 4 x 0.1s sequentially
+    assert result["message"] == "Weather fetched for 4 of 4 locations"
+    assert set(result["results"]) == {"London", "Paris", "Tokyo", "Berlin"}
+
+
+def test_async_batch_is_concurrent(slow_upstream):
+    started = time.perf_counter()
+    result = asyncio.run(_aget_weather_batch(["London", "Paris", "Tokyo"], include_humidity=True))
+    assert time.perf_counter() - started < 0.25
+    assert all("humidity" in item["data"] for item in result["results"].values())
+
+
+def test_repeated_places_are_fetched_once(upstream):
+    result = _get_weather_batch(["NYC", "New York", "new york, usa", "Paris", ""])
+    assert list(result["results"]) == ["NYC", "Paris"]
+    assert upstream.requests == 2
+    # Second call is served from the weather cache
+    _get_weather_batch(["Paris", "New York"])
+    assert upstream.requests == 2
+
+
+def test_location_limits(upstream, monkeypatch):
+    assert _get_weather_batch([])["message"].startswith("Error")
+    monkeypatch.setattr(keys_settings, "weather_batch_max_locations", 2)
+    assert _get_weather_batch(["London", "Paris", "Tokyo"])["message"] == "Error: at most 2 locations per call"
+    assert upstream.requests == 0
+
+
+def test_failures_are_reported_per_location(upstream):
+    _get_weather_batch(["London"])
+    upstream.status = 400
+    result = _get_weather_batch(["London", "Paris"])
+    assert result["message"] == "Weather fetched for 1 of 2 locations (failed: Paris)"
+    assert result["results"]["Paris"]["data"] == {}
+
+
+def test_cache_dependencies_follow_the_unique_locations(upstream):
+    dependencies = batch_cache_dependencies({"locations": ["NYC", "New York", "Paris"]})
+    assert [cache for cache, _ in dependencies] == [weather_cache, weather_cache]
+    assert len({key for _, key in dependencies}) == 2
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from utils.cache import TTLCache
+from tools.weather_tool import _get_weather, normalize_location
+
+
+@pytest.mark.parametrize("location, key", [
+    (" New  York ", "new york"),
+    ("NYC", "new york"),
+    ("São Paulo!", "são paulo"),
+    ("New York, USA", "new york, united states"),
+    ("Kingston, Canada", "kingston, canada"),
+])
+def test_normalize_location(location, key):
+    assert normalize_location(location) == key
+
+
+def test_country_qualifier_is_part_of_the_key(upstream):
+    canadian = _get_weather("Kingston, Canada")
+    bare = _get_weather("Kingston")
+    assert upstream.queries == ["Kingston, Canada", "Kingston"]
+    assert canadian["data"]["city"] != bare["data"]["city"]
+    # Both stay cached under their own key
+    assert _get_weather("Kingston")["data"] == bare["data"]
+    assert _get_weather("Kingston, Canada")["data"] == canadian["data"]
+    assert upstream.requests == 2
+
+
+def test_gazetteer_merges_spellings_of_one_place(upstream):
+    _get_weather("London, UK")
+    _get_weather("london")
+    assert upstream.requests == 1
+
+
+def test_one_entry_serves_every_field_selection(upstream):
+    plain = _get_weather("Kingston", include_humidity=False, include_wind_speed=False)
+    full = _get_weather("Kingston", include_humidity=True, include_wind_speed=True)
+    assert upstream.requests == 1
+    assert "humidity" not in plain["data"] and "wind_speed" not in plain["data"]
+    assert "humidity" in full["data"] and "wind_speed" in full["data"]
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("t", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_serves_stale_entries_while_refreshing():
+    cache = TTLCache("t", ttl=60, stale_ttl=60)
+    cache.set("k", "old", ttl=0.01)
+    time.sleep(0.02)
+    value, source = cache.get_or_load("k", lambda: ("new", 60))
+    assert (value, source) == ("old", "stale")
+    deadline = time.monotonic() + 2
+    while cache.lookup("k")[0] != "new" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.lookup("k") == ("new", "fresh")
+
+
+def test_ttl_cache_does_not_store_failed_loads():
+    cache = TTLCache("t", ttl=60)
+    assert cache.get_or_load("k", lambda: ("error", 0)) == ("error", "miss")
+    assert "k" not in cache
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 0)
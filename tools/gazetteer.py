@@ -0,0 +1,220 @@
+# Local location index used by get_weather to canonicalize free-text locations
+# before calling WeatherAPI (see Gazetteer).
+
+# Standard library imports
+import csv
+import os
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Third-party imports
+from thefuzz import fuzz, process
+
+# Local imports
+from utils.uLogger import logger
+from api_import import keys_settings
+
+BUNDLED_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+
+# Country spellings users (and the LLM) commonly use for a "city, country" qualifier
+COUNTRY_ALIASES = {
+    "usa": "US", "us": "US", "u s": "US", "u s a": "US", "america": "US", "united states of america": "US",
+    "uk": "GB", "u k": "GB", "britain": "GB", "great britain": "GB", "england": "GB", "scotland": "GB",
+    "wales": "GB", "uae": "AE", "emirates": "AE", "korea": "KR", "holland": "NL", "czechia": "CZ",
+    "turkiye": "TR", "ivory coast": "CI", "cote d ivoire": "CI", "drc": "CD", "congo": "CD",
+    "burma": "MM", "persia": "IR", "ksa": "SA",
+}
+
+MIN_FUZZY_CHARS = 4
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation: "São Paulo!" -> "sao paulo"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+class Place(NamedTuple):
+    id: str
+    name: str
+    country: str
+    country_code: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+    @property
+    def query(self) -> str:
+        """What to send to WeatherAPI: coordinates when known, else "name, country"."""
+        if self.lat is not None and self.lon is not None:
+            return f"{self.lat:.4f},{self.lon:.4f}"
+        if self.name == self.country:  # city-states: "Singapore", "Hong Kong"
+            return self.name
+        return f"{self.name}, {self.country}"
+
+
+class Gazetteer:
+    """
+    In-memory place index: normalized names and aliases -> place ids.
+
+    Places are kept in parallel lists (interned country codes, coordinates in a float
+    array), the index maps each name/alias to a tuple of place ids in importance order,
+    and fuzzy lookups only scan names sharing the first letter. `resolve` is memoized.
+
+    The bundled tools/data/gazetteer.csv covers major cities worldwide (name and country,
+    no coordinates); `load_geonames` adds a GeoNames cities file (e.g. cities15000.txt)
+    with coordinates for full coverage.
+    """
+
+    def __init__(self, fuzzy_threshold: int = 88, memo_size: int = 4096):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._names: List[str] = []
+        self._codes: List[str] = []
+        self._coords = array("f")
+        self._has_coords: List[bool] = []
+        self._index: Dict[str, Tuple[int, ...]] = {}
+        self._blocks: Dict[str, List[str]] = {}
+        self.countries: Dict[str, str] = {}  # country code -> name
+        self._country_codes: Dict[str, str] = dict(COUNTRY_ALIASES)  # normalized country name/code -> code
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def index_size(self) -> int:
+        """Number of distinct indexed names and aliases."""
+        return len(self._index)
+
+    def _add(self, name: str, code: str, aliases: List[str], lat: Optional[float] = None, lon: Optional[float] = None) -> None:
+        place_id = len(self._names)
+        self._names.append(name)
+        self._codes.append(sys.intern(code))
+        self._coords.extend((lat or 0.0, lon or 0.0))
+        self._has_coords.append(lat is not None and lon is not None)
+        for alias in {normalize_name(n) for n in [name, *aliases] if n}:
+            if not alias:
+                continue
+            ids = self._index.get(alias)
+            if ids is None:
+                self._blocks.setdefault(alias[0], []).append(alias)
+                self._index[alias] = (place_id,)
+            elif place_id not in ids:
+                self._index[alias] = ids + (place_id,)
+
+    def load_csv(self, path: str = BUNDLED_PATH) -> "Gazetteer":
+        """Load the bundled format: name,country,country_code,aliases (|-separated); # starts a comment."""
+        with open(path, encoding="utf-8") as f:
+            for row in csv.reader(line for line in f if line.strip() and not line.startswith("#")):
+                name, country, code = row[0].strip(), row[1].strip(), row[2].strip().upper()
+                aliases = [a.strip() for a in row[3].split("|")] if len(row) > 3 and row[3] else []
+                self.countries.setdefault(code, country)
+                self._country_codes.setdefault(normalize_name(country), code)
+                self._country_codes.setdefault(code.lower(), code)
+                self._add(name, code, aliases)
+        return self
+
+    def load_geonames(self, path: str, max_alternates: int = 5) -> "Gazetteer":
+        """
+        Load a GeoNames cities dump (tab-separated: name, asciiname, alternatenames, lat, lon,
+        country code, population at the standard column positions), most populous first.
+        Only short Latin alternate names are indexed to keep the index small.
+        """
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 15:
+                    continue
+                population = int(cols[14] or 0)
+                alternates = [a for a in cols[3].split(",") if a.isascii() and 3 < len(a) <= 40][:max_alternates]
+                rows.append((population, cols[1], cols[2], alternates, float(cols[4]), float(cols[5]), cols[8].upper()))
+        rows.sort(key=lambda row: row[0], reverse=True)
+        for _, name, ascii_name, alternates, lat, lon, code in rows:
+            self._country_codes.setdefault(code.lower(), code)
+            self._add(name, code, [ascii_name, *alternates], lat, lon)
+        return self
+
+    def place(self, place_id: int) -> Place:
+        name, code = self._names[place_id], self._codes[place_id]
+        lat, lon = (self._coords[2 * place_id], self._coords[2 * place_id + 1]) if self._has_coords[place_id] else (None, None)
+        return Place(
+            id=f"{normalize_name(name)}|{code.lower()}",
+            name=name,
+            country=self.countries.get(code, code),
+            country_code=code,
+            lat=round(lat, 4) if lat is not None else None,
+            lon=round(lon, 4) if lon is not None else None,
+        )
+
+    def _candidates(self, name: str) -> Tuple[int, ...]:
+        ids = self._index.get(name)
+        if ids is not None or len(name) < MIN_FUZZY_CHARS:
+            return ids or ()
+        match = process.extractOne(
+            name, self._blocks.get(name[0], []), scorer=fuzz.ratio, score_cutoff=self.fuzzy_threshold
+        )
+        if match is None:
+            return ()
+        logger.debug(f"[GAZETTEER] Fuzzy match {name!r} -> {match[0]!r} (score={match[1]})")
+        return self._index[match[0]]
+
+    def _resolve(self, location: str) -> Optional[Place]:
+        """
+        Map a free-text location ("paris", "Sao Paolo", "London, UK", "NYC") to a Place, or
+        None when it is unknown, a bare country, or qualified by a region/country that does
+        not match (e.g. "London, Ontario" when only London GB is indexed).
+        """
+        parts = [normalize_name(p) for p in (location or "").split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        name, qualifiers = parts[0], parts[1:]
+        if len(parts) == 1 and name in self._country_codes and name not in self._index:
+            return None  # a country: WeatherAPI resolves those itself
+
+        ids = self._candidates(name)
+        if not ids:
+            return None
+        if qualifiers:
+            codes = {self._country_codes.get(q) for q in qualifiers} - {None}
+            ids = tuple(i for i in ids if self._codes[i] in codes)
+            if not ids:
+                return None
+        return self.place(ids[0])
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures (names, index, blocks, coordinates)."""
+        size = sys.getsizeof(self._names) + sys.getsizeof(self._codes) + sys.getsizeof(self._has_coords)
+        size += sum(sys.getsizeof(n) for n in self._names) + self._coords.buffer_info()[1] * self._coords.itemsize
+        size += sys.getsizeof(self._index) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._index.items())
+        size += sys.getsizeof(self._blocks) + sum(sys.getsizeof(v) for v in self._blocks.values())
+        return size
+
+
+def load_gazetteer(extra_path: str = "", fuzzy_threshold: int = 88) -> Gazetteer:
+    """The bundled index plus, if `extra_path` is set, a GeoNames cities file."""
+    gazetteer = Gazetteer(fuzzy_threshold=fuzzy_threshold).load_csv()
+    if extra_path:
+        gazetteer.load_geonames(extra_path)
+    logger.info(f"[GAZETTEER] Loaded {len(gazetteer)} places ({gazetteer.index_size} names)")
+    return gazetteer
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide `Gazetteer`, loaded from `keys_settings` on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer(keys_settings.gazetteer_path, keys_settings.gazetteer_fuzzy_threshold)
+    return _gazetteer
@@ -1,36 +1,389 @@
-
 # Standard library imports
-import os
-import requests
-from typing import Dict, Any, Optional
+import re
+import json
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
-import configparser
 
 # Third-party imports
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+import httpx
+from thefuzz import fuzz
 
 # Local imports
 from utils.uLogger import logger
+from utils.cache import TTLCache
+from utils.http_client import describe_error, get_http_client
+from utils.metrics import metrics
+from utils.prefetch import prefetcher
 from api_import import keys_settings
 
 
+news_cache = TTLCache(
+    name="news",
+    maxsize=keys_settings.news_cache_size,
+    ttl=keys_settings.news_cache_ttl,
+    stale_if_error=keys_settings.news_cache_stale_if_error,
+    max_weight=keys_settings.news_cache_max_bytes,
+    weigher=lambda result: len(json.dumps(result)),
+)
+metrics.register_cache(news_cache.stats)
 
-# Standard library imports
-import os
-import requests
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone, timedelta
-import configparser
+# Short tool description bound when intent scoping is on (see prompt_config.PromptManager);
+# the full docstring of `_search_news` remains the reference.
+COMPACT_DESCRIPTION = (
+    "Search recent English news. For 'top headlines' set top_headlines=true (US; query and dates ignored). "
+    "Otherwise query is required (keywords or question). Optional sources: comma-separated ids like 'cnn,bbc-news'. "
+    "Optional from_date/to_date as YYYY-MM-DD (default last 7 days, from_date <= to_date). "
+    "Results are de-duplicated and ranked by relevance to the query; present only the articles matching "
+    "the request. If none are returned, retry once with fewer or broader keywords."
+)
 
-# Third-party imports
-from langchain_core.tools import tool
+# Filler words the LLM adds when rephrasing ("news about nvidia", "latest nvidia news").
+# They do not change what NewsAPI matches on, so they are dropped from the cache key.
+# Words that can be part of a name ("New York", "New Zealand") are not filler.
+QUERY_STOPWORDS = {
+    "a", "an", "the", "about", "on", "of", "for", "in", "regarding", "related", "to",
+    "news", "latest", "recent", "headlines", "articles", "article", "updates", "update",
+    "stories", "story", "today", "todays", "current", "any", "some",
+    "what", "whats", "is", "are", "show", "me", "give", "get", "find", "tell", "i", "need", "want",
+    "please",
+}
 
-# Local imports
-from utils.uLogger import logger
-from api_import import keys_settings
 
-@tool
-def search_news(
+def normalize_query(query: Optional[str]) -> str:
+    """Lowercase, drop punctuation and filler words, and sort tokens so word order does not matter."""
+    tokens = re.findall(r"\w+", (query or "").lower())
+    return " ".join(sorted({t for t in tokens if t not in QUERY_STOPWORDS}))
+
+
+# "Headline text - Reuters" / "Headline text | CNN": syndicated copies differ only in this suffix
+TITLE_SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,60}$")
+
+
+def _cache_key(
+    query: Optional[str],
+    sources: Optional[str],
+    from_date: Optional[str],
+    to_date: Optional[str],
+    top_headlines: bool,
+) -> Tuple[str, str, str, str, bool]:
+    if top_headlines:
+        # Query and dates are ignored for top headlines, so they must not split the key.
+        return ("", "", "", "", True)
+
+    # Exact normalized token set: "Nvidia news" and "news about nvidia" share an entry, while
+    # queries differing in any word or number ("Windows 10" / "Windows 11") never do.
+    normalized_sources = ",".join(sorted(s.strip().lower() for s in (sources or "").split(",") if s.strip()))
+    return (normalize_query(query), normalized_sources, from_date or "", to_date or "", False)
+
+
+def _parse_news_response(response: httpx.Response) -> Tuple[Dict[str, Any], Optional[float]]:
+    if response.status_code != 200:
+        return {
+            "message": describe_error(response),
+            "count": 0,
+            "articles": [],
+        }, 0
+
+    raw = response.json()
+    if raw.get("status") == "ok" and raw.get("totalResults", 0) == 0:
+        return {
+            "message": "No results found. Try rephrasing the query.",
+            "count": 0,
+            "articles": [],
+        }, None
+
+    articles = []
+    for art in raw.get("articles", []):
+        articles.append({
+            "source": art.get("source", {}).get("name", "-"),
+            "author": art.get("author", "-"),
+            "title": art.get("title", "-"),
+            "description": art.get("description", "-"),
+            "url_for_details": art.get("url", "-"),
+            "publishedAt": art.get("publishedAt", "-"),
+            "content": art.get("content", "-"),
+        })
+
+    return {
+        "message": "News fetched successfully",
+        "count": len(articles),
+        "articles": articles,
+    }, None
+
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: max(limit - 1, 0)].rstrip() + "…"
+
+
+def project_news_result(result: Dict[str, Any], token_budget: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compact view of a (cached) NewsAPI result for the LLM: title, source, date, url and a
+    truncated description per article; author and the article bodies are dropped.
+    Descriptions are shortened, then trailing articles dropped, until the result fits
+    `token_budget` (estimated at ~4 characters per token).
+    """
+    articles = result.get("articles") or []
+    if not articles:
+        return result
+
+    token_budget = keys_settings.news_result_token_budget if token_budget is None else token_budget
+    limit = keys_settings.news_description_chars
+    projected = [
+        {
+            "title": art.get("title", "-"),
+            "source": art.get("source", "-"),
+            "publishedAt": art.get("publishedAt", "-"),
+            "url_for_details": art.get("url_for_details", "-"),
+            "description": _truncate(art.get("description"), limit),
+        }
+        for art in articles
+    ]
+
+    def size(items) -> int:
+        return len(json.dumps(items, ensure_ascii=False)) // 4
+
+    while size(projected) > token_budget and limit > 40:
+        limit //= 2
+        for art, original in zip(projected, articles):
+            art["description"] = _truncate(original.get("description"), limit)
+    while size(projected) > token_budget and len(projected) > 1:
+        projected.pop()
+
+    return {**result, "count": len(projected), "articles": projected}
+
+
+def summarize_news_result(content: str) -> str:
+    """One-line summary of a `search_news` ToolMessage, used when old tool results are compacted."""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return _truncate(content, 200)
+    articles = result.get("articles") or []
+    if not articles:
+        return _truncate(result.get("message", ""), 200)
+    titles = "; ".join(f"{_truncate(a.get('title'), 80)} ({a.get('source', '-')})" for a in articles[:5])
+    more = f" and {len(articles) - 5} more" if len(articles) > 5 else ""
+    return f"[earlier search_news result, compacted] {len(articles)} articles: {titles}{more}"
+
+
+def query_variants(query: Optional[str]) -> List[str]:
+    """
+    The query as given plus its keyword form without filler words
+    ("What is news about Russia?" -> "russia"), which NewsAPI often matches better.
+    """
+    if not query:
+        return []
+    variants = [query]
+    keywords = " ".join(t for t in re.findall(r"\w+", query.lower()) if t not in QUERY_STOPWORDS)
+    if keywords and keywords != " ".join(re.findall(r"\w+", query.lower())):
+        variants.append(keywords)
+    return variants
+
+
+def _page_requests(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand one NewsAPI request into the page/query-variant requests fetched concurrently."""
+    pages = max(1, keys_settings.news_fetch_pages)
+    variants = query_variants(params.get("q")) if "q" in params else [None]
+    if not keys_settings.news_query_variants:
+        variants = variants[:1]
+
+    requests = []
+    for variant in variants:
+        for page in range(1, pages + 1):
+            request = {**params, "page": page}
+            if variant is not None:
+                request["q"] = variant
+            requests.append(request)
+    return requests
+
+
+def _relevance(article: Dict[str, Any], keywords: str) -> float:
+    title = fuzz.token_set_ratio(keywords, article.get("title") or "")
+    description = fuzz.token_set_ratio(keywords, article.get("description") or "")
+    return max(title, 0.8 * description)
+
+
+def rank_articles(articles: List[Dict[str, Any]], query: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Order articles by fuzzy relevance of title/description to `query`, newest first on ties.
+    Without a query (top headlines) the upstream order is kept.
+    """
+    keywords = normalize_query(query)
+    if not keywords:
+        return list(articles)
+    return sorted(articles, key=lambda a: (_relevance(a, keywords), a.get("publishedAt") or ""), reverse=True)
+
+
+def _title_key(title: Optional[str]) -> str:
+    return TITLE_SOURCE_SUFFIX.sub("", title or "").lower()
+
+
+def dedup_articles(articles: List[Dict[str, Any]], threshold: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Drop repeated urls, removed articles and syndicated copies whose titles (ignoring a
+    trailing " - Source") have a thefuzz token_sort_ratio >= `threshold` with an article
+    already kept. The first occurrence wins, so rank before de-duplicating.
+    """
+    kept: List[Dict[str, Any]] = []
+    kept_titles: List[str] = []
+    seen_urls = set()
+    for article in articles:
+        url = article.get("url_for_details")
+        title = _title_key(article.get("title"))
+        if url in seen_urls or title in ("", "-", "[removed]"):
+            continue
+        if any(fuzz.token_sort_ratio(title, other) >= threshold for other in kept_titles):
+            continue
+        kept.append(article)
+        kept_titles.append(title)
+        seen_urls.add(url)
+        if limit is not None and len(kept) >= limit:
+            break
+    return kept
+
+
+def _merge_results(
+    results: List[Tuple[Dict[str, Any], Optional[float]]],
+    query: Optional[str],
+) -> Tuple[Dict[str, Any], Optional[float]]:
+    """
+    Combine the page/variant results into one ranked, de-duplicated top-k result.
+    If any request failed the merged result is returned uncached (ttl 0) so it is retried.
+    """
+    if len(results) == 1 and not query:
+        return results[0]
+    successful = [result for result, _ in results if result.get("articles")]
+    if not successful:
+        return results[0]
+
+    articles = [article for result in successful for article in result["articles"]]
+    top = dedup_articles(rank_articles(articles, query), keys_settings.news_dedup_threshold, keys_settings.news_top_k)
+    logger.info(
+        f"[NEWS] Merged {len(results)} requests: {len(articles)} articles, "
+        f"{len(articles) - len(top)} duplicates/lower-ranked dropped, returning {len(top)}"
+    )
+    ttl = 0 if any(ttl == 0 for _, ttl in results) else None
+    return {"message": "News fetched successfully", "count": len(top), "articles": top}, ttl
+
+
+def _fetch_news(url: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Call NewsAPI. Returns `(result, ttl)`; failures get a ttl of 0 so they are never cached."""
+    try:
+        response = get_http_client().get(url, params=params)
+        return _parse_news_response(response)
+    except httpx.HTTPError as e:
+        return {"message": f"Request failed: {e}", "count": 0, "articles": []}, 0
+
+
+async def _afetch_news(url: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Async counterpart of `_fetch_news`."""
+    try:
+        response = await get_http_client().aget(url, params=params)
+        return _parse_news_response(response)
+    except httpx.HTTPError as e:
+        return {"message": f"Request failed: {e}", "count": 0, "articles": []}, 0
+
+
+def _fetch_news_pages(url: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Fetch all page/variant requests for `params` concurrently and merge them."""
+    requests = _page_requests(params)
+    if len(requests) == 1:
+        results = [_fetch_news(url, requests[0])]
+    else:
+        # Each worker runs in a copy of the caller's context so HTTP spans keep their parent tool run
+        with ThreadPoolExecutor(max_workers=len(requests), thread_name_prefix="news-fetch") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, _fetch_news, url, r) for r in requests]
+            results = [future.result() for future in futures]
+    return _merge_results(results, params.get("q"))
+
+
+async def _afetch_news_pages(url: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Async counterpart of `_fetch_news_pages`."""
+    requests = _page_requests(params)
+    results = await asyncio.gather(*(_afetch_news(url, r) for r in requests))
+    return _merge_results(list(results), params.get("q"))
+
+
+def _build_news_request(
+    query: Optional[str],
+    sources: Optional[str],
+    from_date: Optional[str],
+    to_date: Optional[str],
+    top_headlines: bool,
+) -> Tuple[Optional[str], Dict[str, Any], Any]:
+    """
+    Resolve tool arguments into `(url, params, cache_key)`.
+    On invalid input `url` is None and `params` holds the error result to return.
+    """
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    NEWS_API_KEY = keys_settings.news_api_key
+    if not NEWS_API_KEY:
+        return None, {"message": "Error: NEWS_API_KEY not set", "count": 0, "articles": []}, None
+
+    # --- Handle top headlines separately ---
+    if top_headlines:
+        url = f"{keys_settings.news_api_base_url}/top-headlines"
+        params = {
+            "apiKey": NEWS_API_KEY,
+            "category": "general",  # default
+            "country": "us",
+            "pageSize": 10,
+            "language": "en",
+            "page": 1,
+        }
+    else:
+        if not query:
+            return None, {
+                "message": "Error: query is required when top_headlines=False",
+                "count": 0,
+                "articles": [],
+            }, None
+
+        if not to_date:
+            to_date = today
+        if not from_date:
+            from_date = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
+
+        url = f"{keys_settings.news_api_base_url}/everything"
+        params = {
+            "apiKey": NEWS_API_KEY,
+            "q": query,
+            "sortBy": "publishedAt",
+            "pageSize": 10,
+            "page": 1,
+            "from": from_date,
+            "to": to_date,
+            "language": "en",
+        }
+        if sources:
+            params["sources"] = sources
+
+    return url, params, _cache_key(query, sources, from_date, to_date, top_headlines)
+
+
+def _mark_stale(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flag the last known result served while NewsAPI is failing (stale-if-error)."""
+    return {**result, "message": "News service unavailable, showing earlier results", "stale": True}
+
+
+def cache_dependency(args: Dict[str, Any]) -> Tuple[TTLCache, Any]:
+    """The news cache entry a `search_news` call with `args` reads (used by the response cache)."""
+    _, _, key = _build_news_request(
+        args.get("query"),
+        args.get("sources"),
+        args.get("from_date"),
+        args.get("to_date"),
+        args.get("top_headlines", False),
+    )
+    return news_cache, key
+
+
+def _search_news(
     query: Optional[str] = None,
     sources: Optional[str] = None,
     from_date: Optional[str] = None,
@@ -49,7 +402,8 @@ def search_news(
     - For **all other queries** (e.g., "Nvidia", "Apple vs Samsung", "stocks", "Floods",  
       "I need news about iPhone 17", "What is news about Russia") → you **must** provide `query`.  
       - Always map the user’s intent into this field.  
-      - If no results are returned, try rephrasing the user query and retry.  
+      - The query is searched as given; if no results are returned, rephrase it with fewer or  
+        broader keywords (e.g. `"Nvidia earnings"` instead of a full question) and retry once.  
       - Once results are fetched, return only the articles that best match the user’s request.  
 
     ### Parameters:
@@ -79,8 +433,10 @@ def search_news(
       `"science"`, `"sports"`, `"technology"`.  
       - Default: `"general"`.  
 
-    - **sort_by:** Always return the most recent articles first.  
-    - **Pagination:** Always fixed → `page=1`, `pageSize=10`.  
+    - **sort_by:** Articles are ranked by relevance to `query`, most recent first on ties.  
+    - **Pagination:** Handled internally → the first page (`pageSize=10`) is fetched (more pages  
+      concurrently if the deployment enables them), duplicates (syndicated copies of the same  
+      story) are removed and the top 10 are returned.  
     - **language:** Always `"en"` (English).  
 
     ### Returns:
@@ -89,98 +445,46 @@ def search_news(
         "count": int,     # number of articles returned
         "articles": [
             {
-                "source": str,
-                "author": str,
                 "title": str,
-                "description": str,
-                "url_for_details": str,
+                "source": str,
                 "publishedAt": str,
-                "content": str
+                "url_for_details": str,
+                "description": str   # truncated; full article bodies are not returned
             }
         ]
     }
     - If no results → `"message": "No results found. Try rephrasing the query."`, with empty `articles`.  
     - If request fails → `"message": "Request failed: <error>"`, with empty `articles`.  
+    - If the service is failing but earlier results are known → those results with `"stale": true`.  
     
     """
 
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    NEWS_API_KEY = keys_settings.news_api_key
-    if not NEWS_API_KEY:
-        return {"message": "Error: NEWS_API_KEY not set", "count": 0, "articles": []}
-
-    # --- Handle top headlines separately ---
-    if top_headlines:
-        url = "https://newsapi.org/v2/top-headlines"
-        params = {
-            "apiKey": NEWS_API_KEY,
-            "category": "general",  # default
-            "country": "us",
-            "pageSize": 10,
-            "language": "en",
-            "page": 1,
-        }
-    else:
-        if not query:
-            return {
-                "message": "Error: query is required when top_headlines=False",
-                "count": 0,
-                "articles": [],
-            }
-
-        if not to_date:
-            to_date = today
-        if not from_date:
-            from_date = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
+    url, params, key = _build_news_request(query, sources, from_date, to_date, top_headlines)
+    if url is None:
+        return params
 
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            "apiKey": NEWS_API_KEY,
-            "q": query,
-            "sortBy": "publishedAt",
-            "pageSize": 10,
-            "page": 1,
-            "from": from_date,
-            "to": to_date,
-            "language": "en",
-        }
-        if sources:
-            params["sources"] = sources
+    prefetcher.record("news", news_cache, key, lambda: _fetch_news_pages(url, params))
+    result, source = news_cache.get_or_load(key, lambda: _fetch_news_pages(url, params))
+    logger.info(f"[NEWS] Cache {source} for {key}")
+    return project_news_result(_mark_stale(result) if source == "stale-if-error" else result)
 
-    try:
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            return {
-                "message": f"Error: {response.status_code} - {response.text}",
-                "count": 0,
-                "articles": [],
-            }
 
-        raw = response.json()
-        if raw.get("status") == "ok" and raw.get("totalResults", 0) == 0:
-            return {
-                "message": "No results found. Try rephrasing the query.",
-                "count": 0,
-                "articles": [],
-            }
+async def _asearch_news(
+    query: Optional[str] = None,
+    sources: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    top_headlines: bool = False,
+) -> Dict[str, Any]:
+    url, params, key = _build_news_request(query, sources, from_date, to_date, top_headlines)
+    if url is None:
+        return params
 
-        articles = []
-        for art in raw.get("articles", []):
-            articles.append({
-                "source": art.get("source", {}).get("name", "-"),
-                "author": art.get("author", "-"),
-                "title": art.get("title", "-"),
-                "description": art.get("description", "-"),
-                "url_for_details": art.get("url", "-"),
-                "publishedAt": art.get("publishedAt", "-"),
-                "content": art.get("content", "-"),
-            })
+    prefetcher.record("news", news_cache, key, lambda: _fetch_news_pages(url, params))
+    result, source = await news_cache.aget_or_load(key, lambda: _afetch_news_pages(url, params))
+    logger.info(f"[NEWS] Cache {source} for {key}")
+    return project_news_result(_mark_stale(result) if source == "stale-if-error" else result)
 
-        return {
-            "message": "News fetched successfully",
-            "count": len(articles),
-            "articles": articles,
-        }
 
-    except requests.exceptions.RequestException as e:
-        return {"message": f"Request failed: {e}", "count": 0, "articles": []}
+# Sync and async implementations share one tool so ToolNode can use either path.
+search_news = StructuredTool.from_function(func=_search_news, coroutine=_asearch_news, name="search_news")
@@ -1,38 +1,381 @@
 # Standard library imports
-import os
-import requests
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone, timedelta
-import configparser
+import asyncio
+import contextvars
+import json
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 # Third-party imports
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+import httpx
 
 # Local imports
 from utils.uLogger import logger
+from utils.cache import TTLCache
+from utils.http_client import describe_error, get_http_client
+from utils.metrics import metrics
+from utils.prefetch import prefetcher
+from tools.gazetteer import get_gazetteer
 from api_import import keys_settings
 
 
+# Cache of full upstream results keyed by canonical location. Humidity and wind speed are
+# always stored so one entry answers every `include_*` variant of the tool call.
+weather_cache = TTLCache(
+    name="weather",
+    maxsize=keys_settings.weather_cache_size,
+    ttl=keys_settings.weather_update_interval,
+    stale_ttl=keys_settings.weather_cache_stale_ttl,
+    stale_if_error=keys_settings.weather_cache_stale_if_error,
+)
+metrics.register_cache(weather_cache.stats)
 
-# Standard library imports
-import os
-import requests
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone, timedelta
-import configparser
+# Normalized query -> canonical location key learned from upstream responses,
+# so "New York, USA" and "new york" share one cache entry after the first fetch.
+_location_aliases = TTLCache(name="weather-aliases", maxsize=keys_settings.weather_cache_size * 4, ttl=24 * 3600)
 
-# Third-party imports
-from langchain_core.tools import tool
+LOCATION_ALIASES = {
+    "nyc": "new york",
+    "ny": "new york",
+    "new york city": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "uae": "united arab emirates",
+    "uk": "united kingdom",
+    "usa": "united states",
+    "us": "united states",
+}
 
-# Local imports
-from utils.uLogger import logger
-from api_import import keys_settings
 
+def normalize_location(location: str) -> str:
+    """
+    Reduce a free-text location to a stable cache key.
+    e.g. " new york " and "NYC" map to "new york", "New York, USA" to "new york, united states".
+    Region/country qualifiers are kept: "Kingston, Canada" and "Kingston" may be different
+    places, so they only share an entry once the gazetteer or WeatherAPI resolves both to
+    the same place.
+    """
+    text = unicodedata.normalize("NFKC", location or "").lower()
+    text = re.sub(r"[^\w\s,]", " ", text)
+    parts = [" ".join(p.split()) for p in text.split(",")]
+    parts = [LOCATION_ALIASES.get(p, p) for p in parts if p]
+    return ", ".join(parts)
+
+
+WEATHER_URL = keys_settings.weather_api_url
+
+# Short tool description bound when intent scoping is on (see prompt_config.PromptManager);
+# the full docstring of `_get_weather` remains the reference.
+COMPACT_DESCRIPTION = (
+    "Current weather for a city or country (prefer the city if both are given). "
+    "Set include_humidity / include_wind_speed only if the user asks for them. "
+    "For several locations use get_weather_batch instead."
+)
+BATCH_COMPACT_DESCRIPTION = (
+    "Current weather for several cities/countries in one call (e.g. 'London, Paris and Tokyo'). "
+    "Pass every location in `locations`; results and errors are returned per location. "
+    "Set include_humidity / include_wind_speed only if the user asks for them."
+)
+
+
+def _ttl_from_last_updated(current: Dict[str, Any]) -> float:
+    """Seconds until WeatherAPI is expected to publish a newer observation than `current`."""
+    interval = keys_settings.weather_update_interval
+    last_updated_epoch = current.get("last_updated_epoch")
+    if not last_updated_epoch:
+        return interval
+
+    ttl = last_updated_epoch + interval - time.time()
+    return min(max(ttl, keys_settings.weather_cache_min_ttl), interval)
+
+
+def _parse_weather_response(response: httpx.Response) -> Tuple[Dict[str, Any], float]:
+    if response.status_code != 200:
+        return {
+            "message": describe_error(response),
+            "data": {},
+        }, 0
+
+    data = response.json()
+    weather_info = {
+        "city": data["location"]["name"],
+        "country": data["location"]["country"],
+        "temperature": data["current"]["temp_c"],
+        "condition": data["current"]["condition"]["text"],
+        "last_updated": data["current"]["last_updated"],
+        "humidity": data["current"]["humidity"],
+        "wind_speed": data["current"]["wind_kph"],
+    }
+    location_id = ", ".join(
+        data["location"].get(field, "") for field in ("name", "region", "country")
+    ).lower()
+    return {"message": "ok", "data": weather_info, "location_id": location_id}, _ttl_from_last_updated(data["current"])
+
+
+def _fetch_weather(location: str) -> Tuple[Dict[str, Any], float]:
+    """Call WeatherAPI for `location`. Returns `(result, ttl)`; errors get a ttl of 0 so they are never cached."""
+    weather_api_key = keys_settings.weather_api_key
+    if not weather_api_key:
+        return {"message": "Error: WEATHER_API_KEY not set", "data": {}}, 0
+
+    params = {"key": weather_api_key, "q": location}
+    try:
+        response = get_http_client().get(WEATHER_URL, params=params)
+        return _parse_weather_response(response)
+    except httpx.HTTPError as e:
+        return {"message": f"Request failed: {e}", "data": {}}, 0
+
+
+async def _afetch_weather(location: str) -> Tuple[Dict[str, Any], float]:
+    """Async counterpart of `_fetch_weather`."""
+    weather_api_key = keys_settings.weather_api_key
+    if not weather_api_key:
+        return {"message": "Error: WEATHER_API_KEY not set", "data": {}}, 0
+
+    params = {"key": weather_api_key, "q": location}
+    try:
+        response = await get_http_client().aget(WEATHER_URL, params=params)
+        return _parse_weather_response(response)
+    except httpx.HTTPError as e:
+        return {"message": f"Request failed: {e}", "data": {}}, 0
+
+
+def _remember_location(key: str, canonical: str, result: Dict[str, Any], ttl: float) -> None:
+    location_id = result.get("location_id")
+    if ttl > 0 and location_id and location_id != canonical:
+        # Remember which upstream location this query resolved to and cache under it too,
+        # so other spellings of the same place hit this entry after their first lookup.
+        _location_aliases.set(key, location_id)
+        weather_cache.set(location_id, result, ttl)
+
+
+def _resolve_location(location: str) -> Tuple[str, str, str, bool]:
+    """
+    Return `(key, canonical, query, indexed)`: the normalized location, the cache key, the
+    string sent to WeatherAPI and whether the local gazetteer recognized the place.
+    Gazetteer hits use the place id as cache key and its canonical name/coordinates as
+    query, so misspellings and "city, country" variants share one entry from the start.
+    """
+    key = normalize_location(location)
+    place = get_gazetteer().resolve(location) if keys_settings.gazetteer_enabled else None
+    if place is not None:
+        return key, place.id, place.query, True
+    return key, _location_aliases.lookup(key)[0] or key, location, False
+
+
+def cache_dependency(args: Dict[str, Any]) -> Tuple[TTLCache, str]:
+    """The weather cache entry a `get_weather` call with `args` reads (used by the response cache)."""
+    _, canonical, _, _ = _resolve_location(args.get("location", ""))
+    return weather_cache, canonical
+
+
+def _lookup_weather(location: str) -> Dict[str, Any]:
+    """Resolve `location` through the weather cache, fetching upstream on a miss."""
+    key, canonical, query, indexed = _resolve_location(location)
+    prefetcher.record("weather", weather_cache, canonical, lambda: _fetch_weather(query))
+
+    def _load() -> Tuple[Dict[str, Any], float]:
+        result, ttl = _fetch_weather(query)
+        if not indexed:
+            _remember_location(key, canonical, result, ttl)
+        return result, ttl
+
+    result, source = weather_cache.get_or_load(canonical, _load)
+    logger.info(f"[WEATHER] Cache {source} for {key!r} (canonical={canonical!r})")
+    return {**result, "stale": True} if source == "stale-if-error" else result
+
+
+async def _alookup_weather(location: str) -> Dict[str, Any]:
+    """Async counterpart of `_lookup_weather`."""
+    key, canonical, query, indexed = _resolve_location(location)
+    prefetcher.record("weather", weather_cache, canonical, lambda: _fetch_weather(query))
+
+    async def _aload() -> Tuple[Dict[str, Any], float]:
+        result, ttl = await _afetch_weather(query)
+        if not indexed:
+            _remember_location(key, canonical, result, ttl)
+        return result, ttl
+
+    result, source = await weather_cache.aget_or_load(canonical, _aload)
+    logger.info(f"[WEATHER] Cache {source} for {key!r} (canonical={canonical!r})")
+    return {**result, "stale": True} if source == "stale-if-error" else result
+
+
+def _format_weather(
+    location: str,
+    result: Dict[str, Any],
+    include_humidity: bool,
+    include_wind_speed: bool,
+) -> Dict[str, Any]:
+    """Project a cached upstream result onto the fields the tool call asked for."""
+    data = result.get("data")
+    if not data:
+        return {"message": result["message"], "data": {}}
+
+    weather_info = {
+        "city": data["city"],
+        "country": data["country"],
+        "temperature": data["temperature"],
+        "condition": data["condition"],
+        "last_updated": data["last_updated"],
+    }
+
+    if include_humidity:
+        weather_info["humidity"] = data["humidity"]
 
+    if include_wind_speed:
+        weather_info["wind_speed"] = data["wind_speed"]
+
+    if result.get("stale"):
+        # Last known value served while WeatherAPI is failing (stale-if-error)
+        return {
+            "message": f"Weather service unavailable, last known weather for {location}",
+            "data": weather_info,
+            "stale": True,
+        }
+    return {"message": f"Weather fetched successfully for {location} ", "data": weather_info}
+
+
+def summarize_weather_result(content: str) -> str:
+    """One-line summary of a `get_weather` ToolMessage, used when old tool results are compacted."""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return content[:200]
+    data = result.get("data") or {}
+    if not data:
+        return str(result.get("message", ""))[:200]
+    extras = "".join(
+        f", {label} {data[field]}" for field, label in (("humidity", "humidity"), ("wind_speed", "wind kph")) if field in data
+    )
+    return (
+        f"[earlier get_weather result, compacted] {data.get('city')}, {data.get('country')}: "
+        f"{data.get('temperature')}°C, {data.get('condition')}{extras} (updated {data.get('last_updated')})"
+    )
+
+
+def summarize_weather_batch_result(content: str) -> str:
+    """One-line summary of a `get_weather_batch` ToolMessage, used when old tool results are compacted."""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return content[:200]
+    parts = []
+    for location, item in (result.get("results") or {}).items():
+        data = item.get("data") or {}
+        if data:
+            parts.append(f"{data.get('city')}: {data.get('temperature')}°C, {data.get('condition')}")
+        else:
+            parts.append(f"{location}: {str(item.get('message', ''))[:60]}")
+    return "[earlier get_weather_batch result, compacted] " + "; ".join(parts)
+
+
+def _unique_locations(locations: List[str]) -> List[str]:
+    """Drop empty and repeated locations ("NYC" and "New York" are the same place), keeping order."""
+    unique, seen = [], set()
+    for location in locations:
+        key = _resolve_location(location)[1] if normalize_location(location) else ""
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(location)
+    return unique
+
+
+def batch_cache_dependencies(args: Dict[str, Any]) -> List[Tuple[TTLCache, str]]:
+    """The weather cache entries a `get_weather_batch` call with `args` reads (used by the response cache)."""
+    return [cache_dependency({"location": location}) for location in _unique_locations(args.get("locations") or [])]
+
+
+def _batch_result(
+    locations: List[str],
+    results: List[Dict[str, Any]],
+    include_humidity: bool,
+    include_wind_speed: bool,
+) -> Dict[str, Any]:
+    formatted = {
+        location: _format_weather(location, result, include_humidity, include_wind_speed)
+        for location, result in zip(locations, results)
+    }
+    failed = [location for location, item in formatted.items() if not item["data"]]
+    message = f"Weather fetched for {len(locations) - len(failed)} of {len(locations)} locations"
+    if failed:
+        message += f" (failed: {', '.join(failed)})"
+    return {"message": message, "results": formatted}
+
+
+def _batch_locations(locations: List[str]) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    unique = _unique_locations(locations)
+    if not unique:
+        return unique, {"message": "Error: at least one location is required", "results": {}}
+    limit = keys_settings.weather_batch_max_locations
+    if len(unique) > limit:
+        return unique, {"message": f"Error: at most {limit} locations per call", "results": {}}
+    return unique, None
+
+
+def _get_weather_batch(
+    locations: List[str],
+    include_humidity: bool = False,
+    include_wind_speed: bool = False,
+) -> Dict[str, Any]:
+    """
+    Get current weather for several locations in one call using WeatherAPI.com.
+    Use this instead of calling `get_weather` repeatedly when the user asks about more
+    than one place (e.g. "weather in London, Paris and Tokyo", "compare Dubai and Karachi").
+
+    ### Args:
+    - **locations (list[str]):** City or country names, one entry per place.  
+                                 If a city and its country are both mentioned, pass the city.  
+    - **include_humidity (bool, optional):** Include humidity for every location. Only if explicitly asked.  
+    - **include_wind_speed (bool, optional):** Include wind speed for every location. Only if explicitly asked.  
+
+    ### Returns:
+    dict: {
+        "message": str,   # "Weather fetched for N of M locations" (+ failed locations)
+        "results": {
+            "<location>": {"message": str, "data": {...}}  # same shape as get_weather; empty data on error
+        }
+    }
+    """
+    unique, error = _batch_locations(locations)
+    if error:
+        return error
+
+    # Upstream fetches run concurrently (cache hits return immediately), at most
+    # WEATHER_BATCH_CONCURRENCY at a time. Each worker gets a copy of the caller's context
+    # so HTTP spans keep their parent tool run.
+    workers = max(1, min(len(unique), keys_settings.weather_batch_concurrency))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather-batch") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _lookup_weather, location) for location in unique]
+        results = [future.result() for future in futures]
+    return _batch_result(unique, results, include_humidity, include_wind_speed)
+
+
+async def _aget_weather_batch(
+    locations: List[str],
+    include_humidity: bool = False,
+    include_wind_speed: bool = False,
+) -> Dict[str, Any]:
+    unique, error = _batch_locations(locations)
+    if error:
+        return error
+
+    semaphore = asyncio.Semaphore(max(1, keys_settings.weather_batch_concurrency))
+
+    async def _bounded(location: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _alookup_weather(location)
+
+    results = await asyncio.gather(*(_bounded(location) for location in unique))
+    return _batch_result(unique, list(results), include_humidity, include_wind_speed)
 
 
-@tool
-def get_weather(
+def _get_weather(
     location: str,
     include_humidity: bool = False,
     include_wind_speed: bool = False,
@@ -48,6 +391,7 @@ def get_weather(
     - If the user explicitly asks about humidity or wind speed, set:
         - `include_humidity=True`
         - `include_wind_speed=True`
+    - For more than one location, call `get_weather_batch` once instead.
 
     ### Args:
     - **location (str):** City or country name for which to fetch weather.  
@@ -68,41 +412,25 @@ def get_weather(
             "last_updated": str,
             "humidity": int,    # only if include_humidity=True
             "wind_speed": float # only if include_wind_speed=True
-        }
+        },
+        "stale": True   # only when the weather service is failing and the last known value is returned
     }
     """
-    weather_api_key = keys_settings.weather_api_key
-    if not weather_api_key:
-        return {"message": "Error: WEATHER_API_KEY not set", "data": {}}
+    result = _lookup_weather(location)
+    return _format_weather(location, result, include_humidity, include_wind_speed)
 
-    url = "http://api.weatherapi.com/v1/current.json"
-    params = {"key": weather_api_key, "q": location}
-
-    try:
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            return {
-                "message": f"Error: {response.status_code} - {response.text}",
-                "data": {},
-            }
-
-        data = response.json()
-        weather_info = {
-            "city": data["location"]["name"],
-            "country": data["location"]["country"],
-            "temperature": data["current"]["temp_c"],
-            "condition": data["current"]["condition"]["text"],
-            "last_updated": data["current"]["last_updated"],
-        }
 
-        if include_humidity:
-            weather_info["humidity"] = data["current"]["humidity"]
-
-        if include_wind_speed:
-            weather_info["wind_speed"] = data["current"]["wind_kph"]
-
-        return {"message": f"Weather fetched successfully for {location} ", "data": weather_info}
+async def _aget_weather(
+    location: str,
+    include_humidity: bool = False,
+    include_wind_speed: bool = False,
+) -> Dict[str, Any]:
+    result = await _alookup_weather(location)
+    return _format_weather(location, result, include_humidity, include_wind_speed)
 
-    except requests.exceptions.RequestException as e:
-        return {"message": f"Request failed: {e}", "data": {}}
 
+# Sync and async implementations share one tool so ToolNode can use either path.
+get_weather = StructuredTool.from_function(func=_get_weather, coroutine=_aget_weather, name="get_weather")
+get_weather_batch = StructuredTool.from_function(
+    func=_get_weather_batch, coroutine=_aget_weather_batch, name="get_weather_batch"
+)
@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.uLogger import logger
+from utils.singleflight import SingleFlight
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache where every entry carries its own TTL.
+
+    - `maxsize` bounds the number of entries; the least recently used entry is evicted first.
+    - An entry is *fresh* until its TTL expires, then *stale* for `stale_ttl` more seconds.
+      Stale entries are still served by `get_or_load`, which refreshes them in the background
+      (stale-while-revalidate). After the stale window the entry is treated as a miss.
+    - Optionally `max_weight` bounds the total `weigher(value)` of all entries (e.g. bytes),
+      evicting LRU entries until the cache fits.
+    - With `stale_if_error`, expired entries are kept that many seconds longer and returned
+      by `get_or_load` in place of a failed load (loader ttl <= 0), e.g. while an upstream
+      is down or its circuit breaker is open.
+    - Concurrent misses for one key are coalesced (`SingleFlight`): one caller runs the
+      loader and stores the result, the others wait for it instead of calling upstream too.
+    - Hit/miss counters are exposed through `stats()`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 128,
+        ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        stale_if_error: float = 0.0,
+        max_weight: Optional[int] = None,
+        weigher: Optional[Callable[[Any], int]] = None,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = stale_if_error
+        self.max_weight = max_weight
+        self.weigher = weigher
+
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._weights: Dict[Hashable, int] = {}
+        self._ttls: Dict[Hashable, float] = {}
+        self.total_weight = 0
+        self._lock = threading.RLock()
+        self._refreshing: set = set()
+        self._refresh_tasks: set = set()
+        self._flight = SingleFlight(name)
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.error_fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key)[1] is not None
+
+    def lookup(self, key: Hashable) -> Tuple[Any, Optional[str]]:
+        """Return `(value, state)` where state is "fresh", "stale" or None, without touching counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, None
+
+            value, expires_at = entry
+            now = time.monotonic()
+            if now < expires_at:
+                self._data.move_to_end(key)
+                return value, "fresh"
+            if now < expires_at + self.stale_ttl:
+                self._data.move_to_end(key)
+                return value, "stale"
+
+            if now >= expires_at + self.stale_ttl + self.stale_if_error:
+                self._remove(key)
+            return None, None
+
+    def remaining_ttl(self, key: Hashable) -> Optional[float]:
+        """Seconds until `key` expires (negative once stale), or None if it is not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else entry[1] - time.monotonic()
+
+    def entry_ttl(self, key: Hashable) -> Optional[float]:
+        """The TTL `key` was stored with, or None if it is not cached."""
+        with self._lock:
+            return self._ttls.get(key)
+
+    def refresh(self, key: Hashable, loader: Callable[[], Tuple[Any, Optional[float]]]) -> bool:
+        """
+        Load `key` now and store it (e.g. from a prefetcher), sharing an in-flight load if
+        there is one. Returns whether a value was stored; failed loads keep the old entry.
+        """
+        def _load() -> Tuple[Any, Optional[float]]:
+            value, ttl = loader()
+            self.set(key, value, ttl)
+            return value, ttl
+
+        _, ttl = self._flight.do(key, _load)
+        return ttl is None or ttl > 0
+
+    def _last_known(self, key: Hashable) -> Any:
+        """Expired value of `key` still inside the stale-if-error window, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() < expires_at + self.stale_ttl + self.stale_if_error:
+                return value
+            self._remove(key)
+            return None
+
+    def _fallback(self, key: Hashable, value: Any, ttl: Optional[float]) -> Tuple[Any, str]:
+        """Result of a miss: the loaded value, or the last known one if the load failed."""
+        if ttl is not None and ttl <= 0 and self.stale_if_error > 0:
+            last_known = self._last_known(key)
+            if last_known is not None:
+                with self._lock:
+                    self.error_fallbacks += 1
+                logger.warning(f"[CACHE:{self.name}] Load failed for {key!r}, serving last known value")
+                return last_known, "stale-if-error"
+        return value, "miss"
+
+    def keys(self) -> List[Hashable]:
+        """Snapshot of keys that are still fresh or stale, most recently used last."""
+        with self._lock:
+            now = time.monotonic()
+            return [k for k, (_, expires_at) in self._data.items() if now < expires_at + self.stale_ttl]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the fresh value for `key`, or `default`."""
+        value, state = self.lookup(key)
+        with self._lock:
+            if state == "fresh":
+                self.hits += 1
+                return value
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        weight = self.weigher(value) if self.weigher else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._weights[key] = weight
+            self._ttls[key] = ttl
+            self.total_weight += weight
+            while len(self._data) > self.maxsize or (
+                self.max_weight is not None and self.total_weight > self.max_weight
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        if self._data.pop(key, None) is not None:
+            self.total_weight -= self._weights.pop(key, 0)
+            self._ttls.pop(key, None)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self._ttls.clear()
+            self.total_weight = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Tuple[Any, Optional[float]]],
+    ) -> Tuple[Any, str]:
+        """
+        Return `(value, source)` for `key`, where source is "hit", "stale" or "miss".
+
+        `loader` must return `(value, ttl)`. A ttl of None uses the cache default and a
+        ttl <= 0 means the value is returned but not cached (e.g. upstream errors); within
+        the `stale_if_error` window the last known value is returned instead, with source
+        "stale-if-error".
+        """
+        value, state = self.lookup(key)
+        if state == "fresh":
+            with self._lock:
+                self.hits += 1
+            return value, "hit"
+
+        if state == "stale":
+            with self._lock:
+                self.stale_hits += 1
+            self._refresh_in_background(key, loader)
+            return value, "stale"
+
+        with self._lock:
+            self.misses += 1
+
+        def _load() -> Tuple[Any, Optional[float]]:
+            # Stored before the flight ends, so later callers find it in the cache
+            value, ttl = loader()
+            self.set(key, value, ttl)
+            return value, ttl
+
+        return self._fallback(key, *self._flight.do(key, _load))
+
+    async def aget_or_load(
+        self,
+        key: Hashable,
+        aloader: Callable[[], Awaitable[Tuple[Any, Optional[float]]]],
+    ) -> Tuple[Any, str]:
+        """Async counterpart of `get_or_load`; stale entries are refreshed in an asyncio task."""
+        value, state = self.lookup(key)
+        if state == "fresh":
+            with self._lock:
+                self.hits += 1
+            return value, "hit"
+
+        if state == "stale":
+            with self._lock:
+                self.stale_hits += 1
+                refreshing = key in self._refreshing
+                self._refreshing.add(key)
+            if not refreshing:
+                task = asyncio.create_task(self._arefresh(key, aloader))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return value, "stale"
+
+        with self._lock:
+            self.misses += 1
+
+        async def _aload() -> Tuple[Any, Optional[float]]:
+            value, ttl = await aloader()
+            self.set(key, value, ttl)
+            return value, ttl
+
+        return self._fallback(key, *await self._flight.ado(key, _aload))
+
+    async def _arefresh(self, key: Hashable, aloader: Callable[[], Awaitable[Tuple[Any, Optional[float]]]]) -> None:
+        try:
+            value, ttl = await aloader()
+            self.set(key, value, ttl)
+            logger.debug(f"[CACHE:{self.name}] Refreshed stale entry {key!r}")
+        except Exception as e:
+            logger.warning(f"[CACHE:{self.name}] Background refresh failed for {key!r}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Tuple[Any, Optional[float]]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                value, ttl = loader()
+                self.set(key, value, ttl)
+                logger.debug(f"[CACHE:{self.name}] Refreshed stale entry {key!r}")
+            except Exception as e:
+                logger.warning(f"[CACHE:{self.name}] Background refresh failed for {key!r}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    def stats(self) -> dict:
+        flight = self._flight.stats()
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "weight": self.total_weight,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "error_fallbacks": self.error_fallbacks,
+                "loads": flight["issued"],
+                "coalesced": flight["coalesced"],
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
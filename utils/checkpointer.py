@@ -0,0 +1,438 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import InMemorySaver
+
+from utils.uLogger import logger
+
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    parent_checkpoint_id TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+"""
+
+
+class BoundedSqliteSaver(InMemorySaver):
+    """
+    LangGraph checkpointer that keeps a bounded working set in memory and persists it to SQLite.
+
+    - Only the latest `max_checkpoints` checkpoints per thread (and namespace) are kept;
+      older checkpoints, their pending writes and unreferenced channel blobs are dropped.
+    - Threads idle for `idle_ttl` seconds are evicted from memory and reloaded from SQLite
+      on their next turn. Threads idle for `retention` seconds are deleted from disk too
+      (0 keeps them forever).
+    - Reads and writes on the response path only touch memory; SQLite writes are queued
+      and applied in batches by a background thread every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_checkpoints: int = 5,
+        idle_ttl: float = 1800.0,
+        retention: float = 7 * 24 * 3600,
+        flush_interval: float = 1.0,
+        batch_size: int = 200,
+    ):
+        super().__init__()
+        self.path = path
+        # A turn builds on the latest checkpoint while writing the next one, so keep at least two.
+        self.max_checkpoints = max(2, max_checkpoints)
+        self.idle_ttl = idle_ttl
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._lock = threading.RLock()
+        self._last_access: Dict[str, float] = {}
+        self._channel_versions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._thread_blobs: Dict[str, Set[Tuple[str, str, str, Any]]] = defaultdict(set)
+        self._unflushed: Dict[str, int] = defaultdict(int)  # thread_id -> queued operations
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._read_conn = self._connect()
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+        logger.info(
+            f"[CHECKPOINT] SQLite checkpointer at {path} (max_checkpoints={self.max_checkpoints}, "
+            f"idle_ttl={idle_ttl}s, retention={retention}s)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------ reads
+
+    def get_tuple(self, config: RunnableConfig):
+        thread_id = config["configurable"]["thread_id"]
+        self._flush_if_unloaded(thread_id)
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        if config:
+            self._flush_if_unloaded(config["configurable"]["thread_id"])
+        with self._lock:
+            if config:
+                self._ensure_loaded(config["configurable"]["thread_id"])
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    def _flush_if_unloaded(self, thread_id: str) -> None:
+        # Make sure queued writes of an evicted thread reached disk before reading it back.
+        # Called without holding the lock so the writer thread can make progress.
+        if thread_id not in self._last_access and self._unflushed.get(thread_id):
+            self.flush()
+
+    def _enqueue(self, op: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._unflushed[op[1]] += 1
+        self._queue.put(op)
+
+    def _ensure_loaded(self, thread_id: str) -> None:
+        """Bring a thread back into memory from SQLite if it was evicted (or written by an earlier process)."""
+        if thread_id in self._last_access:
+            self._last_access[thread_id] = time.monotonic()
+            return
+
+        rows = self._read_conn.execute(
+            "SELECT checkpoint_ns, checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata, "
+            "parent_checkpoint_id FROM checkpoints WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchall()
+        for ns, cid, c_type, c_blob, m_type, m_blob, parent in rows:
+            self.storage[thread_id][ns][cid] = ((c_type, c_blob), (m_type, m_blob), parent)
+            self._channel_versions[(thread_id, ns, cid)] = self.serde.loads_typed((c_type, c_blob))["channel_versions"]
+
+        for ns, cid, task_id, idx, channel, v_type, v_blob, task_path in self._read_conn.execute(
+            "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path "
+            "FROM writes WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            self.writes[(thread_id, ns, cid)][(task_id, idx)] = (task_id, channel, (v_type, v_blob), task_path)
+
+        for ns, channel, version, v_type, v_blob in self._read_conn.execute(
+            "SELECT checkpoint_ns, channel, version, value_type, value FROM blobs WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            key = (thread_id, ns, channel, json.loads(version))
+            self.blobs[key] = (v_type, v_blob)
+            self._thread_blobs[thread_id].add(key)
+
+        self._last_access[thread_id] = time.monotonic()
+        if rows:
+            logger.info(f"[CHECKPOINT] Loaded thread_id={thread_id} from disk ({len(rows)} checkpoints)")
+
+    # ----------------------------------------------------------------- writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        self._flush_if_unloaded(thread_id)
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            checkpoint_id = checkpoint["id"]
+            self._channel_versions[(thread_id, checkpoint_ns, checkpoint_id)] = dict(checkpoint["channel_versions"])
+            blob_keys = [(thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()]
+            self._thread_blobs[thread_id].update(blob_keys)
+
+            c_saved, m_saved, parent = self.storage[thread_id][checkpoint_ns][checkpoint_id]
+            dropped_ids, dropped_blobs = self._prune(thread_id, checkpoint_ns)
+            blobs = [(key, self.blobs[key]) for key in blob_keys if key in self.blobs]
+
+        self._enqueue((
+            "put",
+            thread_id,
+            checkpoint_ns,
+            (checkpoint_id, c_saved, m_saved, parent),
+            blobs,
+            dropped_ids,
+            dropped_blobs,
+        ))
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        self._flush_if_unloaded(thread_id)
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+            rows = [
+                (inner_key, value)
+                for inner_key, value in self.writes[(thread_id, checkpoint_ns, checkpoint_id)].items()
+                if inner_key[0] == task_id
+            ]
+        self._enqueue(("writes", thread_id, checkpoint_ns, checkpoint_id, rows))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._forget(thread_id)
+        self._enqueue(("delete", thread_id))
+
+    # ------------------------------------------------------------------ async
+
+    # The sync methods may block on the lock, on SQLite reads in `_ensure_loaded` or on
+    # `flush()` for an evicted thread, so the async API runs them in a worker thread
+    # instead of on the event loop (InMemorySaver calls them inline).
+
+    async def aget_tuple(self, config: RunnableConfig):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> Tuple[List[str], List[Tuple[str, str, str, Any]]]:
+        """Drop all but the latest `max_checkpoints` checkpoints and the blobs only they referenced."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints:
+            return [], []
+
+        ids = sorted(checkpoints)
+        dropped_ids = ids[:-self.max_checkpoints]
+        for cid in dropped_ids:
+            del checkpoints[cid]
+            self.writes.pop((thread_id, checkpoint_ns, cid), None)
+            self._channel_versions.pop((thread_id, checkpoint_ns, cid), None)
+
+        referenced = set()
+        for cid in ids[-self.max_checkpoints:]:
+            referenced.update(self._channel_versions.get((thread_id, checkpoint_ns, cid), {}).items())
+
+        dropped_blobs = [
+            key for key in self._thread_blobs[thread_id]
+            if key[1] == checkpoint_ns and (key[2], key[3]) not in referenced
+        ]
+        for key in dropped_blobs:
+            self.blobs.pop(key, None)
+            self._thread_blobs[thread_id].discard(key)
+        return dropped_ids, dropped_blobs
+
+    def _forget(self, thread_id: str) -> None:
+        """Remove a thread from memory only."""
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for cid in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, cid), None)
+                self._channel_versions.pop((thread_id, checkpoint_ns, cid), None)
+        for key in self._thread_blobs.pop(thread_id, set()):
+            self.blobs.pop(key, None)
+        self._last_access.pop(thread_id, None)
+
+    def evict_idle_threads(self) -> int:
+        """Evict threads idle for longer than `idle_ttl` from memory. Returns the number evicted."""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [t for t, last in self._last_access.items() if last < cutoff]
+            for thread_id in idle:
+                self._forget(thread_id)
+        if idle:
+            logger.info(f"[CHECKPOINT] Evicted {len(idle)} idle threads from memory, {len(self._last_access)} active")
+        return len(idle)
+
+    # -------------------------------------------------------- background I/O
+
+    def _writer_loop(self) -> None:
+        conn = self._connect()
+        last_maintenance = time.monotonic()
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            ops = [op for op in batch if op is not _STOP]
+            running = len(ops) == len(batch)
+            if ops:
+                try:
+                    with conn:
+                        for op in ops:
+                            self._apply(conn, op)
+                except sqlite3.Error as e:
+                    logger.error(f"[CHECKPOINT] Failed to persist {len(ops)} checkpoint operations: {e}")
+            with self._lock:
+                for op in ops:
+                    self._unflushed[op[1]] -= 1
+                    if self._unflushed[op[1]] <= 0:
+                        del self._unflushed[op[1]]
+            for _ in batch:
+                self._queue.task_done()
+
+            if time.monotonic() - last_maintenance >= min(self.idle_ttl, 60):
+                last_maintenance = time.monotonic()
+                self.evict_idle_threads()
+                self._purge_expired(conn)
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, op: Tuple[Any, ...]) -> None:
+        kind, thread_id = op[0], op[1]
+        if kind == "delete":
+            for table in ("checkpoints", "writes", "blobs", "threads"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            return
+
+        conn.execute(
+            "INSERT OR REPLACE INTO threads (thread_id, last_access) VALUES (?, ?)",
+            (thread_id, time.time()),
+        )
+        checkpoint_ns = op[2]
+        if kind == "put":
+            (checkpoint_id, (c_type, c_blob), (m_type, m_blob), parent), blobs, dropped_ids, dropped_blobs = op[3:]
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, c_type, c_blob, m_type, m_blob, parent),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                [(t, ns, ch, json.dumps(v), v_type, v_blob) for (t, ns, ch, v), (v_type, v_blob) in blobs],
+            )
+            conn.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, cid) for cid in dropped_ids],
+            )
+            conn.executemany(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, cid) for cid in dropped_ids],
+            )
+            conn.executemany(
+                "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                [(t, ns, ch, json.dumps(v)) for t, ns, ch, v in dropped_blobs],
+            )
+        elif kind == "writes":
+            checkpoint_id, rows = op[3], op[4]
+            conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, v_type, v_blob, task_path)
+                    for (task_id, idx), (_, channel, (v_type, v_blob), task_path) in rows
+                ],
+            )
+
+    def _purge_expired(self, conn: sqlite3.Connection) -> None:
+        if not self.retention:
+            return
+        cutoff = time.time() - self.retention
+        expired = [row[0] for row in conn.execute("SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,))]
+        if not expired:
+            return
+        with conn:
+            for thread_id in expired:
+                self._apply(conn, ("delete", thread_id))
+        logger.info(f"[CHECKPOINT] Purged {len(expired)} expired threads from disk")
+
+    def flush(self) -> None:
+        """Block until every queued write has been applied to SQLite."""
+        if threading.current_thread() is not self._writer:
+            self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._read_conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "threads_in_memory": len(self._last_access),
+                "checkpoints_in_memory": sum(
+                    len(cps) for namespaces in self.storage.values() for cps in namespaces.values()
+                ),
+                "blobs_in_memory": len(self.blobs),
+                "pending_writes": self._queue.qsize(),
+            }
@@ -0,0 +1,270 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.uLogger import logger
+from utils.metrics import metrics, record_http
+from utils.resilience import CircuitBreaker, TokenBucket, UpstreamUnavailable
+from api_import import keys_settings
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the tools in `tools/`.
+
+    Wraps one pooled `httpx.Client` (sync) and one `httpx.AsyncClient` (async) so every
+    upstream call reuses keep-alive connections, has connect/read timeouts (overridable
+    per host) and is retried a bounded number of times with jittered exponential backoff
+    on transport errors and 429/5xx responses.
+
+    Every attempt also passes a per-host token bucket (`host_rate_limits`, waiting at most
+    `rate_limit_max_wait` seconds for a token) and a per-host circuit breaker that opens
+    after `breaker_failure_threshold` consecutive transport errors or 429/5xx responses.
+    Requests refused by either raise `UpstreamUnavailable` without touching the network.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        host_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_retries: int = 2,
+        backoff_base: float = 0.3,
+        backoff_max: float = 3.0,
+        pool_size: int = 20,
+        keepalive_expiry: float = 30.0,
+        host_rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        rate_limit_max_wait: float = 2.0,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.host_timeouts = host_timeouts or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+        self.rate_limit_max_wait = rate_limit_max_wait
+        self._buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in (host_rate_limits or {}).items()}
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+        self._client = httpx.Client(limits=self.limits, timeout=self._timeout_for(None))
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _timeout_for(self, url: Optional[str]) -> httpx.Timeout:
+        host = urlsplit(url).hostname if url else None
+        connect, read = self.host_timeouts.get(host, (self.connect_timeout, self.read_timeout))
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # Full jitter: uniform in [0, base * 2^attempt], capped.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _record(url: str, status: str, started: float, attempt: int) -> None:
+        if metrics.enabled:
+            record_http(urlsplit(url).hostname or "", status, time.perf_counter() - started, attempt)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, self.breaker_failure_threshold, self.breaker_reset_timeout
+                )
+            return breaker
+
+    def _admit(self, url: str) -> float:
+        """Check the circuit breaker and rate limit of `url`'s host; returns the seconds to wait before sending."""
+        host = urlsplit(url).hostname or ""
+        breaker = self.breaker(host)
+        retry_in = breaker.allow()
+        if retry_in is not None:
+            metrics.inc("chatbot_http_rejected_total", host=host, reason="circuit_open")
+            raise UpstreamUnavailable(f"{host} is unavailable (circuit open), retry in {retry_in:.0f}s", retry_in)
+
+        bucket = self._buckets.get(host)
+        wait = bucket.reserve(self.rate_limit_max_wait) if bucket else 0.0
+        if wait is None:
+            breaker.release()
+            metrics.inc("chatbot_http_rejected_total", host=host, reason="rate_limit")
+            raise UpstreamUnavailable(f"{host} request rate limit reached, try again shortly", 1 / bucket.rate)
+        if wait:
+            logger.debug(f"[HTTP] Rate limit for {host}: waiting {wait:.2f}s")
+        return wait
+
+    def _outcome(self, url: str, failed: bool) -> None:
+        breaker = self.breaker(urlsplit(url).hostname or "")
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """GET `url` with pooling, timeouts and bounded retries. Raises `httpx.HTTPError` once retries are exhausted."""
+        timeout = self._timeout_for(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(url)
+            if wait:
+                time.sleep(wait)
+            started = time.perf_counter()
+            try:
+                response = self._client.get(url, params=params, timeout=timeout)
+            except httpx.TransportError as e:
+                self._record(url, type(e).__name__, started, attempt)
+                self._outcome(url, failed=True)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"[HTTP] {type(e).__name__} for {url}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            self._record(url, str(response.status_code), started, attempt)
+            self._outcome(url, failed=response.status_code in RETRY_STATUS_CODES)
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"[HTTP] {response.status_code} for {url}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            return response
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient is bound to the loop it was first used on; recreate it when
+        # the caller runs on a different loop (e.g. successive asyncio.run calls).
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._discard_async_client()
+            self._async_client = httpx.AsyncClient(limits=self.limits, timeout=self._timeout_for(None))
+            self._async_loop = loop
+        return self._async_client
+
+    def _discard_async_client(self) -> None:
+        """Close the AsyncClient of another event loop on that loop, releasing its pooled connections."""
+        client, loop = self._async_client, self._async_loop
+        self._async_client = self._async_loop = None
+        if client is None:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            # Its loop ended without aclose() (e.g. asyncio.run returned) and can no longer run
+            # the close; the transports release their sockets when they are collected.
+            logger.warning("[HTTP] Dropped the AsyncClient of a finished event loop without closing it")
+
+    async def aget(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """Async counterpart of `get`."""
+        client = self._get_async_client()
+        timeout = self._timeout_for(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(url)
+            if wait:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, params=params, timeout=timeout)
+            except httpx.TransportError as e:
+                self._record(url, type(e).__name__, started, attempt)
+                self._outcome(url, failed=True)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"[HTTP] {type(e).__name__} for {url}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._record(url, str(response.status_code), started, attempt)
+            self._outcome(url, failed=response.status_code in RETRY_STATUS_CODES)
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"[HTTP] {response.status_code} for {url}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            return response
+
+    def collect_breakers(self):
+        """Circuit breaker state per host for the metrics registry (0 closed, 1 half-open, 2 open)."""
+        levels = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        with self._breakers_lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            yield "chatbot_http_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)", {"host": breaker.name}, levels[breaker.state]
+
+    def close(self) -> None:
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Close the AsyncClient; call it before the event loop that used the client ends."""
+        if self._async_loop is not asyncio.get_running_loop():
+            self._discard_async_client()
+            return
+        client = self._async_client
+        self._async_client = self._async_loop = None
+        await client.aclose()
+
+
+def describe_error(response: httpx.Response) -> str:
+    """Short tool-facing message for a failed upstream response; 429/5xx bodies are not passed on."""
+    if response.status_code == 429:
+        return "Error: upstream rate limit reached (429), try again later"
+    if response.status_code >= 500:
+        return f"Error: upstream service unavailable ({response.status_code}), try again later"
+    return f"Error: {response.status_code} - {response.text[:300]}"
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide `HttpClient`, built from `keys_settings` on first use."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                s = keys_settings
+                weather_host = urlsplit(s.weather_api_url).hostname
+                news_host = urlsplit(s.news_api_base_url).hostname
+                _http_client = HttpClient(
+                    connect_timeout=s.http_connect_timeout,
+                    read_timeout=s.http_read_timeout,
+                    host_timeouts={
+                        weather_host: (s.weather_connect_timeout, s.weather_read_timeout),
+                        news_host: (s.news_connect_timeout, s.news_read_timeout),
+                    },
+                    max_retries=s.http_max_retries,
+                    backoff_base=s.http_backoff_base,
+                    backoff_max=s.http_backoff_max,
+                    pool_size=s.http_pool_size,
+                    keepalive_expiry=s.http_keepalive_expiry,
+                    host_rate_limits={
+                        weather_host: (s.weather_rate_limit, s.weather_rate_burst),
+                        news_host: (s.news_rate_limit, s.news_rate_burst),
+                    },
+                    rate_limit_max_wait=s.rate_limit_max_wait,
+                    breaker_failure_threshold=s.breaker_failure_threshold,
+                    breaker_reset_timeout=s.breaker_reset_timeout,
+                )
+                metrics.register_collector(_http_client.collect_breakers)
+                logger.info("[HTTP] Shared HTTP client initialized")
+    return _http_client
@@ -1,44 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
 
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from utils.uLogger import logger
-def log_messages(messages):
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
 
+from utils.uLogger import logger, conversation_logger
+
+MAX_TRACKED_THREADS = 10_000
+# Longer message contents (e.g. full news article lists) are cut in the conversation log
+MAX_CONTENT_CHARS = 4000
+
+
+def _message_record(msg: BaseMessage, thread_id: str) -> Dict[str, Any]:
+    content = msg.content if isinstance(msg.content, str) else str(msg.content)
+    record: Dict[str, Any] = {
+        "ts": time.time(),
+        "thread_id": thread_id,
+        "message_id": msg.id,
+        "type": msg.type,
+        "content": content[:MAX_CONTENT_CHARS],
+    }
+    if len(content) > MAX_CONTENT_CHARS:
+        record["content_chars"] = len(content)
+
+    if isinstance(msg, AIMessage):
+        if msg.tool_calls:
+            record["tool_calls"] = [{"id": c["id"], "name": c["name"], "args": c["args"]} for c in msg.tool_calls]
+        if msg.usage_metadata:
+            record["usage"] = dict(msg.usage_metadata)
+    elif isinstance(msg, ToolMessage):
+        record["tool_name"] = msg.name
+        record["tool_call_id"] = msg.tool_call_id
+        record["status"] = msg.status
+    return record
+
+
+class ConversationLog:
+    """
+    Incremental structured conversation log.
+
+    Remembers which message ids were already written for each thread, so passing the
+    whole history after every turn only writes the new messages (once each). Records
+    are JSON lines in log_dir/conversations.jsonl, written by the queue listener in
+    utils/uLogger.py off the request path.
+    """
+
+    def __init__(self, max_threads: int = MAX_TRACKED_THREADS):
+        self.max_threads = max_threads
+        self._logged: "OrderedDict[str, set]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def log(
+        self,
+        messages: Sequence[BaseMessage],
+        thread_id: str = "default",
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Write the messages of `thread_id` not logged yet; `timings` is attached to the last one. Returns the count."""
+        with self._lock:
+            seen = self._logged.pop(thread_id, set())
+            new = [m for m in messages if m.id is None or m.id not in seen]
+            # Ids no longer in the history (trimmed) can never come back, so only keep current ones
+            self._logged[thread_id] = {m.id for m in messages if m.id is not None}
+            while len(self._logged) > self.max_threads:
+                self._logged.popitem(last=False)
+
+        for i, msg in enumerate(new):
+            record = _message_record(msg, thread_id)
+            if timings and i == len(new) - 1:
+                record["timings"] = timings
+            conversation_logger.info(record)
+
+        if new:
+            logger.info(f"[CONVERSATION] thread_id={thread_id}: logged {len(new)} new messages")
+        return len(new)
+
+
+conversation_log = ConversationLog()
+
+
+def log_messages(messages, thread_id: str = "default", timings: Optional[Dict[str, Any]] = None) -> int:
     """
-    Logs conversation messages in a clean and structured format.
-    Supports Human, AI, and Tool messages with tool call details.
+    Logs conversation messages as structured JSON lines (see `ConversationLog`).
+    Only messages not yet logged for `thread_id` are written.
     """
-    for msg in messages:
-        # Human Message
-        if isinstance(msg, HumanMessage):
-            logger.info("================================== Human Message ==================================")
-            logger.info(msg.content)
-
-        # AI Message
-        elif isinstance(msg, AIMessage):
-            logger.info("================================== Ai Message ==================================")
-            logger.info(msg.content)
-
-            # Handle tool calls (if any)
-            tool_calls = msg.additional_kwargs.get("tool_calls")
-            if tool_calls:
-                logger.info("Tool Calls:")
-                for call in tool_calls:
-                    func_name = call["function"]["name"]
-                    args = call["function"]["arguments"]
-                    call_id = call.get("id", "N/A")
-
-                    logger.info("-" * 80)
-                    logger.info(f"Tool Function Name : {func_name}")
-                    logger.info(f"Tool Arguments     : {args}")
-                    logger.info(f"Tool Call ID       : {call_id}")
-                    logger.info("-" * 80)
-
-        # Tool Message
-        elif isinstance(msg, ToolMessage):
-            logger.info(f"================================== Tool Message (Name: {msg.name}) ==================================")
-            logger.info(msg.content)
-
-        # Fallback for unknown message types
-        else:
-            logger.info(f"================================== Other Message ==================================")
-            logger.info(str(msg))
\ No newline at end of file
+    return conversation_log.log(messages, thread_id, timings)
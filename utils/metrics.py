@@ -0,0 +1,433 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+from utils.uLogger import logger
+from api_import import keys_settings
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p95/p99 plus mean/min/max, in milliseconds (inputs in seconds)."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": round(rank(50) * 1000, 3),
+        "p95_ms": round(rank(95) * 1000, 3),
+        "p99_ms": round(rank(99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class MetricsRegistry:
+    """
+    In-process Prometheus-style counters and histograms with labels.
+
+    `render()` produces the text exposition format (served by server.py on /metrics).
+    Pull-based values such as cache statistics are added with `register_collector`, so
+    they cost nothing until scraped. When `enabled` is False every update is a no-op.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = defaultdict(dict)
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]] = []
+        self._caches: Dict[str, Callable[[], dict]] = {}  # cache name -> stats() of the latest registration
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        self._help[name] = (metric_type, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]) -> None:
+        """`collector()` yields `(name, type, help, labels, value)` samples at scrape time."""
+        self._collectors.append(collector)
+
+    def register_cache(self, stats: Callable[[], dict]) -> None:
+        """
+        Expose a cache's `stats()` (TTLCache, ResponseCache) as chatbot_cache_* series.
+        One collector per cache name: registering the same name again (e.g. from every
+        Chatbot instance) replaces the stats source instead of adding another collector.
+        """
+        name = stats()["name"]
+        with self._lock:
+            registered = name in self._caches
+            self._caches[name] = stats
+        if registered:
+            return
+
+        def collect():
+            s = self._caches[name]()
+            labels = {"cache": s["name"]}
+            yield "chatbot_cache_hits_total", "counter", "Cache hits (fresh and stale)", labels, s["hits"] + s.get("stale_hits", 0)
+            yield "chatbot_cache_misses_total", "counter", "Cache misses", labels, s["misses"]
+            yield "chatbot_cache_evictions_total", "counter", "Cache LRU evictions", labels, s["evictions"]
+            yield "chatbot_cache_entries", "gauge", "Entries currently cached", labels, s["size"]
+            if "loads" in s:
+                yield "chatbot_cache_loads_total", "counter", "Upstream loads issued on cache misses", labels, s["loads"]
+                yield "chatbot_cache_coalesced_total", "counter", "Cache misses that shared an in-flight load", labels, s["coalesced"]
+        self.register_collector(collect)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and histogram count/sum as plain dicts (for logs and benchmarks)."""
+        with self._lock:
+            counters = {
+                name: {_format_labels(k) or "": v for k, v in series.items()} for name, series in self._counters.items()
+            }
+            histograms = {
+                name: {_format_labels(k) or "": {"count": h.count, "sum": round(h.sum, 6)} for k, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, metric_type: str, help_text: str = ""):
+            lines.append(f"# HELP {name} {help_text or self._help.get(name, (metric_type, name))[1]}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        # Group collected samples by metric name: the exposition format wants each family contiguous
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, metric_type, help_text, labels, value in collector():
+                family = families.setdefault(name, (metric_type, help_text, []))
+                family[2].append(f"{name}{_format_labels(_label_key(labels))} {value:g}")
+        for name, (metric_type, help_text, samples) in families.items():
+            header(name, metric_type, help_text)
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class JsonlTraceWriter:
+    """Appends one JSON object per span to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class _Trace:
+    """Per-turn aggregates used for the one-line turn breakdown in the log."""
+
+    __slots__ = ("nodes", "llm", "http", "tokens")
+
+    def __init__(self):
+        self.nodes: Dict[str, List[float]] = defaultdict(list)
+        self.llm: List[float] = []
+        self.http: Dict[str, List[float]] = defaultdict(list)
+        self.tokens = {"prompt": 0, "completion": 0, "cached": 0}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler attached to the compiled graph. Records spans for each
+    turn (graph run), each graph node, each LLM call (with token usage) and each tool
+    call into `metrics`, optionally writes them to a JSONL trace file, and logs a
+    per-turn time breakdown. Upstream HTTP calls are attached to the running tool's
+    trace through `record_http`.
+    """
+
+    run_inline = True  # called synchronously, also from async graph runs
+
+    def __init__(self, registry: "MetricsRegistry", trace_writer: Optional[JsonlTraceWriter] = None):
+        self.metrics = registry
+        self.trace_writer = trace_writer
+        self._lock = threading.Lock()
+        # run_id -> (trace_id, parent_run_id, kind, name, start)
+        self._runs: Dict[UUID, Tuple[UUID, Optional[UUID], str, str, float]] = {}
+        self._traces: Dict[UUID, _Trace] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str) -> None:
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+            trace_id = parent[0] if parent else run_id
+            if trace_id == run_id:
+                self._traces[run_id] = _Trace()
+            self._runs[run_id] = (trace_id, parent_run_id, kind, name, time.perf_counter())
+
+    def _end(self, run_id: UUID, status: str, **attrs) -> Optional[Tuple[UUID, str, str, float, Optional[_Trace]]]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return None
+            trace_id, parent_run_id, kind, name, start = run
+            trace = self._traces.pop(run_id, None) if kind == "turn" else self._traces.get(trace_id)
+        duration = time.perf_counter() - start
+        if self.trace_writer is not None and kind != "chain":
+            self.trace_writer.write({
+                "trace_id": trace_id, "span_id": run_id, "parent_id": parent_run_id, "kind": kind,
+                "name": name, "status": status, "duration_ms": round(duration * 1000, 3),
+                "end": time.time(), **attrs,
+            })
+        return trace_id, kind, name, duration, trace
+
+    def trace_of(self, run_id: Optional[UUID]) -> Optional[Tuple[UUID, _Trace]]:
+        with self._lock:
+            run = self._runs.get(run_id) if run_id else None
+            if run is None:
+                return None
+            trace = self._traces.get(run[0])
+            return (run[0], trace) if trace is not None else None
+
+    # --- chains: the graph run (turn) and its nodes ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            self._start(run_id, None, "turn", kwargs.get("name") or "graph")
+            return
+        with self._lock:
+            parent = self._runs.get(parent_run_id)
+        node = (metadata or {}).get("langgraph_node")
+        kind = "node" if node and parent is not None and parent[2] == "turn" else "chain"
+        self._start(run_id, parent_run_id, kind, node or kwargs.get("name") or "chain")
+
+    def _chain_done(self, run_id, status: str):
+        ended = self._end(run_id, status)
+        if ended is None:
+            return
+        _, kind, name, duration, trace = ended
+        if kind == "node":
+            self.metrics.observe("chatbot_node_seconds", duration, node=name)
+            if trace is not None:
+                trace.nodes[name].append(duration)
+        elif kind == "turn":
+            self.metrics.observe("chatbot_turn_seconds", duration)
+            self.metrics.inc("chatbot_turns_total", status=status)
+            if trace is not None:
+                self._log_turn(duration, trace)
+            if self.trace_writer is not None:
+                self.trace_writer.flush()
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._chain_done(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._chain_done(run_id, "error")
+
+    # --- LLM calls ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", kwargs.get("name") or "chat_model")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", kwargs.get("name") or "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = _token_usage(response)
+        ended = self._end(run_id, "ok", **usage)
+        if ended is None:
+            return
+        _, _, _, duration, trace = ended
+        self.metrics.observe("chatbot_llm_seconds", duration)
+        for kind, tokens in usage.items():
+            if tokens:
+                self.metrics.inc("chatbot_llm_tokens_total", tokens, type=kind)
+        if trace is not None:
+            trace.llm.append(duration)
+            for kind, tokens in usage.items():
+                trace.tokens[kind] += tokens
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        if self._end(run_id, "error", error=type(error).__name__) is not None:
+            self.metrics.inc("chatbot_llm_errors_total")
+
+    # --- tools ---
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "tool", kwargs.get("name") or (serialized or {}).get("name", "tool"))
+
+    def _tool_done(self, run_id, status: str):
+        ended = self._end(run_id, status)
+        if ended is not None:
+            _, _, name, duration, _ = ended
+            self.metrics.observe("chatbot_tool_seconds", duration, tool=name)
+            self.metrics.inc("chatbot_tool_calls_total", tool=name, status=status)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, "error")
+
+    def _log_turn(self, duration: float, trace: _Trace) -> None:
+        node_time = sum(sum(v) for v in trace.nodes.values())
+        parts = [f"{name} {len(v)}x {sum(v):.2f}s" for name, v in trace.nodes.items()]
+        if trace.llm:
+            parts.append(f"llm {len(trace.llm)}x {sum(trace.llm):.2f}s")
+        parts.extend(f"http {host} {len(v)}x {sum(v):.2f}s" for host, v in trace.http.items())
+        parts.append(f"graph overhead {max(0.0, duration - node_time):.3f}s")
+        tokens = trace.tokens
+        logger.info(
+            f"[TRACE] Turn {duration:.2f}s: " + ", ".join(parts)
+            + f"; tokens prompt/completion/cached {tokens['prompt']}/{tokens['completion']}/{tokens['cached']}"
+        )
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Prompt/completion/cached token counts of an LLMResult, from usage_metadata or llm_output."""
+    usage = {"prompt": 0, "completion": 0, "cached": 0}
+    for generations in response.generations or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                usage["prompt"] += metadata.get("input_tokens", 0)
+                usage["completion"] += metadata.get("output_tokens", 0)
+                usage["cached"] += (metadata.get("input_token_details") or {}).get("cache_read", 0) or 0
+    if not any(usage.values()) and response.llm_output:
+        token_usage = response.llm_output.get("token_usage") or {}
+        usage["prompt"] = token_usage.get("prompt_tokens", 0) or 0
+        usage["completion"] = token_usage.get("completion_tokens", 0) or 0
+        usage["cached"] = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    return usage
+
+
+def _current_run_id() -> Optional[UUID]:
+    """Run id of the LangChain runnable (e.g. the tool) executing in this context, if any."""
+    config = var_child_runnable_config.get()
+    callbacks = config.get("callbacks") if config else None
+    return getattr(callbacks, "parent_run_id", None)
+
+
+def record_http(host: str, status: str, duration: float, attempt: int) -> None:
+    """Record one upstream HTTP attempt (called by utils.http_client)."""
+    metrics.observe("chatbot_http_request_seconds", duration, host=host)
+    metrics.inc("chatbot_http_requests_total", host=host, status=status)
+    if attempt:
+        metrics.inc("chatbot_http_retries_total", host=host)
+
+    handler = tracing_handler
+    if handler is None:
+        return
+    found = handler.trace_of(_current_run_id())
+    if found is None:
+        return
+    trace_id, trace = found
+    trace.http[host].append(duration)
+    if handler.trace_writer is not None:
+        handler.trace_writer.write({
+            "trace_id": trace_id, "parent_id": _current_run_id(), "kind": "http", "name": host,
+            "status": status, "attempt": attempt, "duration_ms": round(duration * 1000, 3), "end": time.time(),
+        })
+
+
+metrics = MetricsRegistry(enabled=keys_settings.metrics_enabled)
+metrics.describe("chatbot_turn_seconds", "histogram", "Wall time of one graph run (user turn)")
+metrics.describe("chatbot_turns_total", "counter", "Graph runs by status")
+metrics.describe("chatbot_node_seconds", "histogram", "Wall time of graph nodes")
+metrics.describe("chatbot_llm_seconds", "histogram", "Wall time of LLM calls")
+metrics.describe("chatbot_llm_tokens_total", "counter", "LLM tokens by type (prompt, completion, cached)")
+metrics.describe("chatbot_llm_errors_total", "counter", "Failed LLM calls")
+metrics.describe("chatbot_tool_seconds", "histogram", "Wall time of tool calls")
+metrics.describe("chatbot_tool_calls_total", "counter", "Tool calls by tool and status")
+metrics.describe("chatbot_http_request_seconds", "histogram", "Upstream HTTP request attempts")
+metrics.describe("chatbot_http_requests_total", "counter", "Upstream HTTP request attempts by host and status")
+metrics.describe("chatbot_http_retries_total", "counter", "Upstream HTTP retries")
+
+# Callback handler attached to compiled graphs (None when metrics are disabled)
+tracing_handler: Optional[TracingCallbackHandler] = None
+if keys_settings.metrics_enabled:
+    tracing_handler = TracingCallbackHandler(
+        metrics,
+        JsonlTraceWriter(keys_settings.trace_file) if keys_settings.trace_file else None,
+    )
@@ -0,0 +1,153 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.uLogger import logger
+from utils.cache import TTLCache
+from utils.metrics import metrics
+from utils.resilience import TokenBucket
+from api_import import keys_settings
+
+
+@dataclass
+class HotEntry:
+    cache: TTLCache
+    key: Hashable
+    loader: Callable[[], Tuple[Any, Optional[float]]]
+    score: float = 0.0
+
+
+class Prefetcher:
+    """
+    Background refresher for the most requested tool-cache entries.
+
+    The tools `record` every lookup with the loader that fetches it. Every `interval`
+    seconds the `top_n` entries per upstream with a (decayed) request score of at least
+    `min_score` are re-fetched if they are missing or expire within the next two
+    intervals (or half their TTL, if shorter: an entry stored with a short TTL would
+    otherwise be refetched every cycle), so popular cities and headlines are always
+    answered from the cache.
+    Refreshes per upstream are capped by a per-hour budget (0 = no prefetching for that
+    upstream); a refresh that finds the budget spent is skipped until tokens return.
+    """
+
+    def __init__(
+        self,
+        interval: float = 30.0,
+        top_n: int = 10,
+        min_score: float = 2.0,
+        decay: float = 0.95,
+        budgets_per_hour: Optional[Dict[str, int]] = None,
+        max_tracked: int = 1000,
+    ):
+        self.interval = interval
+        self.top_n = top_n
+        self.min_score = min_score
+        self.decay = decay
+        self.max_tracked = max_tracked
+        self.budgets_per_hour = dict(budgets_per_hour or {})
+        self.budgets = {
+            upstream: TokenBucket(budget / 3600.0, budget) for upstream, budget in self.budgets_per_hour.items()
+        }
+        self._entries: Dict[Tuple[str, Hashable], HotEntry] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        upstream: str,
+        cache: TTLCache,
+        key: Hashable,
+        loader: Callable[[], Tuple[Any, Optional[float]]],
+    ) -> None:
+        """Count one request for `key` of `upstream`; `loader` is what a refresh calls (sync, returns `(value, ttl)`)."""
+        if self._thread is None:
+            return
+        with self._lock:
+            entry = self._entries.get((upstream, key))
+            if entry is None:
+                if len(self._entries) >= self.max_tracked:
+                    coldest = min(self._entries, key=lambda k: self._entries[k].score)
+                    del self._entries[coldest]
+                entry = self._entries[(upstream, key)] = HotEntry(cache, key, loader)
+            entry.loader = loader
+            entry.score += 1
+
+    def hot(self) -> Dict[str, List[HotEntry]]:
+        """The entries currently eligible for prefetching, hottest first, per upstream."""
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda item: item[1].score, reverse=True)
+        hot: Dict[str, List[HotEntry]] = {}
+        for (upstream, _), entry in entries:
+            selected = hot.setdefault(upstream, [])
+            if entry.score >= self.min_score and len(selected) < self.top_n:
+                selected.append(entry)
+        return hot
+
+    def run_once(self) -> int:
+        """Refresh hot entries that are about to expire, then decay all scores. Returns the refresh count."""
+        refreshed = 0
+        for upstream, entries in self.hot().items():
+            for entry in entries:
+                remaining = entry.cache.remaining_ttl(entry.key)
+                ttl = entry.cache.entry_ttl(entry.key)
+                lead = 2 * self.interval if ttl is None else min(2 * self.interval, ttl / 2)
+                if remaining is not None and remaining > lead:
+                    continue
+                budget = self.budgets.get(upstream)
+                if budget is not None and (budget.rate <= 0 or budget.reserve(0) is None):
+                    metrics.inc("chatbot_prefetch_total", upstream=upstream, status="over_budget")
+                    logger.debug(f"[PREFETCH] {upstream} budget spent, skipping {entry.key!r}")
+                    continue
+                try:
+                    stored = entry.cache.refresh(entry.key, entry.loader)
+                except Exception as e:
+                    stored = False
+                    logger.warning(f"[PREFETCH] Refresh of {upstream} {entry.key!r} failed: {e}")
+                metrics.inc("chatbot_prefetch_total", upstream=upstream, status="refreshed" if stored else "failed")
+                refreshed += stored
+
+        with self._lock:
+            for name, entry in list(self._entries.items()):
+                entry.score *= self.decay
+                if entry.score < 0.1:
+                    del self._entries[name]
+        if refreshed:
+            logger.info(f"[PREFETCH] Refreshed {refreshed} hot entries")
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[PREFETCH] Cycle failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"[PREFETCH] Started: every {self.interval:.0f}s, top {self.top_n} per upstream, "
+            f"refresh budgets per hour {self.budgets_per_hour}"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+prefetcher = Prefetcher(
+    interval=keys_settings.prefetch_interval,
+    top_n=keys_settings.prefetch_top_n,
+    min_score=keys_settings.prefetch_min_requests,
+    budgets_per_hour={
+        "weather": keys_settings.prefetch_weather_budget,
+        "news": keys_settings.prefetch_news_budget,
+    },
+)
@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from utils.uLogger import logger
+
+
+class UpstreamUnavailable(httpx.HTTPError):
+    """Request not sent because the upstream is rate limited locally or its circuit is open."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `burst` saved up.
+    A rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take one token and return how long the caller must wait before using it, or None
+        (nothing taken) if that would be longer than `max_wait` seconds.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            # Tokens may go negative: later callers queue up behind this reservation
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream host.
+
+    - closed: requests pass; `failure_threshold` failures in a row open the circuit.
+    - open: requests are rejected immediately for `reset_timeout` seconds.
+    - half-open: afterwards one probe request at a time is let through; its success closes
+      the circuit, its failure opens it for another `reset_timeout`. A probe that never
+      reports back (e.g. a cancelled task) is replaced after `reset_timeout`.
+    A failure_threshold <= 0 disables the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[float]:
+        """None if a request may be sent now, else the seconds until the next probe."""
+        if self.failure_threshold <= 0:
+            return None
+        with self._lock:
+            if self.state == self.CLOSED:
+                return None
+            now = time.monotonic()
+            remaining = self.opened_at + self.reset_timeout - now
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                logger.info(f"[BREAKER:{self.name}] Half-open, probing upstream")
+            if self.state == self.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started > self.reset_timeout
+            ):
+                self._probe_started = now
+                return None
+            return max(remaining, 0.0)
+
+    def release(self) -> None:
+        """Give back a probe slot granted by `allow` whose request was never sent."""
+        with self._lock:
+            self._probe_started = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"[BREAKER:{self.name}] Closed, upstream recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"[BREAKER:{self.name}] Open after {self.failures} consecutive failures, "
+                        f"failing fast for {self.reset_timeout:.0f}s"
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_started = None
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+from utils.cache import TTLCache
+from utils.uLogger import logger
+
+# (tool cache, key in that cache) an answer was built from
+Dependency = Tuple[TTLCache, Hashable]
+
+# How the tools start the message of a failed call
+ERROR_PREFIXES = ("Error", "Request failed")
+
+
+def normalize_message(text: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive form of a user message."""
+    text = (text or "").strip().lower().replace("’", "'")
+    text = re.sub(r"[?!.]+$", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def is_fallback_result(content: Any) -> bool:
+    """
+    Whether a tool result (ToolMessage content) is something other than fresh upstream
+    data: an error ("Error: ...", "Request failed: ...") or a last known value served while
+    the upstream was failing ("stale": true), for any location of a batch result too.
+    """
+    try:
+        result = json.loads(content) if isinstance(content, str) else content
+    except ValueError:
+        return True
+    if not isinstance(result, dict):
+        return True
+    items = [result, *(result.get("results") or {}).values()]
+    return any(
+        item.get("stale") or str(item.get("message", "")).startswith(ERROR_PREFIXES)
+        for item in items if isinstance(item, dict)
+    )
+
+
+def _fingerprint(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Answer-level LRU cache for context-free turns, keyed by the normalized user message.
+
+    Each entry also records the tool-cache entries (weather/news) the answer was built
+    from, with a fingerprint of their values. A cached answer is only served while every
+    one of those entries is still fresh and unchanged, so an answer never outlives the
+    data it was generated from; otherwise it is dropped and counted as an invalidation.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0):
+        self._cache = TTLCache(name="responses", maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _dependencies_fresh(fingerprints: Sequence[Tuple[TTLCache, Hashable, str]]) -> bool:
+        for cache, key, fingerprint in fingerprints:
+            value, state = cache.lookup(key)
+            if state != "fresh" or _fingerprint(value) != fingerprint:
+                return False
+        return True
+
+    def get(self, message: str) -> Optional[str]:
+        key = normalize_message(message)
+        entry, state = self._cache.lookup(key)
+        if state != "fresh":
+            with self._lock:
+                self.misses += 1
+            return None
+
+        answer, fingerprints = entry
+        if not self._dependencies_fresh(fingerprints):
+            self._cache.delete(key)
+            with self._lock:
+                self.misses += 1
+                self.invalidations += 1
+            logger.info(f"[CACHE:responses] Invalidated {key!r}: underlying tool data expired or changed")
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return answer
+
+    def set(self, message: str, answer: str, dependencies: List[Dependency]) -> bool:
+        """
+        Cache `answer` for `message` if every dependency is currently fresh in its tool cache.
+        Returns whether the answer was stored.
+        """
+        fingerprints = []
+        for cache, key in dependencies:
+            value, state = cache.lookup(key)
+            if state != "fresh":
+                return False
+            fingerprints.append((cache, key, _fingerprint(value)))
+
+        self._cache.set(normalize_message(message), (answer, fingerprints))
+        return True
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        inner = self._cache.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": inner["name"],
+                "size": inner["size"],
+                "maxsize": inner["maxsize"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": inner["evictions"],
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,164 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from thefuzz import fuzz
+
+from api_import import keys_settings
+from tools.gazetteer import get_gazetteer
+from utils.uLogger import logger
+
+WEATHER_KEYWORDS = ("weather", "temperature")
+
+# "weather in London", "what's the weather like in New York?", "temperature for Dubai".
+# With the gazetteer enabled the location must be one it knows to clear the threshold.
+WEATHER_PREFIX = re.compile(
+    r"^(?:(?:what|how)(?:'s|s| is)\s+)?(?:the\s+)?(?:current\s+|today'?s?\s+)?"
+    r"(?P<kw>[a-z]+)(?:\s+like)?(?:\s+(?:right\s+)?now)?\s+(?:in|for|at)\s+(?P<loc>.+)$"
+)
+# "London weather", "weather London". Without a preposition these read like ordinary
+# phrases too ("weather report", "room temperature"), so they only match a location
+# the gazetteer knows (see FastPathRouter._is_known_place).
+WEATHER_SUFFIX = re.compile(r"^(?P<loc>[^\s].*?)\s+(?P<kw>[a-z]+)$")
+WEATHER_BARE = re.compile(r"^(?P<kw>[a-z]+)\s+(?P<loc>[^\s].*)$")
+# Words that describe the weather rather than name a place, even where a place has that name ("nice weather")
+DESCRIPTIVE_WORDS = {"nice", "good", "bad", "great", "lovely", "beautiful", "perfect", "terrible", "awful", "crazy", "weird"}
+
+# Trailing "with humidity and wind speed" style detail requests
+WEATHER_DETAILS = re.compile(
+    r"(?:,?\s*(?:with|including|include|and|plus|\+)\s+(?:the\s+)?(?:humidity|wind(?:\s+speed)?))+$"
+)
+
+# "top headlines", "show me today's top headlines", "latest headlines please"
+HEADLINES = re.compile(
+    r"^(?:(?:show|give|get|tell)\s+me\s+|what\s+are\s+|any\s+)?(?:the\s+)?"
+    r"(?:today'?s?\s+|latest\s+|current\s+)?(?:top\s+)?(?:news\s+)?headlines"
+    r"(?:\s+(?:today|now|please))*$"
+)
+
+# Requests the tools cannot answer directly, or that depend on conversation context
+UNSUPPORTED_WEATHER = re.compile(r"\b(tomorrow|forecast|yesterday|next|week|weekend|later|tonight|last)\b")
+CONTEXT_LOCATIONS = {"here", "there", "it", "that", "this", "my city", "my area", "my location", "same", "home", "today", "now"}
+NON_LOCATION_WORDS = {"what", "whats", "how", "is", "are", "the", "tell", "me", "show", "give", "get", "like", "about", "current"}
+
+
+@dataclass
+class RouteDecision:
+    intent: str
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+
+
+@dataclass
+class RouterStats:
+    total: int = 0
+    fast_path: int = 0
+    below_threshold: int = 0
+    no_match: int = 0
+    by_intent: Dict[str, int] = field(default_factory=dict)
+
+
+class FastPathRouter:
+    """
+    Deterministic keyword/fuzzy rules for unambiguous one-shot requests
+    ("weather in X", "top headlines"). A match produces the tool call directly, so the
+    graph can skip the tool-selection LLM round trip; anything else returns None.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.stats = RouterStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = text.strip().lower().replace("’", "'")
+        text = re.sub(r"[?!.]+$", "", text).strip()
+        return re.sub(r"\s+", " ", re.sub(r"^(?:hey|hi|please)[, ]+|[, ]+please$", "", text))
+
+    @staticmethod
+    def _keyword_score(word: str) -> int:
+        return max(fuzz.ratio(word, kw) for kw in WEATHER_KEYWORDS)
+
+    @staticmethod
+    def _is_known_place(location: str) -> bool:
+        if not keys_settings.gazetteer_enabled or location.lower() in DESCRIPTIVE_WORDS:
+            return False
+        return get_gazetteer().resolve(location) is not None
+
+    @classmethod
+    def is_cacheable(cls, tool: str, args: Dict[str, Any]) -> bool:
+        """Whether the answer to a fast-path call may be cached: a weather location must be one the gazetteer knows."""
+        if tool == "get_weather":
+            return cls._is_known_place(str(args.get("location", "")))
+        return True
+
+    def _match_weather(self, text: str) -> Optional[RouteDecision]:
+        include_humidity = "humid" in text
+        include_wind_speed = "wind" in text
+        stripped = WEATHER_DETAILS.sub("", text).strip(" ,")
+
+        for pattern, base in ((WEATHER_PREFIX, 0.95), (WEATHER_SUFFIX, 0.9), (WEATHER_BARE, 0.9)):
+            match = pattern.match(stripped)
+            if not match:
+                continue
+            keyword_score = self._keyword_score(match.group("kw"))
+            if keyword_score < 80:
+                continue
+
+            location = match.group("loc").strip(" ,")
+            confidence = base * keyword_score / 100
+            if not self._is_known_place(location):
+                if pattern is not WEATHER_PREFIX:
+                    continue
+                if keys_settings.gazetteer_enabled:
+                    # "temperature in celsius", "weather like in spring": a preposition alone doesn't make a place
+                    confidence *= 0.5
+            words = location.split()
+            if not location or location in CONTEXT_LOCATIONS or len(words) > 5 or NON_LOCATION_WORDS & set(words):
+                confidence *= 0.3
+            if UNSUPPORTED_WEATHER.search(text) or re.search(r"\b(and|vs|versus|or|compare)\b|&", location):
+                # Forecasts and multi-location questions need the LLM to plan the calls.
+                confidence *= 0.4
+            return RouteDecision(
+                intent="weather",
+                tool="get_weather",
+                args={
+                    "location": location.title() if location.islower() else location,
+                    "include_humidity": include_humidity,
+                    "include_wind_speed": include_wind_speed,
+                },
+                confidence=round(confidence, 3),
+            )
+        return None
+
+    def _match_headlines(self, text: str) -> Optional[RouteDecision]:
+        if HEADLINES.match(text):
+            confidence = 0.95 if "top" in text else 0.9
+            return RouteDecision(intent="news", tool="search_news", args={"top_headlines": True}, confidence=confidence)
+        return None
+
+    def route(self, text: str) -> Optional[RouteDecision]:
+        """Return a decision when a rule matches with confidence >= threshold, else None."""
+        normalized = self._normalize(text)
+        decision = self._match_headlines(normalized) or self._match_weather(normalized)
+
+        with self._lock:
+            self.stats.total += 1
+            if decision is None:
+                self.stats.no_match += 1
+            elif decision.confidence < self.threshold:
+                self.stats.below_threshold += 1
+            else:
+                self.stats.fast_path += 1
+                self.stats.by_intent[decision.intent] = self.stats.by_intent.get(decision.intent, 0) + 1
+
+        if decision is not None and decision.confidence < self.threshold:
+            logger.info(f"[ROUTER] {decision.tool} match below threshold ({decision.confidence} < {self.threshold})")
+            return None
+        return decision
+
+    def fast_path_rate(self) -> float:
+        return self.stats.fast_path / self.stats.total if self.stats.total else 0.0
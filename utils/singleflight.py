@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.uLogger import logger
+
+
+class _Call:
+    """One in-flight load and everyone waiting for it."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop]):
+        self.loop = loop  # event loop of an async leader, None for a sync one
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _resolve(future: asyncio.Future, call: _Call) -> None:
+    if future.done():
+        return
+    if call.error is not None:
+        future.set_exception(call.error)
+    else:
+        future.set_result(call.result)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent loads of the same key: the first caller (the leader) runs the
+    load, callers arriving while it is in flight wait for and share its result (or
+    exception) instead of issuing their own upstream request. Nothing is kept once the
+    load finishes, so results are never staler than a direct call.
+
+    Sync callers (threads) and async callers (any event loop) can wait on the same load.
+    `issued` counts loads that ran, `coalesced` the callers that shared one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable, loop: Optional[asyncio.AbstractEventLoop]) -> Tuple[_Call, bool]:
+        """Return `(call, leader)`: a new call for the leader or the in-flight one to wait on."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(loop)
+                self.issued += 1
+                return call, True
+            self.coalesced += 1
+            return call, False
+
+    def _finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result, call.error = result, error
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, call)
+            except RuntimeError:
+                pass  # the waiter's loop is already closed
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run `fn()` for `key`, or wait for the identical load already in flight."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        call, leader = self._join(key, None)
+        if not leader:
+            if call.loop is not None and call.loop is running:
+                # Blocking here would stall the async leader on this thread's own loop
+                with self._lock:
+                    self.coalesced -= 1
+                    self.issued += 1
+                return fn()
+            logger.debug(f"[SINGLEFLIGHT:{self.name}] Coalesced load of {key!r}")
+            call.done.wait()
+            return call.outcome()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    async def ado(self, key: Hashable, afn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of `do`."""
+        loop = asyncio.get_running_loop()
+        call, leader = self._join(key, loop)
+        if not leader:
+            with self._lock:
+                if call.done.is_set():
+                    return call.outcome()
+                future = loop.create_future()
+                call.waiters.append((loop, future))
+            logger.debug(f"[SINGLEFLIGHT:{self.name}] Coalesced load of {key!r}")
+            return await future
+
+        try:
+            result = await afn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "issued": self.issued, "coalesced": self.coalesced, "in_flight": len(self._calls)}
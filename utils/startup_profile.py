@@ -0,0 +1,74 @@
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+# "import time:       self [us] |  cumulative | imported package" lines of `python -X importtime`
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+APP_MODULES = ("agent", "api_import", "prompt_config", "tools", "utils")
+
+
+def profile_imports(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and return
+    `(module, self_us, cumulative_us, depth)` rows in import order.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+    return rows
+
+
+def cost_by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Self import time (us) summed per top-level package, largest first."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def app_module_costs(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Cumulative import time (us) of this project's own modules, including what they pull in first."""
+    return {name: cumulative for name, _, cumulative, _ in rows if name.split(".")[0] in APP_MODULES}
+
+
+def timed(steps: List[Tuple[str, Callable[[], object]]]) -> Dict[str, float]:
+    """Run `steps` in order and return seconds per step."""
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def format_report(rows: List[Tuple[str, int, int, int]], init: Dict[str, float], prewarm: Dict[str, float], top: int = 12) -> str:
+    total_import = sum(self_us for _, self_us, _, _ in rows) / 1e6
+    lines = [f"Import of agent: {total_import:.3f}s total ({len(rows)} modules)", "", "Import cost by package (self time):"]
+    for package, us in list(cost_by_package(rows).items())[:top]:
+        lines.append(f"  {package:<28} {us / 1000:9.1f} ms")
+    lines += ["", "Project modules (cumulative, first import):"]
+    for name, us in app_module_costs(rows).items():
+        lines.append(f"  {name:<28} {us / 1000:9.1f} ms")
+    lines += ["", "Initialization:"]
+    for name, seconds in init.items():
+        lines.append(f"  {name:<28} {seconds * 1000:9.1f} ms")
+    ready = total_import + sum(init.values())
+    lines.append(f"  {'ready for first request':<28} {ready * 1000:9.1f} ms")
+    lines += ["", "Deferred to first request (or --prewarm):"]
+    for name, seconds in prewarm.items():
+        lines.append(f"  {name:<28} {seconds * 1000:9.1f} ms")
+    return "\n".join(lines)
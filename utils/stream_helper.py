@@ -0,0 +1,51 @@
+from typing import Any, AsyncIterator, Dict, Iterator
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+STREAM_MODES = ["messages", "updates"]
+
+
+def _to_events(mode: str, payload: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Translate one LangGraph stream item into chatbot events:
+    - {"type": "token", "text": str}                     LLM token from the ai_chat node (or a cached answer)
+    - {"type": "tool_call", "name": str, "args": dict}    ai_chat (or the fast-path router) called a tool
+    - {"type": "tool_result", "name": str, "status": str} a tool finished
+    """
+    if mode == "messages":
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") == "ai_chat" and isinstance(chunk, AIMessageChunk) and chunk.content:
+            yield {"type": "token", "text": chunk.content}
+        return
+
+    # mode == "updates": {node_name: node_output}
+    for node, update in (payload or {}).items():
+        messages = (update or {}).get("messages", []) if isinstance(update, dict) else []
+        if node in ("ai_chat", "router") and messages and isinstance(messages[-1], AIMessage):
+            for call in messages[-1].tool_calls:
+                yield {"type": "tool_call", "name": call["name"], "args": call["args"]}
+            if node == "router" and messages[-1].content:
+                # Answer served from the response cache: no LLM tokens to stream, emit it whole
+                yield {"type": "token", "text": messages[-1].content}
+        elif node == "tools":
+            for msg in messages:
+                if isinstance(msg, ToolMessage):
+                    yield {"type": "tool_result", "name": msg.name, "status": msg.status}
+
+
+def stream_turn(graph, state: Dict[str, Any], config: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Run one turn with `graph.stream` and yield events as they happen, ending with
+    {"type": "done", "state": <final graph state>}.
+    """
+    for mode, payload in graph.stream(state, config, stream_mode=STREAM_MODES):
+        yield from _to_events(mode, payload)
+    yield {"type": "done", "state": graph.get_state(config).values}
+
+
+async def astream_turn(graph, state: Dict[str, Any], config: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Async counterpart of `stream_turn` built on `graph.astream`."""
+    async for mode, payload in graph.astream(state, config, stream_mode=STREAM_MODES):
+        for event in _to_events(mode, payload):
+            yield event
+    yield {"type": "done", "state": (await graph.aget_state(config)).values}
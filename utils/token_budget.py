@@ -0,0 +1,122 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from utils.uLogger import logger
+
+# Fixed per-message cost of the chat format (role, separators), as in OpenAI's token counting guide.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """
+    Counts tokens per message with tiktoken, memoized by message id (and content length).
+
+    Messages in the graph state only change when they are replaced by id (compacted tool
+    results), so each message is encoded once and later turns only pay for new messages. When the tiktoken
+    encoding cannot be loaded (e.g. offline), a ~4 characters per token estimate is used.
+    """
+
+    def __init__(self, model: str = "gpt-4o", max_cached: int = 50_000):
+        self.model = model
+        self.max_cached = max_cached
+        self._memo: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encoding = None
+        self._encoding_loaded = False
+
+    def _encode_len(self, text: str) -> int:
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except Exception as e:
+                logger.warning(f"[TOKENS] tiktoken unavailable for {self.model} ({e}); estimating 4 chars/token")
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return (len(text) + 3) // 4
+
+    def count_text(self, text: str) -> int:
+        """Token count of raw text (not memoized), e.g. for serialized tool schemas."""
+        return self._encode_len(text)
+
+    def _message_text(self, message: BaseMessage) -> str:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            content += json.dumps([{"name": c["name"], "args": c["args"]} for c in message.tool_calls])
+        return content
+
+    def count(self, message: BaseMessage) -> int:
+        # Compacted tool results keep their id but get new content, so the length is part of the key
+        key = f"{message.id}:{len(message.content)}" if message.id else None
+        if key:
+            with self._lock:
+                cached = self._memo.get(key)
+                if cached is not None:
+                    self._memo.move_to_end(key)
+                    return cached
+
+        tokens = self._encode_len(self._message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+        if key:
+            with self._lock:
+                self._memo[key] = tokens
+                if len(self._memo) > self.max_cached:
+                    self._memo.popitem(last=False)
+        return tokens
+
+    def count_all(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.count(m) for m in messages)
+
+
+def _group_units(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """
+    Split history into units that must be kept or dropped together: an AIMessage that
+    requested tools plus the ToolMessages answering it, or any other single message.
+    """
+    units: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and units and isinstance(units[-1][0], AIMessage) and units[-1][0].tool_calls:
+            units[-1].append(message)
+        else:
+            units.append([message])
+    return units
+
+
+def trim_to_budget(
+    messages: Sequence[BaseMessage],
+    counter: TokenCounter,
+    budget: int,
+) -> Tuple[List[BaseMessage], List[BaseMessage], int]:
+    """
+    Keep the most recent messages that fit in `budget` tokens.
+
+    The current turn (everything from the last HumanMessage on) is always kept, and older
+    history is added back newest-first one unit at a time, so a tool call is never
+    separated from its result. Returns `(kept, dropped, kept_tokens)`.
+    """
+    last_human: Optional[int] = None
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            last_human = i
+            break
+    split = last_human if last_human is not None else 0
+
+    current = list(messages[split:])
+    used = counter.count_all(current)
+
+    kept_units: List[List[BaseMessage]] = []
+    for unit in reversed(_group_units(messages[:split])):
+        unit_tokens = counter.count_all(unit)
+        if used + unit_tokens > budget:
+            break
+        kept_units.append(unit)
+        used += unit_tokens
+
+    history = [m for unit in reversed(kept_units) for m in unit]
+    kept = history + current
+    dropped = list(messages[: split - len(history)])
+    return kept, dropped, used
@@ -0,0 +1,50 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+# Tool results this short are already cheap to resend and are left as they are
+MIN_COMPACT_CHARS = 300
+
+
+def _default_summary(content: str) -> str:
+    return f"[earlier tool result, compacted] {content[:200]}"
+
+
+def compact_tool_messages(
+    messages: Sequence[BaseMessage],
+    summarizers: Dict[str, Callable[[str], str]],
+    min_chars: int = MIN_COMPACT_CHARS,
+) -> List[ToolMessage]:
+    """
+    Replacement ToolMessages (same ids) with one-line summaries for tool results of earlier
+    turns, i.e. everything before the last HumanMessage. The current turn's results stay
+    complete so the LLM can answer from them; once the turn is over they are summarized.
+
+    Returned as graph updates, `add_messages` replaces the originals by id, so the full
+    payloads also leave the checkpointed state. Already compacted messages are skipped.
+    """
+    last_human: Optional[int] = None
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            last_human = i
+            break
+    if last_human is None:
+        return []
+
+    replacements = []
+    for message in messages[:last_human]:
+        if not isinstance(message, ToolMessage) or message.additional_kwargs.get("compacted"):
+            continue
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if len(content) < min_chars:
+            continue
+        summary = summarizers.get(message.name, _default_summary)(content)
+        replacements.append(ToolMessage(
+            content=summary,
+            id=message.id,
+            name=message.name,
+            tool_call_id=message.tool_call_id,
+            status=message.status,
+            additional_kwargs={**message.additional_kwargs, "compacted": True, "original_chars": len(content)},
+        ))
+    return replacements
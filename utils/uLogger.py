@@ -1,31 +1,102 @@
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-app_root = os.getcwd()
-abs_root_path = os.path.abspath(app_root)
-print(abs_root_path)
-log_dir = os.path.join(abs_root_path, "log_dir")
-if not os.path.exists(log_dir):
-    os.mkdir(log_dir)
-log_file = os.path.join(log_dir, "log_file.log")
-print(log_file)
+# Log files go to $LOG_DIR (default: ./log_dir), resolved when the first record is logged
+LOG_DIR_ENV = "LOG_DIR"
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-rotating_handler = RotatingFileHandler(
-    log_file, maxBytes=5*1024*1024, backupCount=2 
-)
-rotating_handler.setLevel(logging.DEBUG)
 formatter = logging.Formatter('%(asctime)s %(levelname)s %(funcName)s(%(lineno)d) %(message)s')
-rotating_handler.setFormatter(formatter)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO) 
-console_handler.setFormatter(formatter)
-logger.addHandler(rotating_handler)
-logger.addHandler(console_handler)
 
 
+class JsonlFormatter(logging.Formatter):
+    """Serializes a dict log message as one JSON line (in the listener thread)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+# Callers only put records on a queue; a background listener thread does the formatting
+# and the file/console I/O, so disk writes never sit on the request path. The log
+# directory, files and listener threads are created when the first record is logged,
+# so importing this module has no side effects.
+log_queue = queue.SimpleQueue()
+conversation_queue = queue.SimpleQueue()
+_listeners = []
+_start_lock = threading.Lock()
+
+
+def log_dir() -> str:
+    return os.path.abspath(os.environ.get(LOG_DIR_ENV) or os.path.join(os.getcwd(), "log_dir"))
+
+
+def _start_logging() -> None:
+    if _listeners:
+        return
+    with _start_lock:
+        if _listeners:
+            return
+        directory = log_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        rotating_handler = RotatingFileHandler(
+            os.path.join(directory, "log_file.log"), maxBytes=5*1024*1024, backupCount=2, delay=True
+        )
+        rotating_handler.setLevel(logging.DEBUG)
+        rotating_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(formatter)
+        conversation_handler = RotatingFileHandler(
+            os.path.join(directory, "conversations.jsonl"), maxBytes=20*1024*1024, backupCount=3, encoding="utf-8", delay=True
+        )
+        conversation_handler.setFormatter(JsonlFormatter())
+
+        listeners = [
+            QueueListener(log_queue, rotating_handler, console_handler, respect_handler_level=True),
+            QueueListener(conversation_queue, conversation_handler),
+        ]
+        for listener in listeners:
+            listener.start()
+        _listeners.extend(listeners)
+        atexit.register(stop_logging)
+
+
+class StartingQueueHandler(QueueHandler):
+    """QueueHandler that starts the logging backend on its first record."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        _start_logging()
+        super().enqueue(record)
+
+
+class DeferredQueueHandler(StartingQueueHandler):
+    """
+    QueueHandler that enqueues the record untouched, leaving all formatting (message
+    arguments, exception tracebacks) to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(DeferredQueueHandler(log_queue))
+logger.propagate = False
+
+# Structured conversation log: one JSON object per message (see utils/log_helper.py)
+conversation_logger = logging.getLogger(f"{__name__}.conversation")
+conversation_logger.setLevel(logging.INFO)
+conversation_logger.propagate = False
+conversation_logger.addHandler(DeferredQueueHandler(conversation_queue))
 
 
+def stop_logging() -> None:
+    """Flush queued records to disk and stop the listener threads (also runs at exit)."""
+    for listener in _listeners:
+        if listener._thread is not None:
+            listener.stop()